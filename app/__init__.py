@@ -91,4 +91,4 @@ def create_app(config_class=Config):
     
     return app
 
-from app import models 
\ No newline at end of file
+from app import models, change_tracking
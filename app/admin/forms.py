@@ -1,4 +1,5 @@
 from flask_wtf import FlaskForm
+from flask_wtf.file import FileField, FileAllowed
 from wtforms import StringField, TextAreaField, SelectField, DateField, IntegerField, BooleanField, SubmitField, HiddenField
 from wtforms.validators import DataRequired, Optional, NumberRange, ValidationError
 from app.models import Division, Team, Gameweek, Season
@@ -35,10 +36,21 @@ class EndSeasonForm(FlaskForm):
 class ScoreUploadForm(FlaskForm):
     gameweek = SelectField('Gameweek', coerce=int, validators=[DataRequired()])
     division = SelectField('Division', coerce=int, validators=[DataRequired()])
-    scores_text = TextAreaField('Scores (one per line)', validators=[DataRequired()],
+    scores_text = TextAreaField('Scores (one per line)',
                               render_kw={"rows": 10, "placeholder": "Home Team    Home Score    Away Team    Away Score"})
+    scores_file = FileField('Or upload a scores file',
+                            validators=[Optional(), FileAllowed(['txt', 'csv', 'tsv'], 'Text files only')])
     submit = SubmitField('Upload Scores')
 
+    def validate_scores_text(self, field):
+        if not (field.data or '').strip() and not self.scores_file.data:
+            raise ValidationError('Paste some scores or choose a file to upload.')
+
+class TeamAliasForm(FlaskForm):
+    alias = StringField('Name as it appears in Fantrax', validators=[DataRequired()])
+    team_id = SelectField('Team', coerce=int, validators=[DataRequired()])
+    submit = SubmitField('Save Alias')
+
 class CupCompetitionForm(FlaskForm):
     name = StringField('Competition Name', validators=[DataRequired()])
     has_groups = BooleanField('Use Group Stage Format')
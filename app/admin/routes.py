@@ -1,22 +1,35 @@
-from flask import render_template, flash, redirect, url_for, current_app, request
+from flask import (render_template, flash, redirect, url_for, current_app, request,
+                   abort, Response, stream_with_context)
 from flask_login import login_required
 from app import db
 from app.admin import bp
 from app.admin.forms import (BulkFixtureForm, DivisionForm, TeamForm, 
                            EndSeasonForm, TitleForm, EditTeamForm, ScoreUploadForm,
-                           ManagerMonthForm)
+                           ManagerMonthForm, TeamAliasForm, RulesForm)
 from app.admin.decorators import admin_required
-from app.models import Season, Division, Gameweek, Team, Fixture, TeamSeason, Title, ManagerOfTheMonth, ManagerMonth
-from app.utils import normalize_team_name
+from app.models import (Season, Division, Team, Fixture, TeamSeason, Title, ManagerOfTheMonth,
+                        ManagerMonth, TeamAlias, Rule, TeamRating, HeadToHead,
+                        TeamRecord)
+from app.team_names import get_team_index, learn_alias
+from app.reference import get_reference, get_current_season
+from app.score_parser import parse_scores
+from app.export import stream_export, export_filename
+from app.motm import award_completed_months
+from app.clinch import get_run_in, newly_settled
+from app.ratings import update_ratings
+from app.head_to_head import refresh_head_to_head
+from app.records import update_records
 from sqlalchemy import text, or_
+from sqlalchemy.orm import joinedload
 import traceback
 import re
+from urllib.parse import urlparse
 
 @bp.route('/dashboard')
 @login_required
 @admin_required
 def dashboard():
-    current_season = Season.query.filter_by(is_current=True).first()
+    current_season = get_current_season()
     return render_template('admin/dashboard.html', season=current_season)
 
 @bp.route('/seasons')
@@ -30,7 +43,7 @@ def manage_seasons():
 @login_required
 @admin_required
 def manage_divisions():
-    current_season = Season.query.filter_by(is_current=True).first()
+    current_season = get_current_season()
     if not current_season:
         flash('No current season found. Please create a season first.', 'warning')
         return redirect(url_for('admin.manage_seasons'))
@@ -46,13 +59,13 @@ def manage_divisions():
 @login_required
 @admin_required
 def manage_teams():
-    current_season = Season.query.filter_by(is_current=True).first()
+    current_season = get_current_season()
     if not current_season:
         flash('No current season found. Please create a season first.', 'warning')
         return redirect(url_for('admin.manage_seasons'))
         
     form = TeamForm()
-    form.division_id.choices = [(d.id, d.name) for d in Division.query.filter_by(season_id=current_season.id).all()]
+    form.division_id.choices = [(d.id, d.name) for d in get_reference().season_divisions(current_season.id)]
     
     if form.validate_on_submit():
         try:
@@ -115,6 +128,16 @@ def delete_team(team_id):
         
         # Delete any manager of the month awards
         ManagerOfTheMonth.query.filter_by(team_id=team_id).delete()
+
+        # And the team's power ratings, head-to-head and all-time records
+        TeamRating.query.filter_by(team_id=team_id).delete()
+        TeamRecord.query.filter_by(team_id=team_id).delete()
+        HeadToHead.query.filter(
+            or_(
+                HeadToHead.team_a_id == team_id,
+                HeadToHead.team_b_id == team_id
+            )
+        ).delete()
         
         # Delete any fixtures where this team is involved
         Fixture.query.filter(
@@ -123,6 +146,10 @@ def delete_team(team_id):
                 Fixture.away_team_id == team_id
             )
         ).delete()
+
+        # Re-rate and recount the opponents without the deleted fixtures
+        update_ratings()
+        update_records()
         
         # Finally delete the team
         db.session.delete(team)
@@ -169,9 +196,9 @@ def manage_team_titles(team_id):
     
     form = TitleForm()
     # Set up season choices
-    form.season_id.choices = [(s.id, s.name) for s in Season.query.order_by(Season.start_date.desc()).all()]
+    form.season_id.choices = [(s.id, s.name) for s in get_reference().seasons]
     # Set up division choices
-    form.division_id.choices = [(d.id, d.name) for d in Division.query.all()]
+    form.division_id.choices = [(d.id, d.name) for d in get_reference().divisions]
     # Set the team_id to the current team and disable the field as it's predetermined
     form.team_id.data = team_id
     form.team_id.render_kw = {'disabled': 'disabled'}
@@ -324,150 +351,73 @@ def end_season():
 @login_required
 @admin_required
 def upload_scores():
-    current_season = Season.query.filter_by(is_current=True).first()
+    current_season = get_current_season()
     if not current_season:
         flash('No current season found. Please create a season first.', 'warning')
         return redirect(url_for('admin.manage_seasons'))
         
     form = ScoreUploadForm()
+    unresolved = []
     
     # Set up form choices
     form.gameweek.choices = [(gw.id, f'Gameweek {gw.number}') 
-                            for gw in Gameweek.query.filter_by(season_id=current_season.id)
-                            .order_by(Gameweek.number).all()]
+                            for gw in get_reference().season_gameweeks(current_season.id)]
                             
     form.division.choices = [(d.id, d.name) 
-                            for d in Division.query.filter_by(season_id=current_season.id).all()]
+                            for d in get_reference().season_divisions(current_season.id)]
     
     if form.validate_on_submit():
         try:
-            print("\nDEBUG INFO:")
-            print(f"Raw form data: {form.scores_text.data}")
-            print("\nForm validation:")
-            print(f"Gameweek ID: {form.gameweek.data}")
-            print(f"Division ID: {form.division.data}")
-            
-            # Process scores upload - first split into lines
-            scores = [line for line in form.scores_text.data.strip().splitlines() if line.strip()]
-            print(f"\nProcessing {len(scores)} lines:")
-            for i, line in enumerate(scores, 1):
-                print(f"\nLine {i}: '{line}'")
-            
+            # Stream the uploaded file if there is one, otherwise the pasted text
+            source = form.scores_file.data.stream if form.scores_file.data else form.scores_text.data
+            parse_errors = []
+
             success_count = 0
             error_count = 0
-            
-            for score_line in scores:
-                if not score_line.strip():
-                    continue
-                    
-                # Split on single space, but intelligently to handle "name score name score" format
-                all_parts = score_line.strip().split()
-                if len(all_parts) < 4:  # Need at least 4 parts
-                    flash(f'Invalid line format (not enough parts): {score_line}', 'danger')
-                    error_count += 1
-                    continue
-                
-                # Find the scores (they should be numeric)
-                scores_indices = []
-                for i, part in enumerate(all_parts):
-                    # Remove any trailing trophy emoji from score
-                    clean_part = part.split('🏆')[0] if '🏆' in part else part
-                    try:
-                        float(clean_part)
-                        scores_indices.append(i)
-                    except ValueError:
-                        continue
-                
-                if len(scores_indices) != 2:
-                    flash(f'Could not identify exactly two scores in line: {score_line}', 'danger')
+            scored_pairs = []
+
+            # Fixtures for this gameweek/division, keyed by (home, away) team ids
+            fixtures = Fixture.query.filter_by(
+                gameweek_id=form.gameweek.data,
+                division_id=form.division.data
+            ).all()
+            fixtures_by_teams = {(f.home_team_id, f.away_team_id): f for f in fixtures}
+            division_team_ids = {team_id for f in fixtures for team_id in (f.home_team_id, f.away_team_id)}
+            team_index = get_team_index(current_season.id)
+            run_in_before = get_run_in(current_season.id).get(form.division.data, {})
+
+            for score_line in parse_scores(source, errors=parse_errors):
+                home_team_name, home_score = score_line.home, score_line.home_score
+                away_team_name, away_score = score_line.away, score_line.away_score
+
+                # Resolve names against this division's teams (exact, alias, then fuzzy)
+                home_match = team_index.resolve(home_team_name, division_team_ids)
+                away_match = team_index.resolve(away_team_name, division_team_ids)
+
+                if not home_match.team or not away_match.team:
+                    for raw_name, match in ((home_team_name, home_match), (away_team_name, away_match)):
+                        if not match.team and raw_name not in {u['name'] for u in unresolved}:
+                            flash(f'Could not find team: {raw_name}', 'danger')
+                            unresolved.append({
+                                'name': raw_name,
+                                'suggestions': team_index.suggestions(raw_name, division_team_ids)
+                            })
                     error_count += 1
                     continue
-                
-                # First score position determines team name boundaries
-                first_score_pos = scores_indices[0]
-                second_score_pos = scores_indices[1]
-                
-                # Home team name is everything before first score
-                home_team_name = ' '.join(all_parts[:first_score_pos])
-                # Away team name is everything between scores
-                away_team_name = ' '.join(all_parts[first_score_pos + 1:second_score_pos])
-                
-                # Get the scores (clean any trophy emoji)
-                home_score = all_parts[first_score_pos].split('🏆')[0]
-                away_score = all_parts[second_score_pos].split('🏆')[0]
-                
-                print(f"\nParsed line:")
-                print(f"Home team: '{home_team_name}'")
-                print(f"Home score: {home_score}")
-                print(f"Away team: '{away_team_name}'")
-                print(f"Away score: {away_score}")
-                    
-                # Variables already set in the parsing code above
-                
-                # Get all fixtures for this gameweek and division first
-                fixtures = Fixture.query.filter_by(
-                    gameweek_id=form.gameweek.data,
-                    division_id=form.division.data
-                ).all()
-                
-                print(f"\nLooking for: {home_team_name} vs {away_team_name}")
-                print(f"Gameweek ID: {form.gameweek.data}, Division ID: {form.division.data}")
-                print(f"Found {len(fixtures)} fixtures for this gameweek/division")
-                
-                # Get all teams to create a name lookup
-                all_teams = {team.id: team for team in Team.query.all()}
-                print("\nAll teams in database:")
-                for team_id, team in all_teams.items():
-                    print(f"ID: {team_id}, Name: {team.name}")
-                
-                # Find the matching fixture
-                fixture = None
-                for f in fixtures:
-                    home_team = all_teams.get(f.home_team_id)
-                    away_team = all_teams.get(f.away_team_id)
-                    
-                    # Print debug info for each fixture comparison
-                    print(f"\nComparing fixture:")
-                    print(f"Looking for: '{home_team_name}' vs '{away_team_name}'")
-                    if home_team and away_team:
-                        print(f"Checking against: '{home_team.name}' vs '{away_team.name}'")
-                        print(f"Exact match? Home: {home_team.name == home_team_name}, Away: {away_team.name == away_team_name}")
-                    
-                    if (home_team and away_team and 
-                        home_team.name.strip() == home_team_name.strip() and 
-                        away_team.name.strip() == away_team_name.strip()):
-                        fixture = f
-                        print("MATCH FOUND!")
-                        break
-                
+
+                for raw_name, match in ((home_team_name, home_match), (away_team_name, away_match)):
+                    if match.method == 'fuzzy':
+                        flash(f'Matched "{raw_name}" to {match.team.name}', 'info')
+
+                fixture = fixtures_by_teams.get((home_match.team.id, away_match.team.id))
                 if not fixture:
-                    flash(f'Could not find fixture for: {home_team_name} vs {away_team_name} in gameweek {form.gameweek.data}', 'danger')
-                    error_count += 1
-                    continue
-                
-                # We already have home_team and away_team from the loop above
-                
-                if not home_team or not away_team:
-                    if not home_team:
-                        flash(f'Could not find home team: {home_team_name}', 'danger')
-                    if not away_team:
-                        flash(f'Could not find away team: {away_team_name}', 'danger')
+                    flash(f'Could not find fixture for: {home_match.team.name} vs {away_match.team.name} in gameweek {form.gameweek.data}', 'danger')
                     error_count += 1
                     continue
-                
-                try:
-                    # Convert scores to float since they can be decimals
-                    home_score = float(home_score)
-                    away_score = float(away_score)
-                except ValueError:
-                    flash(f'Invalid score format in line: {score_line}', 'danger')
-                    error_count += 1
-                    continue
-                
+
                 # Update the fixture with scores
-                fixture.home_score = home_score
-                fixture.away_score = away_score
-                fixture.played = True
+                fixture.record_score(home_score, away_score)
+                scored_pairs.append((fixture.home_team_id, fixture.away_team_id))
                 
                 # Get both teams' seasons and update their totals
                 home_team_season = TeamSeason.query.filter_by(
@@ -494,10 +444,34 @@ def upload_scores():
                         away_team_season.points += 1
                 
                 success_count += 1
-            
+
+            for error in parse_errors:
+                flash(f'Line {error.line_no}: {error}', 'danger')
+            error_count += len(parse_errors)
+
             if success_count > 0:
                 db.session.commit()
                 flash(f'Successfully updated {success_count} scores.', 'success')
+
+                # These scores may have completed a Manager of the Month
+                awarded = award_completed_months(current_season.id)
+                if awarded:
+                    db.session.commit()
+                    for result in awarded:
+                        winner = get_reference().team(result.team_id)
+                        flash(f'Manager of the Month for {result.month_name}: {winner.name if winner else result.team_id}', 'success')
+
+                # Move the power ratings, head-to-head and all-time records on by the newly scored fixtures
+                rated = update_ratings()
+                refreshed = refresh_head_to_head(scored_pairs)
+                if update_records() or rated or refreshed:
+                    db.session.commit()
+
+                # Titles, promotions and relegations these scores have settled
+                run_in_after = get_run_in(current_season.id).get(form.division.data, {})
+                for team_id, description in newly_settled(run_in_before, run_in_after):
+                    team = get_reference().team(team_id)
+                    flash(f'{team.name if team else team_id} has {description}!', 'success')
             
             if error_count > 0:
                 flash(f'Failed to update {error_count} scores. Check the error messages above.', 'warning')
@@ -506,13 +480,62 @@ def upload_scores():
             db.session.rollback()
             flash(f'Error uploading scores: {str(e)}', 'danger')
     
-    return render_template('admin/scores.html', season=current_season, form=form)
+    return render_template('admin/scores.html', season=current_season, form=form,
+                         unresolved=unresolved, alias_form=TeamAliasForm())
+
+@bp.route('/team-aliases', methods=['GET', 'POST'])
+@login_required
+@admin_required
+def manage_team_aliases():
+    """List learned team-name aliases and confirm new ones"""
+    form = TeamAliasForm()
+    form.team_id.choices = [(t.id, t.name) for t in get_reference().teams]
+
+    if form.validate_on_submit():
+        try:
+            alias = learn_alias(form.alias.data, form.team_id.data)
+            if alias:
+                db.session.add(alias)
+                db.session.commit()
+                flash(f'"{form.alias.data}" will now be read as {alias.team.name}.', 'success')
+            else:
+                flash(f'"{form.alias.data}" already matches a team name exactly.', 'info')
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Error saving alias: {str(e)}', 'danger')
+        # Only follow a relative path on this site back to the upload page
+        next_page = request.form.get('next')
+        parsed = urlparse(next_page or '')
+        if not next_page or parsed.scheme or parsed.netloc or not next_page.startswith('/') or '\\' in next_page:
+            next_page = url_for('admin.manage_team_aliases')
+        return redirect(next_page)
+
+    if request.method == 'GET':
+        form.alias.data = request.args.get('alias')
+        form.team_id.data = request.args.get('team_id', type=int)
+
+    aliases = TeamAlias.query.order_by(TeamAlias.alias).all()
+    return render_template('admin/team_aliases.html', form=form, aliases=aliases)
+
+@bp.route('/team-aliases/<int:alias_id>/delete', methods=['POST'])
+@login_required
+@admin_required
+def delete_team_alias(alias_id):
+    alias = TeamAlias.query.get_or_404(alias_id)
+    try:
+        db.session.delete(alias)
+        db.session.commit()
+        flash('Alias deleted successfully.', 'success')
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Error deleting alias: {str(e)}', 'danger')
+    return redirect(url_for('admin.manage_team_aliases'))
 
 @bp.route('/cups')
 @login_required
 @admin_required
 def manage_cups():
-    current_season = Season.query.filter_by(is_current=True).first()
+    current_season = get_current_season()
     if not current_season:
         flash('No current season found. Please create a season first.', 'warning')
         return redirect(url_for('admin.manage_seasons'))
@@ -522,7 +545,7 @@ def manage_cups():
 @login_required
 @admin_required
 def manage_manager_month():
-    current_season = Season.query.filter_by(is_current=True).first()
+    current_season = get_current_season()
     if not current_season:
         flash('No current season found. Please create a season first.', 'warning')
         return redirect(url_for('admin.manage_seasons'))
@@ -531,18 +554,22 @@ def manage_manager_month():
     form = ManagerMonthForm()
     
     # Set up gameweek choices
-    gameweeks = Gameweek.query.filter_by(season_id=current_season.id).order_by(Gameweek.number).all()
+    gameweeks = get_reference().season_gameweeks(current_season.id)
     form.start_gameweek_id.choices = [(gw.id, f'Gameweek {gw.number}') for gw in gameweeks]
     form.end_gameweek_id.choices = [(gw.id, f'Gameweek {gw.number}') for gw in gameweeks]
     
     # Get existing months
-    months = ManagerMonth.query.filter_by(season_id=current_season.id).order_by(ManagerMonth.start_gameweek_id).all()
+    months = ManagerMonth.query.options(
+        joinedload(ManagerMonth.start_gameweek),
+        joinedload(ManagerMonth.end_gameweek),
+        joinedload(ManagerMonth.winner)
+    ).filter_by(season_id=current_season.id).order_by(ManagerMonth.start_gameweek_id).all()
     
     # Handle form submission
     if form.validate_on_submit():
         try:
             # Get all divisions for current season
-            divisions = Division.query.filter_by(season_id=current_season.id).all()
+            divisions = get_reference().season_divisions(current_season.id)
             
             created_count = 0
             for division in divisions:
@@ -576,13 +603,26 @@ def manage_manager_month():
     return render_template('admin/manager_month.html', 
                          season=current_season,
                          form=form,
-                         months=months)
+                         months=months,
+                         complete=ManagerMonth.completeness(months))
 
-@bp.route('/rules')
+@bp.route('/rules', methods=['GET', 'POST'])
 @login_required
 @admin_required
 def edit_rules():
-    return render_template('admin/edit_rules.html')
+    rule = Rule.query.order_by(Rule.id).first()
+    form = RulesForm(obj=rule)
+    if form.validate_on_submit():
+        if rule is None:
+            rule = Rule(content=form.content.data)
+            db.session.add(rule)
+        else:
+            rule.content = form.content.data
+        # The HTML and ETag hash are rendered by the Rule save hook
+        db.session.commit()
+        flash('Rules updated.', 'success')
+        return redirect(url_for('admin.edit_rules'))
+    return render_template('admin/edit_rules.html', form=form)
 
 @bp.route('/recalculate-totals', methods=['POST'])
 @login_required
@@ -590,7 +630,7 @@ def edit_rules():
 def recalculate_totals():
     """Recalculate all team totals for the current season"""
     try:
-        current_season = Season.query.filter_by(is_current=True).first()
+        current_season = get_current_season()
         if not current_season:
             flash('No current season found.', 'danger')
             return redirect(url_for('admin.dashboard'))
@@ -600,40 +640,9 @@ def recalculate_totals():
         
         updated_count = 0
         for ts in team_seasons:
-            # Reset totals
             old_points = ts.points
             old_score = ts.total_score
-            ts.points = 0
-            ts.total_score = 0.0
-            
-            # Get all fixtures for this team in current season
-            fixtures = Fixture.query.join(
-                Gameweek, Fixture.gameweek_id == Gameweek.id
-            ).filter(
-                Gameweek.season_id == current_season.id,
-                or_(
-                    Fixture.home_team_id == ts.team_id,
-                    Fixture.away_team_id == ts.team_id
-                ),
-                Fixture.home_score.isnot(None),
-                Fixture.away_score.isnot(None)
-            ).all()
-            
-            for fixture in fixtures:
-                if fixture.home_team_id == ts.team_id:
-                    # This team is home
-                    ts.total_score += fixture.home_score
-                    if fixture.home_score > fixture.away_score:
-                        ts.points += 3  # Win
-                    elif fixture.home_score == fixture.away_score:
-                        ts.points += 1  # Draw
-                else:
-                    # This team is away
-                    ts.total_score += fixture.away_score
-                    if fixture.away_score > fixture.home_score:
-                        ts.points += 3  # Win
-                    elif fixture.away_score == fixture.home_score:
-                        ts.points += 1  # Draw
+            ts.recalculate_totals()
             
             if old_points != ts.points or old_score != ts.total_score:
                 updated_count += 1
@@ -650,6 +659,25 @@ def recalculate_totals():
     
     return redirect(url_for('admin.dashboard'))
 
+@bp.route('/export/<dataset>')
+@login_required
+@admin_required
+def export_data(dataset):
+    """Stream a dataset (or 'all') for one or every season as CSV or NDJSON"""
+    fmt = request.args.get('format', 'csv')
+    season_id = request.args.get('season_id', type=int)
+    season = Season.query.get_or_404(season_id) if season_id else None
+
+    try:
+        chunks = stream_export(dataset, fmt, season_id)
+    except ValueError as e:
+        abort(400, description=str(e))
+
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    response = Response(stream_with_context(chunks), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename="{export_filename(dataset, fmt, season)}"'
+    return response
+
 @bp.route('/manage_fixtures', methods=['GET', 'POST'])
 @login_required
 @admin_required
@@ -667,16 +695,13 @@ def manage_fixtures():
     error_count = 0
 
     # Get current season
-    current_season = Season.query.filter_by(is_current=True).first()
+    current_season = get_current_season()
     if not current_season:
         flash("No current season found. Please create a season first.", 'warning')
         return redirect(url_for('admin.manage_seasons'))
 
     # Get divisions for current season, ordered by the custom order property
-    divisions = sorted(
-        Division.query.filter_by(season_id=current_season.id).all(),
-        key=lambda x: x.order
-    )
+    divisions = get_reference().season_divisions(current_season.id)
     if not divisions:
         flash("No divisions found for the current season. Please create a division first.", 'warning')
         return redirect(url_for('admin.manage_divisions'))
@@ -693,15 +718,21 @@ def manage_fixtures():
         return redirect(url_for('admin.manage_fixtures'))
             
     # Get all gameweeks for current season
-    all_gameweeks = Gameweek.query.filter_by(season_id=current_season.id).all()
-    gameweeks = {gw.number: gw for gw in all_gameweeks}
+    gameweeks = {gw.number: gw for gw in get_reference().season_gameweeks(current_season.id)}
     
     if not gameweeks:
         flash("No gameweeks found for the current season.", 'danger')
         return redirect(url_for('admin.manage_fixtures'))
             
-    # Get all teams
-    all_teams = {normalize_team_name(team.name): team for team in Team.query.all()}
+    # Index this season's teams by normalized name (plus learned aliases),
+    # matching only against the selected division's teams
+    team_index = get_team_index(current_season.id)
+    division_team_ids = {
+        team_id for (team_id,) in db.session.query(TeamSeason.team_id).filter_by(
+            season_id=current_season.id,
+            division_id=form.division_id.data
+        )
+    }
     
     # Process each fixture line
     fixtures_text = form.fixtures_text.data.strip().split('\n')
@@ -719,8 +750,8 @@ def manage_fixtures():
         try:
             # Parse fixture data
             gameweek_number = int(parts[0])
-            home_team_name = normalize_team_name(parts[1])
-            away_team_name = normalize_team_name(parts[2])
+            home_team_name = parts[1]
+            away_team_name = parts[2]
             
             # Validate gameweek number
             if gameweek_number < 1 or gameweek_number > 38:
@@ -735,18 +766,35 @@ def manage_fixtures():
                 error_count += 1
                 continue
             
-            # Get teams
-            home_team = all_teams.get(home_team_name)
-            away_team = all_teams.get(away_team_name)
-            
+            # Get teams (exact, alias, then fuzzy). A name that is exactly another
+            # division's team is an error rather than a fuzzy match in this one
+            home_match = team_index.resolve(home_team_name, division_team_ids)
+            away_match = team_index.resolve(away_team_name, division_team_ids)
+            wrong_division = [
+                (raw_name, season_match.team) for raw_name, season_match in (
+                    (home_team_name, team_index.resolve(home_team_name)),
+                    (away_team_name, team_index.resolve(away_team_name)))
+                if season_match.method in ('exact', 'alias') and season_match.team.id not in division_team_ids
+            ]
+            if wrong_division:
+                for raw_name, team in wrong_division:
+                    flash(f'"{raw_name}" is {team.name}, who is not in this division', 'danger')
+                error_count += 1
+                continue
+
+            home_team, away_team = home_match.team, away_match.team
             if not home_team or not away_team:
                 if not home_team:
-                    flash(f'Could not find home team: "{parts[1]}"', 'danger')
+                    flash(f'Could not find home team in this division: "{parts[1]}"', 'danger')
                 if not away_team:
-                    flash(f'Could not find away team: "{parts[2]}"', 'danger')
+                    flash(f'Could not find away team in this division: "{parts[2]}"', 'danger')
                 error_count += 1
                 continue
 
+            for raw_name, match in ((home_team_name, home_match), (away_team_name, away_match)):
+                if match.method == 'fuzzy':
+                    flash(f'Matched "{raw_name}" to {match.team.name}', 'info')
+
             # Check for existing fixture
             existing = Fixture.query.filter_by(
                 gameweek_id=correct_gameweek.id,
@@ -767,6 +815,8 @@ def manage_fixtures():
             fixture = Fixture(
                 id=next_id,
                 gameweek_id=correct_gameweek.id,
+                season_id=correct_gameweek.season_id,
+                gameweek_number=correct_gameweek.number,
                 home_team_id=home_team.id,
                 away_team_id=away_team.id,
                 division_id=form.division_id.data
@@ -0,0 +1,113 @@
+"""
+All-play records: how each team would have done playing every other team
+in its division every gameweek, rather than its one scheduled opponent.
+
+A season's played scores are read in one query and laid out per division
+as a team x gameweek matrix (NaN where a team has no score). Comparing the
+matrix against itself with broadcasting gives every team's all-play wins,
+draws and losses for every gameweek at once. Turning each gameweek's
+all-play record into the points a team would average against a random
+opponent gives its expected points, and the gap between its actual and
+expected points is its luck.
+"""
+from collections import namedtuple
+
+import numpy as np
+from sqlalchemy import select
+
+from app import db
+from app.cache import VersionedCache
+from app.models import Fixture, Team
+from app.reference import get_reference
+from app.standings import team_results
+
+AllPlayRow = namedtuple('AllPlayRow', [
+    'team_id', 'team_name', 'gameweeks', 'wins', 'draws', 'losses', 'win_pct', 'expected_points', 'points',
+    'luck'
+])
+
+
+def all_play_matrix(scores):
+    """
+    (wins, draws, opponents) arrays of shape teams x gameweeks for a score
+    matrix of the same shape, NaN meaning no score that gameweek.
+    """
+    played = ~np.isnan(scores)
+    mine = scores[:, None, :]
+    theirs = scores[None, :, :]
+    # Comparisons with NaN are always False, so missing scores count for nothing
+    wins = (mine > theirs).sum(axis=1)
+    draws = (mine == theirs).sum(axis=1) - played  # Less each team's draw with itself
+    opponents = np.where(played, played.sum(axis=0) - 1, 0)
+    return wins, draws, opponents
+
+
+def division_all_play(team_ids, gameweeks, rows):
+    """
+    AllPlayRows for one division, best all-play record first. rows are
+    (team_id, gameweek_number, score_for, score_against) for its played
+    fixtures.
+    """
+    team_index = {team_id: i for i, team_id in enumerate(team_ids)}
+    gameweek_index = {number: j for j, number in enumerate(gameweeks)}
+    scores = np.full((len(team_ids), len(gameweeks)), np.nan)
+    points = np.zeros(len(team_ids))
+    for team_id, gameweek_number, score_for, score_against in rows:
+        i = team_index[team_id]
+        scores[i, gameweek_index[gameweek_number]] = score_for
+        points[i] += 3 if score_for > score_against else 1 if score_for == score_against else 0
+
+    wins, draws, opponents = all_play_matrix(scores)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        expected = np.where(opponents > 0, (3 * wins + draws) / opponents, 0).sum(axis=1)
+    total_wins, total_draws, total_games = wins.sum(axis=1), draws.sum(axis=1), opponents.sum(axis=1)
+
+    reference = get_reference()
+    table = []
+    for i, team_id in enumerate(team_ids):
+        team = reference.team(team_id)
+        games = int(total_games[i])
+        table.append(AllPlayRow(
+            team_id, team.name if team else '', int((~np.isnan(scores[i])).sum()),
+            int(total_wins[i]), int(total_draws[i]), games - int(total_wins[i]) - int(total_draws[i]),
+            float((total_wins[i] + total_draws[i] / 2) / games) if games else 0.0,
+            float(expected[i]), int(points[i]), float(points[i] - expected[i])
+        ))
+    table.sort(key=lambda row: (-row.win_pct, -row.expected_points, row.team_name))
+    return table
+
+
+def _load_all_play(season_id):
+    results = team_results()
+    rows = db.session.execute(
+        select(results.c.division_id, results.c.team_id, results.c.gameweek_number,
+               results.c.score_for, results.c.score_against)
+        .where(results.c.season_id == season_id)
+    ).all()
+
+    by_division = {}
+    for row in rows:
+        by_division.setdefault(row.division_id, []).append(row[1:])
+    tables = {}
+    for division_id, division_rows in by_division.items():
+        team_ids = sorted({row[0] for row in division_rows})
+        gameweeks = sorted({row[1] for row in division_rows})
+        tables[division_id] = division_all_play(team_ids, gameweeks, division_rows)
+    return tables
+
+
+_all_play_cache = VersionedCache([Fixture.__tablename__, Team.__tablename__], _load_all_play)
+
+
+def get_all_play(season_id):
+    """{division_id: [AllPlayRow]} for a season's played fixtures, cached until a fixture changes"""
+    return _all_play_cache.get(season_id)
+
+
+def team_all_play(season_id, team_id):
+    """A team's AllPlayRow for a season, or None before it has played"""
+    for table in get_all_play(season_id).values():
+        for row in table:
+            if row.team_id == team_id:
+                return row
+    return None
@@ -0,0 +1,539 @@
+"""
+Database-agnostic backup and restore.
+
+Backups are gzip-compressed NDJSON archives built from the SQLAlchemy
+metadata, so the same code works against SQLite and Postgres. Each table is
+read in primary-key ordered chunks and every line feeds a SHA-256 checksum
+written in the trailer. Restores verify the archive first, load it into a
+staging database (a side file for SQLite, a separate schema for Postgres) and
+only then swap it in atomically.
+
+Incremental ("delta") archives hold only the rows touched since a previous
+archive, found through the ChangeLog table, and are replayed on top of a full
+backup as deletes followed by upserts, so a row deleted and re-created with
+the same unique key doesn't collide with its old self.
+
+Archive layout, one JSON document per line:
+
+    {"format": "fantrax-backup", "version": 1, "kind": "full", ...}   header
+    {"delete": "fixture", "ids": [12, 13]}                            delta only
+    {"table": "fixture", "columns": ["id", ...]}                      table start
+    [1, 3, 4, 7, 92.75, 81.5, 1]                                      row
+    {"end": "fixture", "rows": 1}                                     table end
+    {"checksum": "<sha256 of every line above>", "rows": {...}}       trailer
+"""
+import glob
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+from datetime import date, datetime
+
+from sqlalchemy import create_engine, select, text, func, inspect, Date, DateTime
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app import db
+from app.models import ChangeLog
+
+ARCHIVE_FORMAT = 'fantrax-backup'
+ARCHIVE_VERSION = 1
+ARCHIVE_SUFFIX = '.jsonl.gz'
+
+# Rows read per primary-key range and written per executemany batch
+CHUNK_SIZE = 1000
+
+STAGING_SCHEMA = 'restore_staging'
+
+# Tables that are derived bookkeeping rather than league data
+EXCLUDED_TABLES = {ChangeLog.__tablename__}
+
+
+class BackupError(Exception):
+    """Raised when an archive is invalid or a backup/restore cannot proceed."""
+
+
+def _encode(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def _decoder(column):
+    """Return a function turning an archived JSON value back into the column's Python type"""
+    if isinstance(column.type, DateTime):
+        return lambda v: datetime.fromisoformat(v) if v is not None else None
+    if isinstance(column.type, Date):
+        return lambda v: date.fromisoformat(v) if v is not None else None
+    return lambda v: v
+
+
+def backup_tables():
+    """Tables included in a backup, parents before children"""
+    return [table for table in db.metadata.sorted_tables if table.name not in EXCLUDED_TABLES]
+
+
+def _alembic_revision(conn):
+    if not inspect(conn).has_table('alembic_version'):
+        return None
+    return conn.execute(text('SELECT version_num FROM alembic_version')).scalar()
+
+
+def _current_change_id(conn):
+    """Highest ChangeLog id, i.e. the point in the change history a snapshot reflects"""
+    if not inspect(conn).has_table(ChangeLog.__tablename__):
+        return 0
+    return conn.execute(select(func.max(ChangeLog.__table__.c.id))).scalar() or 0
+
+
+def _iter_table_chunks(conn, table, chunk_size):
+    """Yield lists of rows from a table in primary-key order, one PK range at a time"""
+    pk = list(table.primary_key.columns)
+    if len(pk) != 1:
+        # No single key to page on; stream the ordered result instead
+        result = conn.execution_options(yield_per=chunk_size).execute(
+            select(table).order_by(*pk))
+        for partition in result.partitions():
+            yield partition
+        return
+
+    pk = pk[0]
+    last = None
+    while True:
+        query = select(table).order_by(pk).limit(chunk_size)
+        if last is not None:
+            query = query.where(pk > last)
+        rows = conn.execute(query).fetchall()
+        if not rows:
+            return
+        yield rows
+        last = rows[-1]._mapping[pk.name]
+        if len(rows) < chunk_size:
+            return
+
+
+class _ArchiveWriter:
+    """Writes archive lines to a gzip file while keeping a running checksum."""
+
+    def __init__(self, path):
+        self.file = gzip.open(path, 'wb')
+        self.digest = hashlib.sha256()
+
+    def write(self, document):
+        line = (json.dumps(document, separators=(',', ':')) + '\n').encode('utf-8')
+        self.digest.update(line)
+        self.file.write(line)
+
+    def close(self, row_counts):
+        trailer = {'checksum': self.digest.hexdigest(), 'rows': row_counts}
+        self.file.write((json.dumps(trailer) + '\n').encode('utf-8'))
+        self.file.close()
+
+
+def write_archive(path, header, table_rows, deletes=()):
+    """
+    Write an archive from a header dict, (table, ids) deletions and an iterable
+    of (table, columns, chunks) where chunks yields lists of row tuples.
+    Deletions are written first so they are replayed before the rows.
+    Returns the per-table row counts.
+    """
+    writer = _ArchiveWriter(path)
+    row_counts = {}
+    try:
+        writer.write(header)
+        for table_name, ids in deletes:
+            writer.write({'delete': table_name, 'ids': ids})
+        for table_name, columns, chunks in table_rows:
+            writer.write({'table': table_name, 'columns': columns})
+            count = 0
+            for chunk in chunks:
+                for row in chunk:
+                    writer.write([_encode(value) for value in row])
+                count += len(chunk)
+            writer.write({'end': table_name, 'rows': count})
+            row_counts[table_name] = count
+    except Exception:
+        writer.file.close()
+        os.remove(path)
+        raise
+    writer.close(row_counts)
+    return row_counts
+
+
+def _archive_header(conn, kind, **extra):
+    header = {
+        'format': ARCHIVE_FORMAT,
+        'version': ARCHIVE_VERSION,
+        'kind': kind,
+        'created': datetime.utcnow().isoformat(),
+        'dialect': conn.dialect.name,
+        'alembic_revision': _alembic_revision(conn),
+        'tables': [table.name for table in backup_tables()],
+        'change_id': _current_change_id(conn),
+    }
+    header.update(extra)
+    return header
+
+
+def create_backup(path, chunk_size=CHUNK_SIZE):
+    """Write a full backup of every mapped table to path. Returns the row counts."""
+    with db.engine.connect() as conn:
+        if conn.dialect.name == 'postgresql':
+            # One snapshot for every table, so the archive is consistent
+            conn = conn.execution_options(isolation_level='REPEATABLE READ')
+
+        def table_rows():
+            for table in backup_tables():
+                columns = [column.name for column in table.columns]
+                yield table.name, columns, _iter_table_chunks(conn, table, chunk_size)
+
+        return write_archive(path, _archive_header(conn, 'full'), table_rows())
+
+
+def _iter_id_chunks(ids, chunk_size):
+    ids = sorted(ids)
+    for start in range(0, len(ids), chunk_size):
+        yield ids[start:start + chunk_size]
+
+
+def create_incremental_backup(path, since_change_id, chunk_size=CHUNK_SIZE):
+    """
+    Write a delta archive holding every row changed after since_change_id: the
+    current version of rows that still exist and the ids of rows since deleted.
+    Returns the per-table row counts.
+    """
+    with db.engine.connect() as conn:
+        if conn.dialect.name == 'postgresql':
+            conn = conn.execution_options(isolation_level='REPEATABLE READ')
+
+        header = _archive_header(conn, 'delta', since_change_id=since_change_id)
+        log = ChangeLog.__table__
+        changed = {}
+        result = conn.execution_options(yield_per=chunk_size).execute(
+            select(log.c.table_name, log.c.row_id).distinct().where(
+                log.c.id > since_change_id,
+                log.c.id <= header['change_id']
+            )
+        )
+        for table_name, row_id in result:
+            changed.setdefault(table_name, set()).add(row_id)
+
+        tables = [table for table in backup_tables() if table.name in changed]
+        existing = {}
+        for table in tables:
+            found = existing[table.name] = set()
+            for id_chunk in _iter_id_chunks(changed[table.name], chunk_size):
+                found.update(conn.execute(select(table.c.id).where(table.c.id.in_(id_chunk))).scalars())
+
+        def deletes():
+            # Children before parents so foreign keys hold while replaying
+            for table in reversed(tables):
+                for id_chunk in _iter_id_chunks(changed[table.name] - existing[table.name], chunk_size):
+                    yield table.name, id_chunk
+
+        def table_rows():
+            for table in tables:
+                def chunks(table=table):
+                    for id_chunk in _iter_id_chunks(existing[table.name], chunk_size):
+                        yield conn.execute(
+                            select(table).where(table.c.id.in_(id_chunk)).order_by(table.c.id)
+                        ).fetchall()
+
+                columns = [column.name for column in table.columns]
+                yield table.name, columns, chunks()
+
+        return write_archive(path, header, table_rows(), deletes())
+
+
+def iter_archive(path):
+    """
+    Yield ('header', dict), ('table', (name, columns)), ('row', list),
+    ('end', (name, count)) and ('delete', (name, ids)) events from an archive, verifying the checksum once
+    the trailer is reached. Raises BackupError if the archive is corrupt.
+    """
+    digest = hashlib.sha256()
+    header = None
+    try:
+        with gzip.open(path, 'rb') as f:
+            for line in f:
+                document = json.loads(line)
+                if isinstance(document, dict) and 'checksum' in document:
+                    if document['checksum'] != digest.hexdigest():
+                        raise BackupError(f'Checksum mismatch in {path}')
+                    return
+                digest.update(line)
+
+                if header is None:
+                    if not isinstance(document, dict) or document.get('format') != ARCHIVE_FORMAT:
+                        raise BackupError(f'{path} is not a backup archive')
+                    if document.get('version') != ARCHIVE_VERSION:
+                        raise BackupError(f"Unsupported archive version {document.get('version')}")
+                    header = document
+                    yield 'header', document
+                elif isinstance(document, list):
+                    yield 'row', document
+                elif 'table' in document:
+                    yield 'table', (document['table'], document['columns'])
+                elif 'end' in document:
+                    yield 'end', (document['end'], document['rows'])
+                elif 'delete' in document:
+                    yield 'delete', (document['delete'], document['ids'])
+    except (OSError, EOFError, ValueError) as e:
+        raise BackupError(f'Could not read {path}: {e}')
+    raise BackupError(f'{path} is truncated (no checksum trailer)')
+
+
+def verify_archive(path):
+    """Stream through an archive checking structure and checksum. Returns its header."""
+    header = None
+    current, count = None, 0
+    for event, payload in iter_archive(path):
+        if event == 'header':
+            header = payload
+        elif event == 'table':
+            current, count = payload[0], 0
+        elif event == 'row':
+            count += 1
+        elif event == 'end':
+            if payload != (current, count):
+                raise BackupError(f'Row count mismatch for table {payload[0]}')
+    return header
+
+
+def _upsert(conn, table):
+    """INSERT ... ON CONFLICT (id) DO UPDATE for the connection's dialect"""
+    dialect = postgresql if conn.dialect.name == 'postgresql' else sqlite
+    statement = dialect.insert(table)
+    return statement.on_conflict_do_update(
+        index_elements=[table.c.id],
+        set_={column.name: statement.excluded[column.name]
+              for column in table.columns if not column.primary_key}
+    )
+
+
+def load_archive(conn, path, chunk_size=CHUNK_SIZE):
+    """
+    Write every row of an archive through conn using batched executemany.
+    Full archives are plain inserts; delta archives apply their deletions
+    and then upsert rows. Returns the per-table row counts.
+    """
+    tables = {table.name: table for table in backup_tables()}
+    row_counts = {}
+    table, columns, decoders, batch = None, None, None, []
+    insert = None
+    upsert = False
+
+    for event, payload in iter_archive(path):
+        if event == 'header':
+            upsert = payload.get('kind') == 'delta'
+        elif event == 'delete':
+            name, ids = payload
+            conn.execute(tables[name].delete().where(tables[name].c.id.in_(ids)))
+        elif event == 'table':
+            name, columns = payload
+            table = tables.get(name)
+            if table is None:
+                raise BackupError(f'Archive table {name} does not exist in this schema')
+            unknown = set(columns) - set(table.columns.keys())
+            if unknown:
+                raise BackupError(f"Archive columns {sorted(unknown)} do not exist on table {name}")
+            decoders = [_decoder(table.columns[column]) for column in columns]
+            insert = _upsert(conn, table) if upsert else table.insert()
+            row_counts[name] = 0
+        elif event == 'row':
+            batch.append({column: decode(value)
+                          for column, decode, value in zip(columns, decoders, payload)})
+            if len(batch) >= chunk_size:
+                conn.execute(insert, batch)
+                row_counts[table.name] += len(batch)
+                batch = []
+        elif event == 'end':
+            if batch:
+                conn.execute(insert, batch)
+                row_counts[table.name] += len(batch)
+                batch = []
+    return row_counts
+
+
+def _load_archives(conn, archives, chunk_size):
+    """Load a full archive plus any deltas, leaving a ChangeLog marker at the last change id"""
+    row_counts = {}
+    for path in archives:
+        for name, count in load_archive(conn, path, chunk_size=chunk_size).items():
+            row_counts[name] = row_counts.get(name, 0) + count
+
+    # Keep new ChangeLog ids above the restored point so later deltas chain on
+    change_id = read_header(archives[-1]).get('change_id')
+    if change_id:
+        conn.execute(ChangeLog.__table__.insert(),
+                     {'id': change_id, 'table_name': 'restore', 'row_id': None})
+    return row_counts
+
+
+def _restore_sqlite(archives, header, chunk_size):
+    target = db.engine.url.database
+    staging = f'{target}.restore'
+    if os.path.exists(staging):
+        os.remove(staging)
+
+    with db.engine.connect() as live:
+        revision = _alembic_revision(live) or header.get('alembic_revision')
+
+    staging_engine = create_engine(f'sqlite:///{staging}')
+    try:
+        db.metadata.create_all(staging_engine)
+        with staging_engine.begin() as conn:
+            row_counts = _load_archives(conn, archives, chunk_size)
+            if revision:
+                conn.execute(text('CREATE TABLE alembic_version ('
+                                  'version_num VARCHAR(32) NOT NULL PRIMARY KEY)'))
+                conn.execute(text('INSERT INTO alembic_version (version_num) VALUES (:rev)'),
+                             {'rev': revision})
+    except Exception:
+        staging_engine.dispose()
+        os.remove(staging)
+        raise
+    staging_engine.dispose()
+
+    # Nothing has touched the live file until now; swap it in one rename
+    db.session.remove()
+    db.engine.dispose()
+    os.replace(staging, target)
+    return row_counts
+
+
+def _reset_sequences(conn, tables):
+    for table in tables:
+        pk = list(table.primary_key.columns)
+        if len(pk) != 1 or not pk[0].autoincrement:
+            continue
+        conn.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table.name}', '{pk[0].name}'), "
+            f"COALESCE(MAX({pk[0].name}), 1), MAX({pk[0].name}) IS NOT NULL) FROM {table.name}"
+        ))
+
+
+def _restore_postgres(archives, chunk_size):
+    tables = db.metadata.sorted_tables
+    with db.engine.connect() as conn:
+        conn.execute(text(f'DROP SCHEMA IF EXISTS {STAGING_SCHEMA} CASCADE'))
+        conn.execute(text(f'CREATE SCHEMA {STAGING_SCHEMA}'))
+        conn.commit()
+
+        staging_conn = conn.execution_options(schema_translate_map={None: STAGING_SCHEMA})
+        try:
+            db.metadata.create_all(staging_conn, tables=tables)
+            row_counts = _load_archives(staging_conn, archives, chunk_size)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            conn.execute(text(f'DROP SCHEMA IF EXISTS {STAGING_SCHEMA} CASCADE'))
+            conn.commit()
+            raise
+
+        # DDL is transactional in Postgres, so the swap is all-or-nothing
+        db.session.remove()
+        with conn.begin():
+            for table in reversed(tables):
+                conn.execute(text(f'DROP TABLE IF EXISTS public.{table.name} CASCADE'))
+            for table in tables:
+                conn.execute(text(f'ALTER TABLE {STAGING_SCHEMA}.{table.name} SET SCHEMA public'))
+            conn.execute(text(f'DROP SCHEMA {STAGING_SCHEMA}'))
+            _reset_sequences(conn, tables)
+    return row_counts
+
+
+def restore_backup(path, deltas=(), chunk_size=CHUNK_SIZE):
+    """
+    Verify a full archive and any deltas taken after it, load them into a
+    staging database and atomically swap it in for the live one. The live
+    database is untouched if anything fails. Returns the per-table row counts.
+    """
+    header = verify_archive(path)
+    if header.get('kind') != 'full':
+        raise BackupError(f"{path} is a {header.get('kind')} archive, not a full backup")
+
+    change_id = header.get('change_id')
+    for delta in deltas:
+        delta_header = verify_archive(delta)
+        if delta_header.get('kind') != 'delta':
+            raise BackupError(f'{delta} is not an incremental archive')
+        if change_id is None or delta_header['since_change_id'] != change_id:
+            raise BackupError(f'{delta} does not follow on from the previous archive')
+        change_id = delta_header['change_id']
+
+    archives = [path] + list(deltas)
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        return _restore_sqlite(archives, header, chunk_size)
+    if dialect == 'postgresql':
+        return _restore_postgres(archives, chunk_size)
+    raise BackupError(f'Restore is not supported for {dialect} databases')
+
+
+def _iter_sql_statements(path):
+    """Yield complete statements from an sqlite3 iterdump file without reading it all"""
+    statement = ''
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            statement += line
+            if sqlite3.complete_statement(statement):
+                yield statement
+                statement = ''
+    if statement.strip():
+        raise BackupError(f'{path} ends with an incomplete statement')
+
+
+def restore_legacy_sql(path):
+    """Restore one of the old db_backup_*.sql dumps (SQLite only) via a staging file"""
+    if db.engine.dialect.name != 'sqlite':
+        raise BackupError('Legacy .sql dumps can only be restored into SQLite')
+
+    target = db.engine.url.database
+    staging = f'{target}.restore'
+    if os.path.exists(staging):
+        os.remove(staging)
+
+    conn = sqlite3.connect(staging, isolation_level=None)
+    try:
+        for statement in _iter_sql_statements(path):
+            conn.execute(statement)
+        if conn.execute('PRAGMA integrity_check').fetchone()[0] != 'ok':
+            raise BackupError(f'{path} produced a corrupt database')
+    except (sqlite3.Error, BackupError) as e:
+        conn.close()
+        os.remove(staging)
+        raise BackupError(f'Could not restore {path}: {e}')
+    conn.close()
+
+    db.session.remove()
+    db.engine.dispose()
+    os.replace(staging, target)
+
+
+def read_header(path):
+    """Read just the header line of an archive"""
+    try:
+        with gzip.open(path, 'rb') as f:
+            header = json.loads(f.readline())
+    except (OSError, EOFError, ValueError) as e:
+        raise BackupError(f'Could not read {path}: {e}')
+    if not isinstance(header, dict) or header.get('format') != ARCHIVE_FORMAT:
+        raise BackupError(f'{path} is not a backup archive')
+    return header
+
+
+def latest_archive(directory='.'):
+    """The archive (full or delta) in directory that reaches furthest into the change log"""
+    latest, latest_change_id = None, -1
+    for path in glob.glob(os.path.join(directory, f'db_*{ARCHIVE_SUFFIX}')):
+        change_id = read_header(path).get('change_id')
+        if change_id is not None and change_id > latest_change_id:
+            latest, latest_change_id = path, change_id
+    return latest
+
+
+def backup_filename(kind='full', timestamp=None):
+    timestamp = timestamp or datetime.now().strftime('%Y%m%d_%H%M%S')
+    prefix = 'db_backup' if kind == 'full' else f'db_{kind}'
+    return f'{prefix}_{timestamp}{ARCHIVE_SUFFIX}'
@@ -0,0 +1,88 @@
+"""
+In-process caches invalidated through the change log.
+
+Every write to a league table appends a ChangeLog row (see change_tracking),
+so the newest change_log id per table is a version number that all workers
+agree on. A VersionedCache names the tables its data is built from and
+reloads when any of their versions move. The versions are read once per
+request, in a single query covering every registered cache. A commit in
+this process forgets them straight away, so the worker that made a change
+sees it in the same request.
+"""
+import threading
+import time
+
+from flask import g, has_app_context
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+from app import db
+
+# Logged by restore_backup; any restore invalidates every cache
+RESTORE_MARKER = 'restore'
+
+_tracked_tables = {RESTORE_MARKER}
+
+
+def _load_table_versions():
+    # Imported here as app.models keeps a cache of its own
+    from app.models import ChangeLog
+    tables = sorted(_tracked_tables)
+    row = db.session.execute(select(*[
+        select(func.max(ChangeLog.id)).where(ChangeLog.table_name == table).scalar_subquery().label(table)
+        for table in tables
+    ])).one()
+    return dict(zip(tables, row))
+
+
+def table_versions(tables):
+    """Current version of each table, read at most once per request"""
+    if not has_app_context():
+        versions = _load_table_versions()
+    else:
+        versions = g.get('table_versions')
+        if versions is None:
+            versions = g.table_versions = _load_table_versions()
+    return tuple(versions[table] for table in tables)
+
+
+@event.listens_for(Session, 'after_commit')
+def forget_table_versions(session):
+    if has_app_context():
+        g.pop('table_versions', None)
+
+
+class VersionedCache:
+    """
+    Values built by loader(*args), kept per args until one of the tables
+    they were built from changes. Loaders should return plain values or
+    __slots__ objects, never ORM instances, as cached values outlive the
+    session that loaded them. With a ttl (seconds) a value is also reloaded
+    once it is that old, for data that can change outside the ORM.
+    """
+
+    def __init__(self, tables, loader, ttl=None):
+        self.tables = tuple(sorted(set(tables) | {RESTORE_MARKER}))
+        self.loader = loader
+        self.ttl = ttl
+        self._values = {}
+        self._version = None
+        self._lock = threading.Lock()
+        _tracked_tables.update(self.tables)
+
+    def get(self, *args):
+        version = table_versions(self.tables)
+        with self._lock:
+            if version != self._version:
+                self._values = {}
+                self._version = version
+            now = time.monotonic()
+            entry = self._values.get(args)
+            if entry is None or (self.ttl is not None and now - entry[0] >= self.ttl):
+                entry = self._values[args] = (now, self.loader(*args))
+            return entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._values = {}
+            self._version = None
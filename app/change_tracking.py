@@ -0,0 +1,93 @@
+"""
+Session hooks that append a ChangeLog row for every inserted, updated or
+deleted league row, including bulk Query.update()/delete() calls. Incremental
+backups read the log to find which rows changed since the previous archive.
+
+Bulk inserts (session.execute(insert(Model), rows)) and the legacy
+Session.bulk_*() methods can't be logged without changing what they return,
+so they are refused for tracked tables: add the objects and flush instead.
+"""
+from functools import wraps
+
+from flask_sqlalchemy.session import Session as FlaskSession
+from sqlalchemy import Table, event, inspect, select
+from sqlalchemy.orm import Session
+
+from app.models import ChangeLog
+
+UNTRACKED_TABLES = {ChangeLog.__tablename__}
+
+
+class UntrackedWriteError(RuntimeError):
+    """Raised for a bulk write that would bypass the change log."""
+
+
+def _tracked(table):
+    return table.name not in UNTRACKED_TABLES and 'id' in table.c
+
+
+def _refuse_untracked(table, how):
+    if _tracked(table):
+        raise UntrackedWriteError(
+            f'{how} on {table.name} would not be recorded in the change log; '
+            f'use session.add_all() and flush instead'
+        )
+
+
+def _write_log(session, entries):
+    if entries:
+        session.connection().execute(
+            ChangeLog.__table__.insert(),
+            [{'table_name': table_name, 'row_id': row_id} for table_name, row_id in entries]
+        )
+
+
+@event.listens_for(Session, 'after_flush')
+def log_flushed_changes(session, flush_context):
+    entries = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        table = getattr(obj, '__table__', None)
+        if table is None or not _tracked(table):
+            continue
+        if obj in session.dirty and not session.is_modified(obj, include_collections=False):
+            continue
+        entries.add((table.name, obj.id))
+    _write_log(session, sorted(entries))
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def log_bulk_changes(orm_execute_state):
+    """Record the rows a bulk UPDATE/DELETE is about to touch, and refuse bulk INSERTs"""
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    # The DML target, whether the statement was built from a model or its Table
+    table = orm_execute_state.statement.table
+    if not isinstance(table, Table) or not _tracked(table):
+        return
+
+    if orm_execute_state.is_insert:
+        _refuse_untracked(table, 'A bulk INSERT')
+    whereclause = orm_execute_state.statement.whereclause
+    query = select(table.c.id)
+    if whereclause is not None:
+        query = query.where(whereclause)
+    row_ids = orm_execute_state.session.execute(query).scalars().all()
+    _write_log(orm_execute_state.session, [(table.name, row_id) for row_id in row_ids])
+
+
+def _guard_legacy_bulk(name, tables_of):
+    """Wrap a Session.bulk_*() method, which emits no session events, to refuse tracked tables"""
+    method = getattr(FlaskSession, name)
+
+    @wraps(method)
+    def guarded(self, target, *args, **kwargs):
+        for table in tables_of(target):
+            _refuse_untracked(table, f'Session.{name}()')
+        return method(self, target, *args, **kwargs)
+
+    setattr(FlaskSession, name, guarded)
+
+
+for _name in ('bulk_insert_mappings', 'bulk_update_mappings'):
+    _guard_legacy_bulk(_name, lambda mapper: [inspect(mapper).local_table])
+_guard_legacy_bulk('bulk_save_objects', lambda objects: {inspect(obj).mapper.local_table for obj in objects})
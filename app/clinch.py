@@ -0,0 +1,289 @@
+"""
+Best and worst possible finishing positions for a league run-in.
+
+For each team the calculator asks two questions. First, at best how few
+teams can still finish above it, if it wins every remaining fixture?
+Second, at worst how many can, if it loses every one? Neither is answered
+by enumerating results, which would be 3^n for n fixtures. Teams are
+first sorted on points alone into those certainly above, certainly below
+and still in play. For the teams in play, a max-flow over their remaining
+fixtures (each fixture hands out 2 to 3 points) bounds how many of them
+can stay under, or get over, the line.
+
+The flow treats a fixture's points as freely divisible, so it is a
+relaxation. The positions are therefore safe bounds rather than exact
+values, and a title, promotion or relegation is only flagged as settled
+once it is certain. A tie on points counts as going either way unless
+both teams have finished, as points scored still to come decide it.
+
+Bounds are memoized on each division's standings and remaining fixtures,
+so after a score upload only the division that changed is recomputed.
+"""
+from collections import deque
+from functools import lru_cache
+from itertools import combinations
+
+from sqlalchemy import select
+
+from app import db
+from app.cache import VersionedCache
+from app.models import Fixture, TeamSeason
+from app.projections import PROMOTION_PLACES, RELEGATION_PLACES
+from app.reference import get_reference
+
+WIN_POINTS = 3
+DRAW_POINTS = 2  # Points a drawn fixture hands out, the fewest any result does
+
+
+def _max_flow(games, supply, capacities):
+    """
+    Most points that can be handed out when each game (a, b) gives up to
+    `supply` points to a and b between them and team t takes at most
+    capacities[t]. Edmonds-Karp on source -> games -> teams -> sink.
+    """
+    teams = list(capacities)
+    n_games = len(games)
+    team_node = {team: n_games + 1 + i for i, team in enumerate(teams)}
+    source, sink = 0, n_games + len(teams) + 1
+    residual = [dict() for _ in range(sink + 1)]
+
+    def add_edge(u, v, capacity):
+        residual[u][v] = residual[u].get(v, 0) + capacity
+        residual[v].setdefault(u, 0)
+
+    for g, (a, b) in enumerate(games, 1):
+        add_edge(source, g, supply)
+        add_edge(g, team_node[a], supply)
+        add_edge(g, team_node[b], supply)
+    for team in teams:
+        add_edge(team_node[team], sink, capacities[team])
+
+    flow = 0
+    while True:
+        parent = {source: None}
+        queue = deque([source])
+        while queue and sink not in parent:
+            u = queue.popleft()
+            for v, capacity in residual[u].items():
+                if capacity > 0 and v not in parent:
+                    parent[v] = u
+                    queue.append(v)
+        if sink not in parent:
+            return flow
+        bottleneck, v = None, sink
+        while parent[v] is not None:
+            u = parent[v]
+            bottleneck = residual[u][v] if bottleneck is None else min(bottleneck, residual[u][v])
+            v = u
+        v = sink
+        while parent[v] is not None:
+            u = parent[v]
+            residual[u][v] -= bottleneck
+            residual[v][u] += bottleneck
+            v = u
+        flow += bottleneck
+
+
+def _can_stay_under(teams, games, capacities):
+    """Whether games among teams can be played with no team taking more than its capacity"""
+    games = [(a, b) for a, b in games if a in teams and b in teams]
+    if sum(capacities[t] for t in teams) < DRAW_POINTS * len(games):
+        return False
+    return _max_flow(games, DRAW_POINTS, {t: capacities[t] for t in teams}) == DRAW_POINTS * len(games)
+
+
+def _can_all_reach(teams, games, needs):
+    """
+    Whether every team in `teams` can reach its points need together, each
+    winning its games against teams outside the set and sharing the rest.
+    """
+    inside = [(a, b) for a, b in games if a in teams and b in teams]
+    demands = {t: needs[t] for t in teams}
+    for a, b in games:
+        for team, other in ((a, b), (b, a)):
+            if team in teams and other not in teams:
+                demands[team] -= WIN_POINTS
+    demands = {t: max(0, demand) for t, demand in demands.items()}
+    total = sum(demands.values())
+    if total == 0:
+        return True
+    if total > WIN_POINTS * len(inside):
+        return False
+    return _max_flow(inside, WIN_POINTS, demands) == total
+
+
+def _tie_can_favour(a, b, remaining, totals):
+    """Whether a can finish above b level on points: yes unless both are done and b scored more"""
+    return remaining[a] > 0 or remaining[b] > 0 or totals[a] >= totals[b]
+
+
+def _best_position(team, points, totals, remaining, fixtures):
+    target = points[team] + WIN_POINTS * remaining[team]
+    above = 0
+    capacities = {}
+    for other in points:
+        if other == team:
+            continue
+        capacity = target - points[other] - (0 if _tie_can_favour(team, other, remaining, totals) else 1)
+        if capacity < 0:
+            above += 1
+        else:
+            capacities[other] = capacity
+
+    # The team wins its own games; teams already above win theirs, so only
+    # games among the teams in play can push one of them over the line
+    games = [(a, b) for a, b in fixtures if a in capacities and b in capacities]
+    in_play = sorted(capacities, key=lambda t: capacities[t])
+    for k in range(len(in_play) + 1):
+        for over in combinations(in_play, k):
+            if _can_stay_under(set(in_play) - set(over), games, capacities):
+                return 1 + above + k
+    return 1 + above + len(in_play)
+
+
+def _worst_position(team, points, totals, remaining, fixtures):
+    floor = points[team]
+    above = 0
+    needs = {}
+    for other in points:
+        if other == team:
+            continue
+        need = floor - points[other] + (0 if _tie_can_favour(other, team, remaining, totals) else 1)
+        if need <= 0:
+            above += 1
+        elif need <= WIN_POINTS * remaining[other]:
+            needs[other] = need
+
+    # The team loses its own games, so its opponents take those points for free
+    games = [(a, b) for a, b in fixtures if team not in (a, b)]
+    for a, b in fixtures:
+        if team in (a, b):
+            other = b if a == team else a
+            if other in needs:
+                needs[other] -= WIN_POINTS
+    games = [(a, b) for a, b in games if a in needs or b in needs]
+    contenders = sorted(needs, key=lambda t: needs[t])
+    for m in range(len(contenders), 0, -1):
+        for over in combinations(contenders, m):
+            if _can_all_reach(set(over), games, needs):
+                return 1 + above + m
+    return 1 + above
+
+
+@lru_cache(maxsize=64)
+def finishing_bounds(standings, fixtures):
+    """
+    {team_id: (best, worst)} positions for a division, from standings as
+    (team_id, points, total_score) tuples and its remaining fixtures as
+    (home_team_id, away_team_id) tuples. Both arguments must be tuples.
+    total_score can be any comparable tiebreak, such as a (goal difference,
+    goals for) tuple for a cup group.
+    """
+    points = {team_id: points or 0 for team_id, points, _ in standings}
+    totals = {team_id: total or 0 for team_id, _, total in standings}
+    fixtures = [(a, b) for a, b in fixtures if a in points and b in points]
+    remaining = dict.fromkeys(points, 0)
+    for a, b in fixtures:
+        remaining[a] += 1
+        remaining[b] += 1
+    return {
+        team: (_best_position(team, points, totals, remaining, fixtures),
+               _worst_position(team, points, totals, remaining, fixtures))
+        for team in points
+    }
+
+
+class RunIn:
+    """Finishing range of a team and what it settles, for a division with given zones"""
+    __slots__ = ('team_id', 'best', 'worst', 'teams', 'promotion_places', 'relegation_places')
+
+    def __init__(self, team_id, best, worst, teams, promotion_places, relegation_places):
+        self.team_id = team_id
+        self.best = best
+        self.worst = worst
+        self.teams = teams
+        self.promotion_places = promotion_places
+        self.relegation_places = relegation_places
+
+    @property
+    def clinched_title(self):
+        return self.worst == 1
+
+    @property
+    def eliminated_title(self):
+        return self.best > 1
+
+    @property
+    def clinched_promotion(self):
+        return bool(self.promotion_places) and self.worst <= self.promotion_places
+
+    @property
+    def eliminated_promotion(self):
+        return bool(self.promotion_places) and self.best > self.promotion_places
+
+    @property
+    def safe(self):
+        return bool(self.relegation_places) and self.worst <= self.teams - self.relegation_places
+
+    @property
+    def relegated(self):
+        return bool(self.relegation_places) and self.best > self.teams - self.relegation_places
+
+
+# What a team can settle, as flashed after a score upload
+SETTLED = (
+    ('clinched_title', 'clinched the title'),
+    ('clinched_promotion', 'clinched promotion'),
+    ('relegated', 'been relegated'),
+)
+
+
+def newly_settled(before, after):
+    """[(team_id, description)] for what is settled in `after` but wasn't in `before`, both {team_id: RunIn}"""
+    settled = []
+    for team_id, run_in in after.items():
+        previous = before.get(team_id)
+        for flag, description in SETTLED:
+            if getattr(run_in, flag) and not (previous and getattr(previous, flag)):
+                settled.append((team_id, description))
+    return settled
+
+
+def _load_run_in(season_id):
+    standings = db.session.execute(
+        select(TeamSeason.division_id, TeamSeason.team_id, TeamSeason.points, TeamSeason.total_score)
+        .where(TeamSeason.season_id == season_id)
+    ).all()
+    remaining = db.session.execute(
+        select(Fixture.division_id, Fixture.home_team_id, Fixture.away_team_id)
+        .where(Fixture.season_id == season_id, Fixture.status == Fixture.SCHEDULED)
+    ).all()
+
+    divisions = {}
+    for row in standings:
+        divisions.setdefault(row.division_id, ([], []))[0].append((row.team_id, row.points, row.total_score))
+    for row in remaining:
+        if row.division_id in divisions:
+            divisions[row.division_id][1].append((row.home_team_id, row.away_team_id))
+
+    reference = get_reference()
+    order = sorted(divisions, key=lambda d: reference.division(d).order if reference.division(d) else 99)
+    run_in = {}
+    for position, division_id in enumerate(order):
+        teams, fixtures = divisions[division_id]
+        bounds = finishing_bounds(tuple(sorted(teams)), tuple(sorted(fixtures)))
+        run_in[division_id] = {
+            team_id: RunIn(team_id, best, worst, len(teams),
+                           PROMOTION_PLACES if position > 0 else 0,
+                           RELEGATION_PLACES if position < len(order) - 1 else 0)
+            for team_id, (best, worst) in bounds.items()
+        }
+    return run_in
+
+
+_run_in_cache = VersionedCache([Fixture.__tablename__, TeamSeason.__tablename__], _load_run_in)
+
+
+def get_run_in(season_id):
+    """{division_id: {team_id: RunIn}} for a season, cached until a fixture or standing changes"""
+    return _run_in_cache.get(season_id)
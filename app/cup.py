@@ -0,0 +1,297 @@
+"""
+Group-stage qualification and knockout progression for cup competitions.
+
+A Qualification is a snapshot of one competition's group stage: every
+group table, the group winners ranked against each other, and the teams
+going straight to the Round of 16 or into the playoff round. It is built
+from one eager query and cached per competition until a group, group
+entry, group match or team changes (see app.cache), so templates can ask
+for tables and qualifiers as often as they like.
+
+Once a stage is decided, advance_brackets() seeds the next knockout round
+from it and adds all of that round's matches in a single flush.
+"""
+from flask import current_app
+from sqlalchemy import func, or_, select
+from sqlalchemy.orm import joinedload
+
+from app import db
+from app.cache import VersionedCache
+from app.models import (CupGroup, CupGroupMatch, CupGroupTeam, CupMatch, CupRound, Team,
+                        team_gameweek_scores)
+from app.reference import TeamRef
+
+# Group winners ranked above this go straight to the Round of 16
+DIRECT_QUALIFIERS = 8
+
+
+class GroupRef:
+    __slots__ = ('id', 'name', 'order')
+
+    def __init__(self, id, name, order):
+        self.id = id
+        self.name = name
+        self.order = order
+
+
+def _table_entry(team):
+    return {
+        'team': team,
+        'played': 0,
+        'won': 0,
+        'drawn': 0,
+        'lost': 0,
+        'goals_for': 0,
+        'goals_against': 0,
+        'goal_difference': 0,
+        'points': 0
+    }
+
+
+def build_group_table(teams, results):
+    """
+    Group table rows for teams (TeamRefs) from results, an iterable of
+    (home_team_id, away_team_id, home_score, away_score) with unplayed
+    matches left out. Sorted by points, goal difference, then goals for.
+    """
+    table = {team.id: _table_entry(team) for team in teams}
+    for home_team_id, away_team_id, home_score, away_score in results:
+        home_stats = table[home_team_id]
+        away_stats = table[away_team_id]
+        home_stats['played'] += 1
+        away_stats['played'] += 1
+        home_stats['goals_for'] += home_score
+        home_stats['goals_against'] += away_score
+        away_stats['goals_for'] += away_score
+        away_stats['goals_against'] += home_score
+
+        if home_score > away_score:
+            home_stats['won'] += 1
+            home_stats['points'] += 3
+            away_stats['lost'] += 1
+        elif away_score > home_score:
+            away_stats['won'] += 1
+            away_stats['points'] += 3
+            home_stats['lost'] += 1
+        else:
+            home_stats['drawn'] += 1
+            home_stats['points'] += 1
+            away_stats['drawn'] += 1
+            away_stats['points'] += 1
+
+    for stats in table.values():
+        stats['goal_difference'] = stats['goals_for'] - stats['goals_against']
+    return sorted(table.values(), key=lambda x: (-x['points'], -x['goal_difference'], -x['goals_for']))
+
+
+class Qualification:
+    """Group tables and qualifiers of one competition"""
+    __slots__ = ('competition_id', 'groups', 'complete', 'winners', 'direct_qualifiers', 'playoff_teams',
+                 '_tables')
+
+    def __init__(self, competition_id, groups, tables, complete):
+        self.competition_id = competition_id
+        self.groups = groups
+        self.complete = complete
+        self._tables = tables
+
+        # Group winners by points, then goals for; the top ones qualify directly
+        self.winners = sorted(
+            (self._qualifier(group, 0) for group in groups if tables[group.id]),
+            key=lambda x: (-x['points'], -x['goals_for'])
+        )
+        self.direct_qualifiers = self.winners[:DIRECT_QUALIFIERS]
+
+        # Bottom group winners plus every runner-up go to the playoff round
+        self.playoff_teams = self.winners[DIRECT_QUALIFIERS:] if len(self.winners) >= DIRECT_QUALIFIERS else []
+        for group in groups:
+            if len(tables[group.id]) >= 2:
+                self.playoff_teams.append(dict(self._qualifier(group, 1), position='Second'))
+
+    def _qualifier(self, group, place):
+        row = self._tables[group.id][place]
+        return {
+            'team': row['team'],
+            'group': group,
+            'points': row['points'],
+            'goals_for': row['goals_for'],
+            'goal_difference': row['goal_difference']
+        }
+
+    def table(self, group_id):
+        """Sorted table rows for a group"""
+        return self._tables.get(group_id, [])
+
+
+def _load_qualification(competition_id):
+    groups = CupGroup.query.options(
+        joinedload(CupGroup.teams).joinedload(CupGroupTeam.team),
+        joinedload(CupGroup.matches)
+    ).filter(CupGroup.competition_id == competition_id).order_by(CupGroup.order).all()
+
+    group_refs = []
+    tables = {}
+    complete = True
+    for group in groups:
+        group_refs.append(GroupRef(group.id, group.name, group.order))
+        teams = [TeamRef(entry.team.id, entry.team.name, entry.team.manager_name) for entry in group.teams]
+        results = []
+        for match in group.matches:
+            if match.home_score is None or match.away_score is None:
+                complete = False
+            else:
+                results.append((match.home_team_id, match.away_team_id, match.home_score, match.away_score))
+        tables[group.id] = build_group_table(teams, results)
+    return Qualification(competition_id, group_refs, tables, complete)
+
+
+_qualification_cache = VersionedCache(
+    [CupGroup.__tablename__, CupGroupTeam.__tablename__, CupGroupMatch.__tablename__, Team.__tablename__],
+    _load_qualification
+)
+
+
+def get_qualification(competition_id):
+    """The cached Qualification for a competition's group stage"""
+    return _qualification_cache.get(competition_id)
+
+
+def sync_cup_scores(competition):
+    """
+    Copy league scores into every group and knockout match of a competition,
+    from one query over the gameweeks they are played in. The caller commits.
+    """
+    group_matches = CupGroupMatch.query.join(CupGroup).filter(
+        CupGroup.competition_id == competition.id,
+        CupGroupMatch.gameweek_id.isnot(None)
+    ).all() if competition.has_groups else []
+    rounds = CupRound.query.options(joinedload(CupRound.matches)).filter(
+        CupRound.competition_id == competition.id
+    ).order_by(CupRound.order).all()
+
+    gameweek_ids = {match.gameweek_id for match in group_matches}
+    for cup_round in rounds:
+        gameweek_ids.update(gw_id for gw_id in (cup_round.first_leg_gameweek_id, cup_round.second_leg_gameweek_id)
+                            if gw_id)
+    scores = team_gameweek_scores(gameweek_ids)
+
+    for match in group_matches:
+        if match.home_team_id and match.away_team_id:
+            match.update_scores_from_fixtures(scores)
+    for cup_round in rounds:
+        for match in cup_round.matches:
+            if match.home_team_id and match.away_team_id:
+                match.update_scores_from_fixtures(scores)
+    return rounds
+
+
+def _seeded_pairs(entrants):
+    """Best against worst: entrant i (at home) plays entrant n-1-i"""
+    half = len(entrants) // 2
+    return [(entrants[i], entrants[-1 - i]) for i in range(half)]
+
+
+def _bracket_pairs(entrants):
+    """Neighbours in bracket order: winners of matches 1 and 2 meet, and so on"""
+    return [(entrants[i], entrants[i + 1]) for i in range(0, len(entrants) - 1, 2)]
+
+
+def _round_winners(cup_round):
+    """Winners of a decided round in bracket order, or None while it is still being played"""
+    if not cup_round.matches or not all(match.winner_id for match in cup_round.matches):
+        return None
+    return [match.winner_id for match in sorted(cup_round.matches, key=lambda match: match.id)]
+
+
+def _round_pairs(competition, rounds, index):
+    """
+    (home_team_id, away_team_id) pairs for rounds[index], or None if the
+    stage feeding it isn't decided yet.
+
+    Without groups every round is fed by the winners of the one before. With
+    groups, the first round is the playoff round (bottom group winners and
+    runners-up, seeded by group record), the second has the direct
+    qualifiers at home to the playoff winners, and later rounds follow on.
+    """
+    if competition.has_groups and index < 2:
+        qualification = competition.qualification
+        if not qualification.complete:
+            return None
+        if index == 0:
+            playoff = sorted(qualification.playoff_teams, key=lambda x: (-x['points'], -x['goals_for']))
+            return _seeded_pairs([entry['team'].id for entry in playoff])
+        winners = _round_winners(rounds[0])
+        if winners is None:
+            return None
+        direct = [entry['team'].id for entry in qualification.direct_qualifiers]
+        return _seeded_pairs(direct + winners)
+
+    if index == 0:
+        return None  # The first knockout round of a cup without groups is drawn by hand
+    winners = _round_winners(rounds[index - 1])
+    return None if winners is None else _bracket_pairs(winners)
+
+
+def _lock_empty_round(cup_round):
+    """Lock a round's row until commit; False if another request has given it teams meanwhile"""
+    db.session.execute(select(CupRound.id).where(CupRound.id == cup_round.id).with_for_update())
+    seeded = db.session.execute(
+        select(func.count(CupMatch.id)).where(
+            CupMatch.round_id == cup_round.id,
+            or_(CupMatch.home_team_id.isnot(None), CupMatch.away_team_id.isnot(None))
+        )
+    ).scalar()
+    if seeded:
+        # Our copy of the round is stale; reload it for the page
+        db.session.expire(cup_round, ['matches'])
+        return False
+    return True
+
+
+def advance_brackets(competition, rounds=None):
+    """
+    Fill in every knockout round whose feeding stage is decided and which has
+    no teams yet. Empty placeholder matches are filled first and the rest are
+    added together in one flush. Returns [(round, pairs)] for the rounds
+    seeded; the caller commits.
+
+    Public page loads call this, so a round about to be seeded is locked
+    (SELECT ... FOR UPDATE) and checked again for teams first: of two
+    concurrent requests the second waits for the first to commit, then
+    finds the round filled and leaves it alone.
+    """
+    if rounds is None:
+        rounds = CupRound.query.options(joinedload(CupRound.matches)).filter(
+            CupRound.competition_id == competition.id
+        ).order_by(CupRound.order).all()
+
+    seeded = []
+    for index, cup_round in enumerate(rounds):
+        if any(match.home_team_id or match.away_team_id for match in cup_round.matches):
+            continue
+        pairs = _round_pairs(competition, rounds, index)
+        if not pairs:
+            continue
+        if len(pairs) != cup_round.num_matches:
+            current_app.logger.warning(f'Not seeding {cup_round.name}: it expects {cup_round.num_matches} '
+                                       f'matches but {len(pairs) * 2} teams qualified for it')
+            continue
+
+        if not _lock_empty_round(cup_round):
+            continue
+
+        placeholders = sorted(cup_round.matches, key=lambda match: match.id)
+        new_matches = []
+        for i, (home_team_id, away_team_id) in enumerate(pairs):
+            if i < len(placeholders):
+                placeholders[i].home_team_id = home_team_id
+                placeholders[i].away_team_id = away_team_id
+            else:
+                new_matches.append(CupMatch(round=cup_round, home_team_id=home_team_id,
+                                            away_team_id=away_team_id))
+        db.session.add_all(new_matches)
+        seeded.append((cup_round, pairs))
+
+    if seeded:
+        db.session.flush()
+    return seeded
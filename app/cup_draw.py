@@ -0,0 +1,156 @@
+"""
+Group-stage draw for cup competitions.
+
+Teams are ranked by division and league position and split into pots, one
+team per group from each pot, so the strongest teams are kept apart. Within
+a pot each team goes to a random group that has no team from its division
+yet, where the pot allows it. The draw itself is plain Python over small
+tuples, cheap enough to repeat thousands of times for a fairness check
+(see draw_statistics); only save_draw touches the database, adding every
+entry and group match in one flush.
+"""
+import random
+from collections import Counter, namedtuple
+from string import ascii_uppercase
+
+from sqlalchemy import select
+
+from app import db
+from app.models import CupGroup, CupGroupMatch, CupGroupTeam, TeamSeason
+from app.reference import get_reference
+from app.standings import STANDINGS_ORDER
+
+DrawTeam = namedtuple('DrawTeam', ['team_id', 'division_id', 'rank'])
+
+
+def seeded_teams(season_id):
+    """DrawTeams for a season, best first: by division order, then league position"""
+    reference = get_reference()
+    rows = db.session.execute(
+        select(TeamSeason.team_id, TeamSeason.division_id)
+        .where(TeamSeason.season_id == season_id)
+        .order_by(*STANDINGS_ORDER)
+    ).all()
+
+    def division_order(division_id):
+        division = reference.division(division_id)
+        return division.order if division else 99
+
+    # The sort is stable, so teams keep their league order within a division
+    rows = sorted(rows, key=lambda row: division_order(row.division_id))
+    return [DrawTeam(row.team_id, row.division_id, rank) for rank, row in enumerate(rows, 1)]
+
+
+def make_pots(teams, num_groups):
+    """Split ranked teams into pots of num_groups, best pot first"""
+    return [teams[i:i + num_groups] for i in range(0, len(teams), num_groups)]
+
+
+def draw_groups(teams, num_groups, teams_per_group, rng=random):
+    """
+    Draw ranked teams into num_groups groups. Returns a list of groups, each
+    a list of DrawTeams in pot order. Raises ValueError if the teams don't
+    fill the groups exactly.
+    """
+    if len(teams) != num_groups * teams_per_group:
+        raise ValueError(f'{len(teams)} teams cannot fill {num_groups} groups of {teams_per_group}')
+
+    groups = [[] for _ in range(num_groups)]
+    divisions = [set() for _ in range(num_groups)]
+    for pot in make_pots(teams, num_groups):
+        pot = list(pot)
+        rng.shuffle(pot)
+        open_groups = set(range(num_groups))
+        # Place the team with the fewest clash-free groups left first, so a
+        # division that fills the pot doesn't run out of room at the end
+        while pot:
+            options = [[g for g in open_groups if team.division_id not in divisions[g]] for team in pot]
+            index = min(range(len(pot)), key=lambda i: len(options[i]) if options[i] else len(open_groups) + 1)
+            team = pot.pop(index)
+            group = rng.choice(options[index] or sorted(open_groups))
+            groups[group].append(team)
+            divisions[group].add(team.division_id)
+            open_groups.discard(group)
+    return groups
+
+
+def division_clashes(groups):
+    """Number of pairs of teams from the same division sharing a group"""
+    clashes = 0
+    for group in groups:
+        for count in Counter(team.division_id for team in group).values():
+            clashes += count * (count - 1) // 2
+    return clashes
+
+
+def round_robin(team_ids):
+    """
+    Rounds of (home, away) pairs in which every team meets every other once,
+    by the circle method. With an odd number of teams one team rests each
+    round. Home and away alternate from round to round.
+    """
+    slots = list(team_ids)
+    if len(slots) % 2:
+        slots.append(None)
+    rounds = []
+    for r in range(len(slots) - 1):
+        pairs = []
+        for i in range(len(slots) // 2):
+            home, away = slots[i], slots[-1 - i]
+            if home is None or away is None:
+                continue
+            pairs.append((home, away) if (r + i) % 2 == 0 else (away, home))
+        rounds.append(pairs)
+        slots = [slots[0], slots[-1]] + slots[1:-1]
+    return rounds
+
+
+def draw_statistics(teams, num_groups, teams_per_group, runs=1000, seed=None):
+    """
+    Repeat the draw and report how often each team shared a group with each
+    other team and how many same-division clashes the draws had, to check a
+    draw is fair before making it.
+    """
+    rng = random.Random(seed)
+    pairings = Counter()
+    clashes = Counter()
+    for _ in range(runs):
+        groups = draw_groups(teams, num_groups, teams_per_group, rng)
+        clashes[division_clashes(groups)] += 1
+        for group in groups:
+            ids = sorted(team.team_id for team in group)
+            for i, a in enumerate(ids):
+                for b in ids[i + 1:]:
+                    pairings[a, b] += 1
+    return {'runs': runs, 'clashes': dict(sorted(clashes.items())), 'pairings': pairings}
+
+
+def save_draw(competition, groups, gameweek_ids):
+    """
+    Create the competition's groups (named Group A, B, ...), their entries
+    and the full round-robin schedule, with round n played in
+    gameweek_ids[n]. Everything is added in one flush; the caller commits.
+    """
+    if CupGroupTeam.query.join(CupGroup).filter(CupGroup.competition_id == competition.id).first():
+        raise ValueError(f'{competition.name} has already been drawn')
+    group_size = max(len(group) for group in groups)
+    schedule_rounds = group_size - 1 if group_size % 2 == 0 else group_size
+    if len(gameweek_ids) < schedule_rounds:
+        raise ValueError(f'Groups of {group_size} need {schedule_rounds} gameweeks, got {len(gameweek_ids)}')
+
+    existing = {group.order: group for group in competition.groups}
+    rows = []
+    for order, teams in enumerate(groups, 1):
+        group = existing.get(order)
+        if group is None:
+            name = f'Group {ascii_uppercase[order - 1]}' if order <= len(ascii_uppercase) else f'Group {order}'
+            group = CupGroup(competition=competition, name=name, order=order)
+            rows.append(group)
+        rows.extend(CupGroupTeam(group=group, team_id=team.team_id) for team in teams)
+        for gameweek_id, pairs in zip(gameweek_ids, round_robin([team.team_id for team in teams])):
+            rows.extend(CupGroupMatch(group=group, home_team_id=home, away_team_id=away, gameweek_id=gameweek_id)
+                        for home, away in pairs)
+
+    db.session.add_all(rows)
+    db.session.flush()
+    return rows
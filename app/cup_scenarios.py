@@ -0,0 +1,217 @@
+"""
+What each team can still achieve in a cup's group stage.
+
+A team finishes its group stage qualified directly (a group winner ranked
+in the top DIRECT_QUALIFIERS), in the playoff round (a lower-ranked winner
+or a runner-up) or out. The solver works out which of these are still
+possible for every team without playing out every combination of results
+across all groups. Each group's remaining matches are expanded on their own
+into the distinct final points tables they can produce. Results that lead
+to the same table are merged as they go, so a group of three or four
+never has more than a few hundred. A group with more than
+MAX_ENUMERATED_MATCHES left is bounded by the league run-in calculator
+instead (see app.clinch). Groups only interact through the ranking of
+their winners, and each group's outcome is independent of the others. So whether a team can be a
+top-ranked winner, or a lower-ranked one, is settled by counting, group by
+group, whether that group's winner must or may rank above it.
+
+Points scored are unknown until matches are played, so a tie on points is
+treated as able to go either way unless both teams have finished their
+group matches. That keeps every "direct", "playoff" or "out" certain, at
+the cost of leaving the odd near-settled team "undecided".
+"""
+from sqlalchemy.orm import joinedload
+
+from app.cache import VersionedCache
+from app.clinch import finishing_bounds
+from app.cup import DIRECT_QUALIFIERS, build_group_table
+from app.models import CupGroup, CupGroupMatch, CupGroupTeam
+from app.reference import TeamRef
+
+DIRECT = 'direct'
+PLAYOFF = 'playoff'
+OUT = 'out'
+UNDECIDED = 'undecided'
+
+# (home points, away points) for a home win, draw and away win
+RESULTS = ((3, 0), (1, 1), (0, 3))
+
+# Groups with more matches left than this are bounded rather than enumerated
+MAX_ENUMERATED_MATCHES = 8
+
+
+class TeamScenario:
+    """The qualification outcomes still open to a team"""
+    __slots__ = ('team_id', 'group_id', 'possible')
+
+    def __init__(self, team_id, group_id, possible):
+        self.team_id = team_id
+        self.group_id = group_id
+        self.possible = possible
+
+    @property
+    def status(self):
+        """direct, playoff or out once only one is possible, otherwise undecided"""
+        return next(iter(self.possible)) if len(self.possible) == 1 else UNDECIDED
+
+    @property
+    def qualified(self):
+        """Through to the knockout rounds, directly or via the playoff round"""
+        return OUT not in self.possible
+
+
+def point_states(points, matches):
+    """
+    Every distinct final points tuple reachable from points (a tuple, one
+    entry per team) by playing matches, (home, away) index pairs.
+    """
+    states = {tuple(points)}
+    for home, away in matches:
+        next_states = set()
+        for state in states:
+            for home_points, away_points in RESULTS:
+                final = list(state)
+                final[home] += home_points
+                final[away] += away_points
+                next_states.add(tuple(final))
+        states = next_states
+    return states
+
+
+class _GroupState:
+    """One group's current table and remaining matches, by team index"""
+    __slots__ = ('group_id', 'team_ids', 'points', 'tiebreak', 'goals_for', 'finished', 'matches')
+
+    def __init__(self, group_id, table, remaining):
+        self.group_id = group_id
+        self.team_ids = [row['team'].id for row in table]
+        index = {team_id: i for i, team_id in enumerate(self.team_ids)}
+        self.points = tuple(row['points'] for row in table)
+        self.tiebreak = [(row['goal_difference'], row['goals_for']) for row in table]
+        self.goals_for = [row['goals_for'] for row in table]
+        self.matches = [(index[home], index[away]) for home, away in remaining]
+        self.finished = [True] * len(table)
+        for home, away in self.matches:
+            self.finished[home] = self.finished[away] = False
+
+    def tie_can_favour(self, a, b):
+        """Whether team a can finish above team b of this group level on points"""
+        return not (self.finished[a] and self.finished[b]) or self.tiebreak[a] >= self.tiebreak[b]
+
+    def outcomes(self):
+        """({team_index: possible positions}, {(team_index, points)} for every possible winner)"""
+        if len(self.matches) > MAX_ENUMERATED_MATCHES:
+            return self._bounded_outcomes()
+        positions = {i: set() for i in range(len(self.team_ids))}
+        winners = set()
+        for state in point_states(self.points, self.matches):
+            for i, points in enumerate(state):
+                best = worst = 1
+                for j, other in enumerate(state):
+                    if j == i:
+                        continue
+                    if other > points or (other == points and not self.tie_can_favour(i, j)):
+                        best += 1
+                    if other > points or (other == points and self.tie_can_favour(j, i)):
+                        worst += 1
+                positions[i].update(range(best, worst + 1))
+                if best == 1:
+                    winners.add((i, points))
+        return positions, winners
+
+    def _bounded_outcomes(self):
+        # Positions from the run-in bounds, and each possible winner on its
+        # lowest and highest total, which is all the winner ranking looks at
+        standings = tuple((i, points, self.tiebreak[i]) for i, points in enumerate(self.points))
+        bounds = finishing_bounds(standings, tuple(self.matches))
+        remaining = [0] * len(self.points)
+        for home, away in self.matches:
+            remaining[home] += 1
+            remaining[away] += 1
+        positions = {i: set(range(best, worst + 1)) for i, (best, worst) in bounds.items()}
+        winners = set()
+        for i, (best, _) in bounds.items():
+            if best == 1:
+                winners.update({(i, self.points[i]), (i, self.points[i] + 3 * remaining[i])})
+        return positions, winners
+
+
+def solve_groups(groups):
+    """
+    {team_id: TeamScenario} for groups, a list of (group_id, table,
+    remaining) where table is a build_group_table() result and remaining
+    the unplayed (home_team_id, away_team_id) pairs.
+    """
+    states = [_GroupState(group_id, table, remaining) for group_id, table, remaining in groups if table]
+    outcomes = [state.outcomes() for state in states]
+
+    def ranks_above(w_state, w, w_points, t_state, t, t_points, can_tie):
+        """Whether winner w may (can_tie) or must (not can_tie) rank above winner t"""
+        if w_points != t_points:
+            return w_points > t_points
+        w_goals, t_goals = w_state.goals_for[w], t_state.goals_for[t]
+        if w_state.finished[w] and t_state.finished[t] and w_goals != t_goals:
+            return w_goals > t_goals
+        return can_tie
+
+    scenarios = {}
+    for g, (state, (positions, winners)) in enumerate(zip(states, outcomes)):
+        for i, team_id in enumerate(state.team_ids):
+            possible = set()
+            if any(position >= 3 for position in positions[i]):
+                possible.add(OUT)
+            if 2 in positions[i]:
+                possible.add(PLAYOFF)
+
+            winning_points = [points for winner, points in winners if winner == i]
+            if winning_points:
+                others = [(states[h], outcomes[h][1]) for h in range(len(states)) if h != g]
+                # Top ranked winner: its best winning total against every group's weakest winner
+                best = max(winning_points)
+                must_be_above = sum(
+                    1 for other, other_winners in others
+                    if all(ranks_above(other, w, q, state, i, best, False) for w, q in other_winners)
+                )
+                if must_be_above < DIRECT_QUALIFIERS:
+                    possible.add(DIRECT)
+                # Lower ranked winner: its worst winning total against every group's strongest winner
+                worst = min(winning_points)
+                may_be_above = sum(
+                    1 for other, other_winners in others
+                    if any(ranks_above(other, w, q, state, i, worst, True) for w, q in other_winners)
+                )
+                if may_be_above >= DIRECT_QUALIFIERS:
+                    possible.add(PLAYOFF)
+            scenarios[team_id] = TeamScenario(team_id, state.group_id, frozenset(possible))
+    return scenarios
+
+
+def _load_scenarios(competition_id):
+    groups = CupGroup.query.options(
+        joinedload(CupGroup.teams).joinedload(CupGroupTeam.team),
+        joinedload(CupGroup.matches)
+    ).filter(CupGroup.competition_id == competition_id).order_by(CupGroup.order).all()
+
+    solver_groups = []
+    for group in groups:
+        teams = [TeamRef(entry.team.id, entry.team.name, entry.team.manager_name) for entry in group.teams]
+        results = []
+        remaining = []
+        for match in group.matches:
+            if match.home_score is None or match.away_score is None:
+                remaining.append((match.home_team_id, match.away_team_id))
+            else:
+                results.append((match.home_team_id, match.away_team_id, match.home_score, match.away_score))
+        solver_groups.append((group.id, build_group_table(teams, results), remaining))
+    return solve_groups(solver_groups)
+
+
+_scenario_cache = VersionedCache(
+    [CupGroup.__tablename__, CupGroupTeam.__tablename__, CupGroupMatch.__tablename__],
+    _load_scenarios
+)
+
+
+def get_group_scenarios(competition_id):
+    """{team_id: TeamScenario} for a competition's group stage, cached until a group match changes"""
+    return _scenario_cache.get(competition_id)
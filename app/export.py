@@ -0,0 +1,256 @@
+"""
+Streaming export of league history.
+
+Each dataset is a column-only query read through ``yield_per`` so the whole
+history can be written out as CSV or NDJSON without loading it into memory.
+"""
+import csv
+import json
+from datetime import date, datetime
+
+from sqlalchemy.orm import aliased
+
+from app import db
+from app.models import (Season, Division, Gameweek, Team, Fixture, TeamSeason, Title,
+                        CupCompetition, CupRound, CupMatch, CupGroup, CupGroupMatch,
+                        ManagerMonth, ManagerOfTheMonth)
+
+EXPORT_FORMATS = ('csv', 'ndjson')
+
+# Rows fetched per round trip (server-side cursor batch size) and rows per
+# chunk handed to the response, so bytes start flowing after the first batch.
+YIELD_PER = 500
+
+
+def _fixtures_query(season_id):
+    home_team = aliased(Team)
+    away_team = aliased(Team)
+    query = db.session.query(
+        Season.name.label('season'),
+        Fixture.gameweek_number.label('gameweek'),
+        Division.name.label('division'),
+        home_team._name.label('home_team'),
+        Fixture.home_score,
+        away_team._name.label('away_team'),
+        Fixture.away_score,
+        Fixture.status
+    ).select_from(Fixture).join(
+        Season, Fixture.season_id == Season.id
+    ).join(
+        Division, Fixture.division_id == Division.id
+    ).join(
+        home_team, Fixture.home_team_id == home_team.id
+    ).join(
+        away_team, Fixture.away_team_id == away_team.id
+    )
+    if season_id:
+        query = query.filter(Fixture.season_id == season_id)
+    return query.order_by(Season.start_date, Fixture.gameweek_number, Fixture.division_id, Fixture.id)
+
+
+def _standings_query(season_id):
+    query = db.session.query(
+        Season.name.label('season'),
+        Division.name.label('division'),
+        TeamSeason.position,
+        Team._name.label('team'),
+        Team.manager_name.label('manager'),
+        TeamSeason.points,
+        TeamSeason.total_score
+    ).select_from(TeamSeason).join(
+        Season, TeamSeason.season_id == Season.id
+    ).join(
+        Division, TeamSeason.division_id == Division.id
+    ).join(
+        Team, TeamSeason.team_id == Team.id
+    )
+    if season_id:
+        query = query.filter(Season.id == season_id)
+    return query.order_by(Season.start_date, Division.id,
+                          TeamSeason.points.desc(), TeamSeason.total_score.desc())
+
+
+def _titles_query(season_id):
+    query = db.session.query(
+        Season.name.label('season'),
+        Team._name.label('team'),
+        Title.type,
+        Division.name.label('division'),
+        CupCompetition.name.label('cup'),
+        Title.is_runner_up
+    ).select_from(Title).join(
+        Season, Title.season_id == Season.id
+    ).join(
+        Team, Title.team_id == Team.id
+    ).outerjoin(
+        Division, Title.division_id == Division.id
+    ).outerjoin(
+        CupCompetition, Title.cup_competition_id == CupCompetition.id
+    )
+    if season_id:
+        query = query.filter(Season.id == season_id)
+    return query.order_by(Season.start_date, Title.type, Title.is_runner_up, Title.id)
+
+
+def _cup_matches_query(season_id):
+    home_team = aliased(Team)
+    away_team = aliased(Team)
+    winner = aliased(Team)
+    query = db.session.query(
+        Season.name.label('season'),
+        CupCompetition.name.label('cup'),
+        CupRound.name.label('round'),
+        home_team._name.label('home_team'),
+        away_team._name.label('away_team'),
+        CupMatch.first_leg_home_score,
+        CupMatch.first_leg_away_score,
+        CupMatch.second_leg_home_score,
+        CupMatch.second_leg_away_score,
+        winner._name.label('winner')
+    ).select_from(CupMatch).join(
+        CupRound, CupMatch.round_id == CupRound.id
+    ).join(
+        CupCompetition, CupRound.competition_id == CupCompetition.id
+    ).join(
+        Season, CupCompetition.season_id == Season.id
+    ).outerjoin(
+        home_team, CupMatch.home_team_id == home_team.id
+    ).outerjoin(
+        away_team, CupMatch.away_team_id == away_team.id
+    ).outerjoin(
+        winner, CupMatch.winner_id == winner.id
+    )
+    if season_id:
+        query = query.filter(Season.id == season_id)
+    return query.order_by(Season.start_date, CupCompetition.id, CupRound.order, CupMatch.id)
+
+
+def _cup_group_matches_query(season_id):
+    home_team = aliased(Team)
+    away_team = aliased(Team)
+    query = db.session.query(
+        Season.name.label('season'),
+        CupCompetition.name.label('cup'),
+        CupGroup.name.label('group'),
+        Gameweek.number.label('gameweek'),
+        home_team._name.label('home_team'),
+        CupGroupMatch.home_score,
+        away_team._name.label('away_team'),
+        CupGroupMatch.away_score
+    ).select_from(CupGroupMatch).join(
+        CupGroup, CupGroupMatch.group_id == CupGroup.id
+    ).join(
+        CupCompetition, CupGroup.competition_id == CupCompetition.id
+    ).join(
+        Season, CupCompetition.season_id == Season.id
+    ).join(
+        home_team, CupGroupMatch.home_team_id == home_team.id
+    ).join(
+        away_team, CupGroupMatch.away_team_id == away_team.id
+    ).outerjoin(
+        Gameweek, CupGroupMatch.gameweek_id == Gameweek.id
+    )
+    if season_id:
+        query = query.filter(Season.id == season_id)
+    return query.order_by(Season.start_date, CupCompetition.id, CupGroup.order, CupGroupMatch.id)
+
+
+def _motm_query(season_id):
+    query = db.session.query(
+        Season.name.label('season'),
+        ManagerMonth.name.label('month'),
+        Team._name.label('team'),
+        ManagerOfTheMonth.total_score
+    ).select_from(ManagerOfTheMonth).join(
+        ManagerMonth, ManagerOfTheMonth.manager_month_id == ManagerMonth.id
+    ).join(
+        Season, ManagerMonth.season_id == Season.id
+    ).join(
+        Team, ManagerOfTheMonth.team_id == Team.id
+    )
+    if season_id:
+        query = query.filter(Season.id == season_id)
+    return query.order_by(Season.start_date, ManagerMonth.start_gameweek_id, ManagerMonth.id)
+
+
+# Dataset name -> query builder, in the order used by the combined 'all' export
+DATASETS = {
+    'fixtures': _fixtures_query,
+    'standings': _standings_query,
+    'titles': _titles_query,
+    'cup_matches': _cup_matches_query,
+    'cup_group_matches': _cup_group_matches_query,
+    'motm': _motm_query,
+}
+
+
+class _Echo:
+    """File-like object that hands back whatever csv.writer writes to it."""
+
+    def write(self, value):
+        return value
+
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f'Cannot serialise {type(value).__name__}')
+
+
+def _iter_rows(query):
+    return query.yield_per(YIELD_PER)
+
+
+def _iter_csv(dataset, season_id):
+    query = DATASETS[dataset](season_id)
+    writer = csv.writer(_Echo())
+    yield writer.writerow([column['name'] for column in query.column_descriptions])
+
+    chunk = []
+    for row in _iter_rows(query):
+        chunk.append(writer.writerow(row))
+        if len(chunk) >= YIELD_PER:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+
+
+def _iter_ndjson(datasets, season_id):
+    for dataset in datasets:
+        query = DATASETS[dataset](season_id)
+        names = [column['name'] for column in query.column_descriptions]
+
+        chunk = []
+        for row in _iter_rows(query):
+            record = {'dataset': dataset}
+            record.update(zip(names, row))
+            chunk.append(json.dumps(record, default=_json_default) + '\n')
+            if len(chunk) >= YIELD_PER:
+                yield ''.join(chunk)
+                chunk = []
+        if chunk:
+            yield ''.join(chunk)
+
+
+def stream_export(dataset, fmt='csv', season_id=None):
+    """
+    Yield the export for one dataset (or 'all' for NDJSON) as text chunks.
+    Raises ValueError for an unknown dataset or format combination.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f'Unknown export format: {fmt}')
+    if dataset != 'all' and dataset not in DATASETS:
+        raise ValueError(f'Unknown dataset: {dataset}')
+    if fmt == 'csv':
+        if dataset == 'all':
+            raise ValueError('CSV exports cover one dataset at a time; use NDJSON for everything')
+        return _iter_csv(dataset, season_id)
+
+    datasets = list(DATASETS) if dataset == 'all' else [dataset]
+    return _iter_ndjson(datasets, season_id)
+
+
+def export_filename(dataset, fmt, season=None):
+    suffix = f"_{season.name.replace('/', '-')}" if season else ''
+    return f'{dataset}{suffix}.{fmt}'
@@ -0,0 +1,129 @@
+"""
+Head-to-head records between every pair of teams that have met in the
+league, across all seasons.
+
+Each pair is one HeadToHead row (lower team id first) holding the wins,
+draws, total scores and last meeting, so any lookup is a single read by
+the pair's unique index. refresh_head_to_head() works out records from
+the fixtures with one grouped query: for the pairs just scored on an
+upload, or for every pair in one pass over the whole history. A pair is
+always recalculated in full rather than adjusted, so re-uploaded or
+corrected scores can't double count.
+"""
+from collections import namedtuple
+
+from sqlalchemy import case, func, or_, select, tuple_
+
+from app import db
+from app.models import Fixture, HeadToHead, Season
+from app.reference import get_reference
+
+HeadToHeadRecord = namedtuple('HeadToHeadRecord', [
+    'team_id', 'opponent_id', 'opponent_name', 'played', 'wins', 'draws', 'losses', 'score_for',
+    'score_against', 'last_fixture_id', 'last_season_id', 'last_gameweek_number', 'last_score_for',
+    'last_score_against'
+])
+
+
+def team_pair(team_id, opponent_id):
+    """The (team_a_id, team_b_id) key a pair is stored under"""
+    return (team_id, opponent_id) if team_id < opponent_id else (opponent_id, team_id)
+
+
+def _pair_columns():
+    """team_a_id, team_b_id and their scores for each fixture, team A being the lower id"""
+    a_is_home = Fixture.home_team_id < Fixture.away_team_id
+    return (case((a_is_home, Fixture.home_team_id), else_=Fixture.away_team_id),
+            case((a_is_home, Fixture.away_team_id), else_=Fixture.home_team_id),
+            case((a_is_home, Fixture.home_score), else_=Fixture.away_score),
+            case((a_is_home, Fixture.away_score), else_=Fixture.home_score))
+
+
+def refresh_head_to_head(pairs=None):
+    """
+    Recalculate the records of the given (team_id, team_id) pairs from their
+    played fixtures, or of every pair if pairs is None. Returns the number
+    of pairs written or removed; the caller commits.
+    """
+    team_a, team_b, a_score, b_score = _pair_columns()
+    conditions = [Fixture.status == Fixture.PLAYED]
+    existing = HeadToHead.query
+    if pairs is not None:
+        pairs = {team_pair(*pair) for pair in pairs}
+        if not pairs:
+            return 0
+        conditions.append(tuple_(team_a, team_b).in_(pairs))
+        existing = existing.filter(tuple_(HeadToHead.team_a_id, HeadToHead.team_b_id).in_(pairs))
+    records = {(record.team_a_id, record.team_b_id): record for record in existing}
+
+    totals = db.session.execute(
+        select(team_a, team_b, func.count(),
+               func.sum(case((a_score > b_score, 1), else_=0)),
+               func.sum(case((a_score == b_score, 1), else_=0)),
+               func.sum(case((a_score < b_score, 1), else_=0)),
+               func.sum(a_score), func.sum(b_score))
+        .where(*conditions)
+        .group_by(team_a, team_b)
+    ).all()
+
+    rank = func.row_number().over(
+        partition_by=(team_a, team_b),
+        order_by=(Season.start_date.desc(), Season.id.desc(), Fixture.gameweek_number.desc(), Fixture.id.desc())
+    )
+    meetings = select(team_a.label('team_a_id'), team_b.label('team_b_id'), Fixture.id, Fixture.season_id,
+                      Fixture.gameweek_number, a_score.label('a_score'), b_score.label('b_score'),
+                      rank.label('rank')) \
+        .join(Season, Season.id == Fixture.season_id).where(*conditions).subquery()
+    last_meetings = {
+        (row.team_a_id, row.team_b_id): row
+        for row in db.session.execute(select(meetings).where(meetings.c.rank == 1))
+    }
+
+    written = 0
+    for team_a_id, team_b_id, played, a_wins, draws, b_wins, a_total, b_total in totals:
+        last = last_meetings[team_a_id, team_b_id]
+        record = records.pop((team_a_id, team_b_id), None)
+        if record is None:
+            record = HeadToHead(team_a_id=team_a_id, team_b_id=team_b_id)
+            db.session.add(record)
+        record.played, record.team_a_wins, record.draws, record.team_b_wins = played, a_wins, draws, b_wins
+        record.team_a_score, record.team_b_score = a_total, b_total
+        record.last_fixture_id, record.last_season_id = last.id, last.season_id
+        record.last_gameweek_number = last.gameweek_number
+        record.last_team_a_score, record.last_team_b_score = last.a_score, last.b_score
+        written += 1
+
+    # Pairs left over no longer have a played fixture between them
+    for record in records.values():
+        db.session.delete(record)
+    db.session.flush()
+    return written + len(records)
+
+
+def _as_record(row, team_id):
+    """A HeadToHead row seen from team_id's side"""
+    is_a = row.team_a_id == team_id
+    opponent_id = row.team_b_id if is_a else row.team_a_id
+    opponent = get_reference().team(opponent_id)
+    if is_a:
+        results = (row.team_a_wins, row.draws, row.team_b_wins, row.team_a_score, row.team_b_score)
+        last = (row.last_team_a_score, row.last_team_b_score)
+    else:
+        results = (row.team_b_wins, row.draws, row.team_a_wins, row.team_b_score, row.team_a_score)
+        last = (row.last_team_b_score, row.last_team_a_score)
+    return HeadToHeadRecord(team_id, opponent_id, opponent.name if opponent else '', row.played, *results,
+                            row.last_fixture_id, row.last_season_id, row.last_gameweek_number, *last)
+
+
+def head_to_head(team_id, opponent_id):
+    """team_id's HeadToHeadRecord against opponent_id, or None if they have never met"""
+    team_a_id, team_b_id = team_pair(team_id, opponent_id)
+    row = HeadToHead.query.filter_by(team_a_id=team_a_id, team_b_id=team_b_id).first()
+    return None if row is None else _as_record(row, team_id)
+
+
+def team_head_to_heads(team_id):
+    """A team's HeadToHeadRecords against every team it has met, most meetings first"""
+    rows = HeadToHead.query.filter(or_(HeadToHead.team_a_id == team_id, HeadToHead.team_b_id == team_id)).all()
+    return sorted((_as_record(row, team_id) for row in rows),
+                  key=lambda record: (-record.played, record.opponent_name))
@@ -1,31 +1,32 @@
-from flask import render_template, redirect, url_for, flash, request
+from flask import render_template, redirect, url_for, flash, request, make_response, session
+from flask_login import current_user
 from app.main import bp
-from app.models import Season, Division, Team, TeamSeason, Fixture, CupCompetition, Title, Gameweek, CupRound, Rule
-from app.models import ManagerMonth, ManagerOfTheMonth, CupGroup, CupGroupMatch, CupMatch
+from app.models import Team, TeamSeason, Fixture, CupCompetition, Title, CupRound, Rule
+from app.models import ManagerMonth, CupGroup, CupGroupMatch, CupMatch
 from app import db
-from sqlalchemy import or_, and_
-import markdown
+from app.reference import get_reference, get_current_season, get_season_or_404, get_division_or_404
+from app.standings import division_leaders, division_teams
+from app.motm import award_rows
+from app.cup import sync_cup_scores, advance_brackets
+from app.projections import get_projection
+from app.clinch import get_run_in
+from app.cup_scenarios import get_group_scenarios
+from app.all_play import get_all_play, team_all_play
+from app.ratings import power_rankings as season_power_rankings, rating_history
+from app.head_to_head import head_to_head as pair_record, team_head_to_heads
+from app.records import get_league_records
+from sqlalchemy import or_, and_, select
 
 @bp.route('/')
 @bp.route('/index')
 def index():
-    current_season = Season.query.filter_by(is_current=True).first()
+    current_season = get_current_season()
     if current_season:
-        divisions = Division.query.filter_by(season_id=current_season.id).order_by(
-            db.case(
-                {
-                    'Premier League': 1,
-                    'Championship': 2,
-                    'League One': 3
-                },
-                value=Division.name,
-                else_=99
-            )
-        ).all()
         return render_template('main/index.html', 
                              title='Home',
                              season=current_season,
-                             divisions=divisions)
+                             divisions=get_reference().season_divisions(current_season.id),
+                             leaders=division_leaders(current_season.id))
     return render_template('main/index.html', title='Home')
 
 @bp.route('/league_tables')
@@ -43,11 +44,11 @@ def league_tables(season_id=None, division_id=None):
                               division_id=form_division_id))
     
     # Get all seasons for the dropdown, most recent first
-    all_seasons = Season.query.order_by(Season.start_date.desc()).all()
+    all_seasons = get_reference().seasons
     
     # Get current season if no season_id provided
     if season_id is None:
-        current_season = Season.query.filter_by(is_current=True).first()
+        current_season = get_current_season()
         if current_season:
             return redirect(url_for('main.league_tables', season_id=current_season.id))
         elif all_seasons:
@@ -56,20 +57,10 @@ def league_tables(season_id=None, division_id=None):
     selected_season = None
     divisions = []
     if season_id:
-        selected_season = Season.query.get_or_404(season_id)
+        selected_season = get_season_or_404(season_id)
         
         # Get all divisions ordered correctly
-        divisions = Division.query.filter_by(season_id=selected_season.id).order_by(
-            db.case(
-                {
-                    'Premier League': 1,
-                    'Championship': 2,
-                    'League One': 3
-                },
-                value=Division.name,
-                else_=99
-            )
-        ).all()
+        divisions = get_reference().season_divisions(selected_season.id)
         
         # If no division selected, select Premier League by default
         if division_id is None:
@@ -81,9 +72,12 @@ def league_tables(season_id=None, division_id=None):
         
         selected_division = None
         standings = []
+        odds = {}
+        run_in = {}
+        all_play = []
         
         if division_id:
-            selected_division = Division.query.get_or_404(division_id)
+            selected_division = get_division_or_404(division_id)
             if selected_division.season_id != selected_season.id:
                 return redirect(url_for('main.league_tables', 
                                       season_id=selected_season.id))
@@ -96,10 +90,21 @@ def league_tables(season_id=None, division_id=None):
                 TeamSeason.points.desc(),
                 TeamSeason.total_score.desc()
             ).all()
+            
+            # Title, promotion and relegation odds while there are fixtures left to play
+            projection = get_projection(selected_season.id)
+            division_projection = projection.division(selected_division.id) if projection.remaining_fixtures else None
+            if division_projection:
+                odds = {team_id: division_projection.odds(team_id) for team_id in division_projection.team_ids}
+            run_in = get_run_in(selected_season.id).get(selected_division.id, {})
+            all_play = get_all_play(selected_season.id).get(selected_division.id, [])
         
         return render_template('main/league_tables.html',
                              title='League Tables',
                              standings=standings,
+                             odds=odds,
+                             run_in=run_in,
+                             all_play=all_play,
                              selected_season=selected_season,
                              selected_division=selected_division,
                              all_seasons=all_seasons,
@@ -112,45 +117,35 @@ def league_tables(season_id=None, division_id=None):
 @bp.route('/results')
 def results():
     # Get all seasons for dropdown, most recent first
-    all_seasons = Season.query.order_by(Season.start_date.desc()).all()
+    all_seasons = get_reference().seasons
     
     # Get season_id from request or use current season
     season_id = request.args.get('season_id', type=int)
     selected_season = None
     
     if season_id:
-        selected_season = Season.query.get_or_404(season_id)
+        selected_season = get_season_or_404(season_id)
     else:
-        selected_season = Season.query.filter_by(is_current=True).first() or (all_seasons[0] if all_seasons else None)
+        selected_season = get_current_season() or (all_seasons[0] if all_seasons else None)
     
     if selected_season:
         # Get all gameweeks for dropdown
-        gameweeks = Gameweek.query.filter_by(season_id=selected_season.id).order_by(Gameweek.number).all()
+        gameweeks = get_reference().season_gameweeks(selected_season.id)
         # Get all divisions for dropdown, in correct order
-        divisions = Division.query.filter_by(season_id=selected_season.id).order_by(
-            db.case(
-                {
-                    'Premier League': 1,
-                    'Championship': 2,
-                    'League One': 3
-                },
-                value=Division.name,
-                else_=99
-            )
-        ).all()
+        divisions = get_reference().season_divisions(selected_season.id)
         
         selected_gameweek = request.args.get('gameweek', type=int)
         selected_division_id = request.args.get('division', type=int)
         selected_team_id = request.args.get('team', type=int)
 
         # Build query
-        fixtures_query = Fixture.query.join(Gameweek).filter(Gameweek.season_id == selected_season.id)
+        fixtures_query = Fixture.query.filter(Fixture.season_id == selected_season.id)
         
         # Only completed games (both scores not None)
-        fixtures_query = fixtures_query.filter(Fixture.home_score.isnot(None), Fixture.away_score.isnot(None))
+        fixtures_query = fixtures_query.filter(Fixture.status == Fixture.PLAYED)
         
         if selected_gameweek:
-            fixtures_query = fixtures_query.filter(Gameweek.number == selected_gameweek)
+            fixtures_query = fixtures_query.filter(Fixture.gameweek_number == selected_gameweek)
         if selected_division_id:
             fixtures_query = fixtures_query.filter(Fixture.division_id == selected_division_id)
         if selected_team_id:
@@ -165,7 +160,7 @@ def results():
         ).order_by(Team._name).all()
 
         # Sort by descending gameweek (most recent first)
-        fixtures = fixtures_query.order_by(Gameweek.number.desc(), Fixture.division_id).all()
+        fixtures = fixtures_query.order_by(Fixture.gameweek_number.desc(), Fixture.division_id).all()
 
         return render_template('main/fixtures.html',
             title='Results',
@@ -185,46 +180,33 @@ def results():
 
 @bp.route('/fixtures')
 def fixtures():
-    current_season = Season.query.filter_by(is_current=True).first()
+    current_season = get_current_season()
     if current_season:
         # Get all gameweeks for dropdown
-        gameweeks = Gameweek.query.filter_by(season_id=current_season.id).order_by(Gameweek.number).all()
+        gameweeks = get_reference().season_gameweeks(current_season.id)
         # Get all divisions for dropdown, in correct order
-        divisions = Division.query.filter_by(season_id=current_season.id).order_by(
-            db.case(
-                {
-                    'Premier League': 1,
-                    'Championship': 2,
-                    'League One': 3
-                },
-                value=Division.name,
-                else_=99
-            )
-        ).all()
+        divisions = get_reference().season_divisions(current_season.id)
         
         selected_gameweek = request.args.get('gameweek', type=int)
         selected_division_id = request.args.get('division', type=int)
         selected_team_id = request.args.get('team', type=int)
 
         # Build query
-        fixtures_query = Fixture.query.join(Gameweek).filter(Gameweek.season_id == current_season.id)
+        fixtures_query = Fixture.query.filter(Fixture.season_id == current_season.id)
         
         # Only upcoming games (either score is None)
-        fixtures_query = fixtures_query.filter((Fixture.home_score.is_(None)) | (Fixture.away_score.is_(None)))
+        fixtures_query = fixtures_query.filter(Fixture.status == Fixture.SCHEDULED)
         
         if selected_gameweek:
-            fixtures_query = fixtures_query.filter(Gameweek.number == selected_gameweek)
+            fixtures_query = fixtures_query.filter(Fixture.gameweek_number == selected_gameweek)
         else:
             # Default: start at the next gameweek with any upcoming fixture
-            next_gw = Gameweek.query.filter(
-                Gameweek.season_id == current_season.id,
-                Fixture.query.filter(
-                    Fixture.gameweek_id == Gameweek.id,
-                    (Fixture.home_score.is_(None)) | (Fixture.away_score.is_(None))
-                ).exists()
-            ).order_by(Gameweek.number).first()
-            if next_gw:
-                fixtures_query = fixtures_query.filter(Gameweek.number >= next_gw.number)
+            next_gw_number = db.session.query(db.func.min(Fixture.gameweek_number)).filter(
+                Fixture.season_id == current_season.id,
+                Fixture.status == Fixture.SCHEDULED
+            ).scalar()
+            if next_gw_number:
+                fixtures_query = fixtures_query.filter(Fixture.gameweek_number >= next_gw_number)
         
         if selected_division_id:
             fixtures_query = fixtures_query.filter(Fixture.division_id == selected_division_id)
@@ -239,7 +221,7 @@ def fixtures():
             TeamSeason.division_id == selected_division_id if selected_division_id else True
         ).order_by(Team._name).all()
 
-        fixtures = fixtures_query.order_by(Gameweek.number.asc(), Fixture.division_id).all()
+        fixtures = fixtures_query.order_by(Fixture.gameweek_number.asc(), Fixture.division_id).all()
 
         return render_template('main/fixtures.html',
             title='Fixtures',
@@ -257,14 +239,14 @@ def fixtures():
 @bp.route('/cups')
 def cups():
     # Get all seasons for the dropdown
-    seasons = Season.query.order_by(Season.start_date.desc()).all()
+    seasons = get_reference().seasons
     
     # Get selected season from query params, default to current season
     selected_season_id = request.args.get('season_id', type=int)
     if selected_season_id:
-        selected_season = Season.query.get_or_404(selected_season_id)
+        selected_season = get_season_or_404(selected_season_id)
     else:
-        selected_season = Season.query.filter_by(is_current=True).first()
+        selected_season = get_current_season()
         if not selected_season and seasons:
             selected_season = seasons[0]
     
@@ -328,12 +310,11 @@ def cups():
         # Handle group stage view
         groups = CupGroup.query.filter_by(competition_id=cup.id).order_by(CupGroup.order).all()
         
-        # Update group scores
-        for group in groups:
-            for match in group.matches:
-                if match.home_team_id and match.away_team_id:
-                    match.update_scores_from_fixtures()
-        db.session.commit()
+        # Update group scores, then seed any knockout round they decide
+        _update_cup(cup)
+        
+        # Who is already through or out while group matches remain
+        scenarios = get_group_scenarios(cup.id) if not cup.group_stage_complete else {}
         
         return render_template(
             'main/cups.html',
@@ -342,7 +323,8 @@ def cups():
             selected_season=selected_season,
             cup=cup,
             view_type=view_type,
-            groups=groups
+            groups=groups,
+            scenarios=scenarios
         )
     else:
         # Handle knockout stage view
@@ -352,12 +334,8 @@ def cups():
             db.joinedload(CupRound.matches).joinedload(CupMatch.winner)
         ).filter_by(competition_id=cup.id).order_by(CupRound.order).all()
         
-        # Update match scores
-        for round in rounds:
-            for match in round.matches:
-                if match.home_team_id and match.away_team_id:
-                    match.update_scores_from_fixtures()
-        db.session.commit()
+        # Update match scores, then seed any round that has become decided
+        _update_cup(cup, rounds)
         
         return render_template(
             'main/cups.html',
@@ -369,6 +347,13 @@ def cups():
             rounds=rounds
         )
 
+def _update_cup(cup, rounds=None):
+    """Sync cup scores from the league and fill in the knockout rounds they decide"""
+    sync_cup_scores(cup)
+    db.session.commit()
+    if advance_brackets(cup, rounds):
+        db.session.commit()
+
 @bp.route('/cup/<int:cup_id>')
 def cup_detail(cup_id):
     cup = CupCompetition.query.get_or_404(cup_id)
@@ -378,7 +363,7 @@ def cup_detail(cup_id):
 @bp.route('/manager_of_the_month')
 def manager_of_the_month():
     """Display Manager of the Month standings with optional month filter."""
-    current_season = Season.query.filter_by(is_current=True).first()
+    current_season = get_current_season()
     if current_season:
         # Get all months, but group them by base name for selection
         all_months = ManagerMonth.query.filter_by(season_id=current_season.id).all()
@@ -429,32 +414,16 @@ def manager_of_the_month():
 @bp.route('/motm-winners')
 def motm_winners():
     """Display Manager of the Month winners with optional season filter."""
-    from app.models import Season
-    
     # Get the selected season from query parameters
     season_id = request.args.get('season_id', type=int)
     selected_season = None
     
     # Get all seasons for the dropdown
-    seasons = Season.query.order_by(Season.start_date.desc()).all()
-    
-    # Base query for awards
-    awards_query = ManagerOfTheMonth.query.join(
-        ManagerMonth
-    ).join(
-        Season
-    )
+    seasons = get_reference().seasons
     
-    # Apply season filter if selected
     if season_id:
-        selected_season = Season.query.get_or_404(season_id)
-        awards_query = awards_query.filter(Season.id == season_id)
-    
-    # Get ordered awards
-    awards = awards_query.order_by(
-        Season.start_date.desc(),
-        ManagerMonth.start_gameweek_id.desc()
-    ).all()
+        selected_season = get_season_or_404(season_id)
+    awards = award_rows(season_id=season_id or None)
     
     return render_template('main/motm_winners.html',
                          title='Manager of the Month Winners',
@@ -474,7 +443,7 @@ def team_profile(team_id):
     runners_up   = []
     team_season = None
 
-    current_season = Season.query.filter_by(is_current=True).first()
+    current_season = get_current_season()
     if current_season:
         # Figure out this team's division and position
         team_season = TeamSeason.query.filter_by(
@@ -557,29 +526,24 @@ def team_profile(team_id):
     # Get the next match (first unplayed fixture)
     next_match = None
     if team_season:
-        next_match = Fixture.query.join(
-            Gameweek, Fixture.gameweek_id == Gameweek.id
-        ).filter(
-            Gameweek.season_id == current_season.id,
+        next_match = Fixture.query.filter(
+            Fixture.season_id == current_season.id,
             or_(
                 Fixture.home_team_id == team.id,
                 Fixture.away_team_id == team.id
             ),
-            or_(Fixture.home_score.is_(None), Fixture.away_score.is_(None))
-        ).order_by(Gameweek.number).first()
+            Fixture.status == Fixture.SCHEDULED
+        ).order_by(Fixture.gameweek_number).first()
         
         # Get last 5 completed fixtures (most recent first)
-        recent_fixtures = Fixture.query.join(
-            Gameweek, Fixture.gameweek_id == Gameweek.id
-        ).filter(
-            Gameweek.season_id == current_season.id,
+        recent_fixtures = Fixture.query.filter(
+            Fixture.season_id == current_season.id,
             or_(
                 Fixture.home_team_id == team.id,
                 Fixture.away_team_id == team.id
             ),
-            Fixture.home_score.isnot(None),
-            Fixture.away_score.isnot(None)
-        ).order_by(Gameweek.number.desc()).limit(5).all()
+            Fixture.status == Fixture.PLAYED
+        ).order_by(Fixture.gameweek_number.desc()).limit(5).all()
 
         # Get current cup status
         current_cup = CupCompetition.query.filter_by(season_id=current_season.id).first()
@@ -622,35 +586,76 @@ def team_profile(team_id):
         runners_up=runners_up,
         next_match=next_match,
         fixtures=recent_fixtures,
-        cup_matches=cup_matches
+        cup_matches=cup_matches,
+        motm_awards=award_rows(team_id=team.id),
+        all_play=team_all_play(current_season.id, team.id) if team_season else None,
+        rating_history=rating_history(team.id),
+        head_to_heads=team_head_to_heads(team.id),
+        power_rank=next((row for row in season_power_rankings(current_season.id) if row.team_id == team.id), None)
+        if team_season else None
     )
 
+@bp.route('/head-to-head/<int:team_id>/<int:opponent_id>')
+def head_to_head(team_id, opponent_id):
+    """All-time league record between two teams"""
+    team = Team.query.get_or_404(team_id)
+    opponent = Team.query.get_or_404(opponent_id)
+    record = pair_record(team.id, opponent.id) if team.id != opponent.id else None
+    last_season = get_reference().season(record.last_season_id) if record else None
+    return render_template('main/head_to_head.html',
+                         title=f'{team.name} vs {opponent.name}',
+                         team=team,
+                         opponent=opponent,
+                         record=record,
+                         last_season=last_season)
+
+@bp.route('/power-rankings')
+def power_rankings():
+    """Every team of the current season ranked by power rating, across divisions"""
+    current_season = get_current_season()
+    if current_season:
+        return render_template('main/power_rankings.html',
+                             title='Power Rankings',
+                             season=current_season,
+                             rankings=season_power_rankings(current_season.id))
+    return render_template('main/power_rankings.html', title='Power Rankings')
+
+@bp.route('/records')
+def records():
+    """All-time league table and records across every season"""
+    return render_template('main/records.html',
+                         title='Records',
+                         records=get_league_records())
+
 @bp.route('/teams')
 def teams():
-    current_season = Season.query.filter_by(is_current=True).first()
+    current_season = get_current_season()
     if current_season:
-        divisions = Division.query.filter_by(
-            season_id=current_season.id
-        ).order_by(
-            db.case(
-                {
-                    'Premier League': 1,
-                    'Championship': 2,
-                    'League One': 3
-                },
-                value=Division.name,
-                else_=99
-            )
-        ).all()
         return render_template('main/teams.html',
                              title='Teams',
                              season=current_season,
-                             divisions=divisions)
+                             divisions=get_reference().season_divisions(current_season.id),
+                             division_teams=division_teams(current_season.id))
     return render_template('main/teams.html', title='Teams')
 
 @bp.route('/rules')
 def rules():
-    rule = Rule.query.first()
-    html = markdown.markdown(rule.content or '',
-                             extensions=['extra','sane_lists']) if rule else ''
-    return render_template('main/rules.html', content=html)
\ No newline at end of file
+    rule = db.session.execute(select(Rule.content_html, Rule.content_hash).order_by(Rule.id)).first()
+    html, content_hash = rule if rule else ('', 'empty')
+
+    # The navbar differs for visitors, managers and admins, so each gets its own tag
+    if not current_user.is_authenticated:
+        viewer = 'anon'
+    else:
+        viewer = 'admin' if current_user.is_admin else 'user'
+    etag = f'{content_hash[:32]}-{viewer}'
+
+    # Pending flash messages would be lost from a 304, so render those in full
+    if etag in request.if_none_match and not session.get('_flashes'):
+        response = make_response('', 304)
+    else:
+        response = make_response(render_template('main/rules.html', content=html))
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.vary.add('Cookie')
+    return response
\ No newline at end of file
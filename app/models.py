@@ -1,13 +1,46 @@
+import hashlib
 from datetime import datetime
+import markdown
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin
-from sqlalchemy import or_
+from sqlalchemy import and_, case, event, func, inspect, or_, select
+from sqlalchemy.orm import aliased, make_transient_to_detached
 from app import db, login_manager
+from app.cache import VersionedCache
 from app.utils import normalize_team_name
 
+class Score(db.TypeDecorator):
+    """
+    A Fantrax score (e.g. 92.75) stored as integer hundredths. Reads back as a
+    float, but equal scores always compare equal and SUM() runs on integers.
+    """
+    impl = db.Integer
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else int(round(value * 100))
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else value / 100
+
+# Users are reloaded when the user table changes, and at least this often
+USER_CACHE_SECONDS = 300
+
+def _load_user_row(user_id):
+    row = db.session.execute(select(User.__table__).where(User.id == user_id)).first()
+    return None if row is None else dict(row._mapping)
+
+_user_cache = VersionedCache(['user'], _load_user_row, ttl=USER_CACHE_SECONDS)
+
 @login_manager.user_loader
 def load_user(id):
-    return User.query.get(int(id))
+    row = _user_cache.get(int(id))
+    if row is None:
+        return None
+    # Attach a copy of the cached row to the session without querying it again
+    user = User(**row)
+    make_transient_to_detached(user)
+    return db.session.merge(user, load=False)
 
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -69,84 +102,74 @@ class Team(db.Model):
     def name(self, value):
         self._name = normalize_team_name(value)
 
+class TeamAlias(db.Model):
+    """Alternative spelling of a team name, confirmed by an admin during score upload"""
+    id = db.Column(db.Integer, primary_key=True)
+    alias = db.Column(db.String(128), unique=True, nullable=False)  # normalized key, see team_names.name_key
+    team_id = db.Column(db.Integer, db.ForeignKey('team.id'), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    team = db.relationship('Team', backref=db.backref('aliases', cascade='all, delete-orphan'))
+
 class TeamSeason(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     team_id = db.Column(db.Integer, db.ForeignKey('team.id'), nullable=False)
     season_id = db.Column(db.Integer, db.ForeignKey('season.id'), nullable=False)
     division_id = db.Column(db.Integer, db.ForeignKey('division.id'), nullable=False)
     points = db.Column(db.Integer, default=0)
-    total_score = db.Column(db.Float, default=0.0)
+    total_score = db.Column(Score, default=0.0)
     position = db.Column(db.Integer)
     
     def recalculate_totals(self):
-        """Recalculate total scores and points based on all fixtures"""
-        fixtures = Fixture.query.join(
-            Gameweek, Fixture.gameweek_id == Gameweek.id
+        """Recalculate total scores and points based on all fixtures, summed in SQL"""
+        is_home = Fixture.home_team_id == self.team_id
+        score_for = case((is_home, Fixture.home_score), else_=Fixture.away_score)
+        score_against = case((is_home, Fixture.away_score), else_=Fixture.home_score)
+        total_score, points = db.session.query(
+            func.coalesce(func.sum(score_for), 0),
+            func.coalesce(func.sum(case((score_for > score_against, 3), (score_for == score_against, 1), else_=0)), 0)
         ).filter(
-            Gameweek.season_id == self.season_id,
+            Fixture.season_id == self.season_id,
             or_(
                 Fixture.home_team_id == self.team_id,
                 Fixture.away_team_id == self.team_id
             ),
-            Fixture.home_score.isnot(None),
-            Fixture.away_score.isnot(None)
-        ).all()
-        
-        self.total_score = 0.0
-        self.points = 0
-        
-        for fixture in fixtures:
-            if fixture.home_team_id == self.team_id:
-                self.total_score += fixture.home_score
-                if fixture.home_score > fixture.away_score:
-                    self.points += 3
-                elif fixture.home_score == fixture.away_score:
-                    self.points += 1
-            else:
-                self.total_score += fixture.away_score
-                if fixture.away_score > fixture.home_score:
-                    self.points += 3
-                elif fixture.home_score == fixture.away_score:
-                    self.points += 1
+            Fixture.status == Fixture.PLAYED
+        ).one()
+
+        self.total_score = total_score
+        self.points = points
     
     @property
     def fixtures(self):
-        return Fixture.query.join(
-            Gameweek, Fixture.gameweek_id == Gameweek.id
-        ).filter(
-            Gameweek.season_id == self.season_id,
+        return Fixture.query.filter(
+            Fixture.season_id == self.season_id,
             or_(
                 Fixture.home_team_id == self.team_id,
                 Fixture.away_team_id == self.team_id
             )
-        ).order_by(Gameweek.number).all()
+        ).order_by(Fixture.gameweek_number).all()
     
     @property
     def played_matches(self):
-        return Fixture.query.join(
-            Gameweek, Fixture.gameweek_id == Gameweek.id
-        ).filter(
-            Gameweek.season_id == self.season_id,
+        return Fixture.query.filter(
+            Fixture.season_id == self.season_id,
             or_(
                 Fixture.home_team_id == self.team_id,
                 Fixture.away_team_id == self.team_id
             ),
-            Fixture.home_score.isnot(None),
-            Fixture.away_score.isnot(None)
+            Fixture.status == Fixture.PLAYED
         ).count()
     
     @property
     def wins(self):
-        played_fixtures = Fixture.query.join(
-            Gameweek, Fixture.gameweek_id == Gameweek.id
-        ).filter(
-            Gameweek.season_id == self.season_id,
+        played_fixtures = Fixture.query.filter(
+            Fixture.season_id == self.season_id,
             or_(
                 Fixture.home_team_id == self.team_id,
                 Fixture.away_team_id == self.team_id
             ),
-            Fixture.home_score.isnot(None),
-            Fixture.away_score.isnot(None)
+            Fixture.status == Fixture.PLAYED
         ).all()
         
         return sum(1 for f in played_fixtures if 
@@ -155,32 +178,26 @@ class TeamSeason(db.Model):
     
     @property
     def draws(self):
-        played_fixtures = Fixture.query.join(
-            Gameweek, Fixture.gameweek_id == Gameweek.id
-        ).filter(
-            Gameweek.season_id == self.season_id,
+        played_fixtures = Fixture.query.filter(
+            Fixture.season_id == self.season_id,
             or_(
                 Fixture.home_team_id == self.team_id,
                 Fixture.away_team_id == self.team_id
             ),
-            Fixture.home_score.isnot(None),
-            Fixture.away_score.isnot(None)
+            Fixture.status == Fixture.PLAYED
         ).all()
         
         return sum(1 for f in played_fixtures if f.home_score == f.away_score)
     
     @property
     def losses(self):
-        played_fixtures = Fixture.query.join(
-            Gameweek, Fixture.gameweek_id == Gameweek.id
-        ).filter(
-            Gameweek.season_id == self.season_id,
+        played_fixtures = Fixture.query.filter(
+            Fixture.season_id == self.season_id,
             or_(
                 Fixture.home_team_id == self.team_id,
                 Fixture.away_team_id == self.team_id
             ),
-            Fixture.home_score.isnot(None),
-            Fixture.away_score.isnot(None)
+            Fixture.status == Fixture.PLAYED
         ).all()
         
         return sum(1 for f in played_fixtures if 
@@ -189,16 +206,13 @@ class TeamSeason(db.Model):
     
     @property
     def goals_for(self):
-        played_fixtures = Fixture.query.join(
-            Gameweek, Fixture.gameweek_id == Gameweek.id
-        ).filter(
-            Gameweek.season_id == self.season_id,
+        played_fixtures = Fixture.query.filter(
+            Fixture.season_id == self.season_id,
             or_(
                 Fixture.home_team_id == self.team_id,
                 Fixture.away_team_id == self.team_id
             ),
-            Fixture.home_score.isnot(None),
-            Fixture.away_score.isnot(None)
+            Fixture.status == Fixture.PLAYED
         ).all()
         
         return sum(f.home_score if f.home_team_id == self.team_id else f.away_score 
@@ -206,16 +220,13 @@ class TeamSeason(db.Model):
     
     @property
     def goals_against(self):
-        played_fixtures = Fixture.query.join(
-            Gameweek, Fixture.gameweek_id == Gameweek.id
-        ).filter(
-            Gameweek.season_id == self.season_id,
+        played_fixtures = Fixture.query.filter(
+            Fixture.season_id == self.season_id,
             or_(
                 Fixture.home_team_id == self.team_id,
                 Fixture.away_team_id == self.team_id
             ),
-            Fixture.home_score.isnot(None),
-            Fixture.away_score.isnot(None)
+            Fixture.status == Fixture.PLAYED
         ).all()
         
         return sum(f.away_score if f.home_team_id == self.team_id else f.home_score 
@@ -223,17 +234,14 @@ class TeamSeason(db.Model):
     
     @property
     def recent_form(self):
-        recent_fixtures = Fixture.query.join(
-            Gameweek, Fixture.gameweek_id == Gameweek.id
-        ).filter(
-            Gameweek.season_id == self.season_id,
+        recent_fixtures = Fixture.query.filter(
+            Fixture.season_id == self.season_id,
             or_(
                 Fixture.home_team_id == self.team_id,
                 Fixture.away_team_id == self.team_id
             ),
-            Fixture.home_score.isnot(None),
-            Fixture.away_score.isnot(None)
-        ).order_by(Gameweek.number.desc()).limit(5).all()
+            Fixture.status == Fixture.PLAYED
+        ).order_by(Fixture.gameweek_number.desc()).limit(5).all()
         
         form = []
         for fixture in recent_fixtures:
@@ -266,15 +274,71 @@ class Fixture(db.Model):
     gameweek_id = db.Column(db.Integer, db.ForeignKey('gameweek.id'), nullable=False)
     home_team_id = db.Column(db.Integer, db.ForeignKey('team.id'), nullable=False)
     away_team_id = db.Column(db.Integer, db.ForeignKey('team.id'), nullable=False)
-    home_score = db.Column(db.Float)
-    away_score = db.Column(db.Float)
+    home_score = db.Column(Score)
+    away_score = db.Column(Score)
     division_id = db.Column(db.Integer, db.ForeignKey('division.id'), nullable=False)
+
+    # Copied from the gameweek on insert so season-scoped queries don't need to join it
+    season_id = db.Column(db.Integer, db.ForeignKey('season.id'), nullable=False)
+    gameweek_number = db.Column(db.Integer, nullable=False)
+
+    # scheduled until both scores are in; void fixtures are never counted
+    SCHEDULED = 'scheduled'
+    PLAYED = 'played'
+    VOID = 'void'
+    status = db.Column(db.String(16), nullable=False, default=SCHEDULED, server_default=SCHEDULED)
+
+    __table_args__ = (
+        db.Index('ix_fixture_season_home_team', 'season_id', 'home_team_id', 'gameweek_number'),
+        db.Index('ix_fixture_season_away_team', 'season_id', 'away_team_id', 'gameweek_number'),
+        db.Index('ix_fixture_season_gameweek', 'season_id', 'gameweek_number', 'division_id'),
+        db.Index('ix_fixture_season_status_gameweek', 'season_id', 'status', 'gameweek_number', 'division_id'),
+    )
     
     # Add relationships
     home_team = db.relationship('Team', foreign_keys=[home_team_id], backref='home_fixtures')
     away_team = db.relationship('Team', foreign_keys=[away_team_id], backref='away_fixtures')
     division = db.relationship('Division', backref='fixtures')
 
+    @property
+    def played(self):
+        return self.status == self.PLAYED
+
+    def record_score(self, home_score, away_score):
+        """Set both scores and mark the fixture played"""
+        self.home_score = home_score
+        self.away_score = away_score
+        self.status = self.PLAYED
+
+def _sync_status(fixture):
+    """Derive status from the scores for writers that only set scores"""
+    if fixture.status != Fixture.VOID:
+        scored = fixture.home_score is not None and fixture.away_score is not None
+        fixture.status = Fixture.PLAYED if scored else Fixture.SCHEDULED
+
+def _copy_gameweek_fields(connection, fixture):
+    gameweek = fixture.__dict__.get('gameweek')
+    if gameweek is None or gameweek.id != fixture.gameweek_id:
+        gameweek = connection.execute(
+            select(Gameweek.season_id, Gameweek.number).where(Gameweek.id == fixture.gameweek_id)
+        ).one()
+    fixture.season_id = gameweek.season_id
+    fixture.gameweek_number = gameweek.number
+
+@event.listens_for(Fixture, 'before_insert')
+def fill_gameweek_fields(mapper, connection, fixture):
+    """Copy season_id/gameweek_number from the gameweek unless the caller already set them, and set status"""
+    if fixture.season_id is None or fixture.gameweek_number is None:
+        _copy_gameweek_fields(connection, fixture)
+    _sync_status(fixture)
+
+@event.listens_for(Fixture, 'before_update')
+def refresh_gameweek_fields(mapper, connection, fixture):
+    """Keep the copied fields in step when a fixture is moved to another gameweek or scored"""
+    if inspect(fixture).attrs.gameweek_id.history.has_changes():
+        _copy_gameweek_fields(connection, fixture)
+    _sync_status(fixture)
+
 class CupCompetition(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(64), nullable=False)
@@ -305,72 +369,36 @@ class CupCompetition(db.Model):
                 db.session.rollback()
                 raise Exception(f"Error creating groups: {str(e)}")
     
+    @property
+    def qualification(self):
+        """Cached group tables and qualifiers, see app.cup"""
+        from app.cup import get_qualification
+        return get_qualification(self.id)
+
     @property
     def group_stage_complete(self):
         """Check if all group stage matches are complete"""
         if not self.has_groups:
             return False
-        
-        for group in self.groups:
-            for match in group.matches:
-                if match.home_score is None or match.away_score is None:
-                    return False
-        return True
+        return self.qualification.complete
     
     def get_group_winners(self):
         """Get first place teams from all groups, sorted by points then points for"""
         if not self.has_groups:
             return []
-        
-        winners = []
-        for group in self.groups:
-            table = group.group_table
-            if table:
-                winner = table[0]  # First place team
-                winners.append({
-                    'team': winner['team'],
-                    'group': group,
-                    'points': winner['points'],
-                    'goals_for': winner['goals_for'],
-                    'goal_difference': winner['goal_difference']
-                })
-        
-        # Sort by points, then goals for to determine top 8 for direct qualification
-        winners.sort(key=lambda x: (-x['points'], -x['goals_for']))
-        return winners
+        return self.qualification.winners
     
     def get_playoff_teams(self):
         """Get teams that go to playoff round (bottom 4 group winners + all second place teams)"""
         if not self.has_groups:
             return []
-        
-        winners = self.get_group_winners()
-        playoff_teams = []
-        
-        # Bottom 4 group winners (positions 8-11 in sorted list)
-        if len(winners) >= 8:
-            playoff_teams.extend(winners[8:])
-        
-        # All second place teams
-        for group in self.groups:
-            table = group.group_table
-            if len(table) >= 2:
-                second_place = table[1]  # Second place team
-                playoff_teams.append({
-                    'team': second_place['team'],
-                    'group': group,
-                    'points': second_place['points'],
-                    'goals_for': second_place['goals_for'],
-                    'goal_difference': second_place['goal_difference'],
-                    'position': 'Second'
-                })
-        
-        return playoff_teams
+        return self.qualification.playoff_teams
     
     def get_direct_qualifiers(self):
         """Get top 8 group winners who go directly to Round of 16"""
-        winners = self.get_group_winners()
-        return winners[:8] if len(winners) >= 8 else winners
+        if not self.has_groups:
+            return []
+        return self.qualification.direct_qualifiers
 
 class CupRound(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -401,10 +429,10 @@ class CupMatch(db.Model):
     round_id = db.Column(db.Integer, db.ForeignKey('cup_round.id'), nullable=False)
     home_team_id = db.Column(db.Integer, db.ForeignKey('team.id'))
     away_team_id = db.Column(db.Integer, db.ForeignKey('team.id'))
-    first_leg_home_score = db.Column(db.Float)
-    first_leg_away_score = db.Column(db.Float)
-    second_leg_home_score = db.Column(db.Float)
-    second_leg_away_score = db.Column(db.Float)
+    first_leg_home_score = db.Column(Score)
+    first_leg_away_score = db.Column(Score)
+    second_leg_home_score = db.Column(Score)
+    second_leg_away_score = db.Column(Score)
     winner_id = db.Column(db.Integer, db.ForeignKey('team.id'))
 
     # Relationships
@@ -446,59 +474,32 @@ class CupMatch(db.Model):
             total += self.second_leg_away_score
         return total
 
-    def update_scores_from_fixtures(self):
-        """Update cup match scores from league fixtures"""
+    def update_scores_from_fixtures(self, scores=None):
+        """
+        Update cup match scores from league fixtures. scores is a
+        team_gameweek_scores() lookup covering both legs; it is queried when
+        not given.
+        """
+        gameweek_ids = [gw_id for gw_id in (self.round.first_leg_gameweek_id, self.round.second_leg_gameweek_id)
+                        if gw_id]
+        if scores is None:
+            scores = team_gameweek_scores(gameweek_ids)
+
         # First leg
-        if self.round.first_leg_gameweek:
-            # home side
-            first_leg = Fixture.query.filter(
-                Fixture.gameweek_id == self.round.first_leg_gameweek_id,
-                ((Fixture.home_team_id == self.home_team_id) |
-                 (Fixture.away_team_id == self.home_team_id))
-            ).first()
-            if first_leg and first_leg.home_score is not None:
-                if first_leg.home_team_id == self.home_team_id:
-                    self.first_leg_home_score = first_leg.home_score
-                else:
-                    self.first_leg_home_score = first_leg.away_score
-
-            # away side
-            first_leg = Fixture.query.filter(
-                Fixture.gameweek_id == self.round.first_leg_gameweek_id,
-                ((Fixture.home_team_id == self.away_team_id) |
-                 (Fixture.away_team_id == self.away_team_id))
-            ).first()
-            if first_leg and first_leg.home_score is not None:
-                if first_leg.home_team_id == self.away_team_id:
-                    self.first_leg_away_score = first_leg.home_score
-                else:
-                    self.first_leg_away_score = first_leg.away_score
+        if self.round.first_leg_gameweek_id:
+            gameweek_id = self.round.first_leg_gameweek_id
+            if (gameweek_id, self.home_team_id) in scores:
+                self.first_leg_home_score = scores[gameweek_id, self.home_team_id]
+            if (gameweek_id, self.away_team_id) in scores:
+                self.first_leg_away_score = scores[gameweek_id, self.away_team_id]
 
         # Second leg
-        if self.round.second_leg_gameweek:
-            # home side
-            second_leg = Fixture.query.filter(
-                Fixture.gameweek_id == self.round.second_leg_gameweek_id,
-                ((Fixture.home_team_id == self.home_team_id) |
-                 (Fixture.away_team_id == self.home_team_id))
-            ).first()
-            if second_leg and second_leg.home_score is not None:
-                if second_leg.home_team_id == self.home_team_id:
-                    self.second_leg_home_score = second_leg.home_score
-                else:
-                    self.second_leg_home_score = second_leg.away_score
-
-            # away side
-            second_leg = Fixture.query.filter(
-                Fixture.gameweek_id == self.round.second_leg_gameweek_id,
-                ((Fixture.home_team_id == self.away_team_id) |
-                 (Fixture.away_team_id == self.away_team_id))
-            ).first()
-            if second_leg and second_leg.home_score is not None:
-                if second_leg.home_team_id == self.away_team_id:
-                    self.second_leg_away_score = second_leg.home_score
-                else:
-                    self.second_leg_away_score = second_leg.away_score
+        if self.round.second_leg_gameweek_id:
+            gameweek_id = self.round.second_leg_gameweek_id
+            if (gameweek_id, self.home_team_id) in scores:
+                self.second_leg_home_score = scores[gameweek_id, self.home_team_id]
+            if (gameweek_id, self.away_team_id) in scores:
+                self.second_leg_away_score = scores[gameweek_id, self.away_team_id]
 
         # Determine winner if both legs complete
         if self.first_leg_complete and self.second_leg_complete:
@@ -520,62 +521,7 @@ class CupGroup(db.Model):
     @property
     def group_table(self):
         """Get the group table with points, goals for/against"""
-        teams = {}
-        
-        # Initialize team stats
-        for team_entry in self.teams:
-            teams[team_entry.team_id] = {
-                'team': team_entry.team,
-                'played': 0,
-                'won': 0,
-                'drawn': 0,
-                'lost': 0,
-                'goals_for': 0,
-                'goals_against': 0,
-                'goal_difference': 0,
-                'points': 0
-            }
-        
-        # Calculate stats from matches
-        for match in self.matches:
-            if match.home_score is not None and match.away_score is not None:
-                home_stats = teams[match.home_team_id]
-                away_stats = teams[match.away_team_id]
-                
-                # Update played
-                home_stats['played'] += 1
-                away_stats['played'] += 1
-                
-                # Update goals
-                home_stats['goals_for'] += match.home_score
-                home_stats['goals_against'] += match.away_score
-                away_stats['goals_for'] += match.away_score
-                away_stats['goals_against'] += match.home_score
-                
-                # Update results and points
-                if match.home_score > match.away_score:
-                    home_stats['won'] += 1
-                    home_stats['points'] += 3
-                    away_stats['lost'] += 1
-                elif match.away_score > match.home_score:
-                    away_stats['won'] += 1
-                    away_stats['points'] += 3
-                    home_stats['lost'] += 1
-                else:
-                    home_stats['drawn'] += 1
-                    home_stats['points'] += 1
-                    away_stats['drawn'] += 1
-                    away_stats['points'] += 1
-        
-        # Calculate goal difference
-        for team_stats in teams.values():
-            team_stats['goal_difference'] = team_stats['goals_for'] - team_stats['goals_against']
-        
-        # Sort by points, then goal difference, then goals for
-        sorted_teams = sorted(teams.values(), 
-                            key=lambda x: (-x['points'], -x['goal_difference'], -x['goals_for']))
-        
-        return sorted_teams
+        return self.competition.qualification.table(self.id)
 
 class CupGroupTeam(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -591,44 +537,41 @@ class CupGroupMatch(db.Model):
     home_team_id = db.Column(db.Integer, db.ForeignKey('team.id'), nullable=False)
     away_team_id = db.Column(db.Integer, db.ForeignKey('team.id'), nullable=False)
     gameweek_id = db.Column(db.Integer, db.ForeignKey('gameweek.id'))  # Made optional
-    home_score = db.Column(db.Float)
-    away_score = db.Column(db.Float)
+    home_score = db.Column(Score)
+    away_score = db.Column(Score)
     
     # Relationships
     home_team = db.relationship('Team', foreign_keys=[home_team_id])
     away_team = db.relationship('Team', foreign_keys=[away_team_id])
     gameweek = db.relationship('Gameweek', backref='cup_group_matches')
     
-    def update_scores_from_fixtures(self):
-        """Update group match scores from league fixtures"""
+    def update_scores_from_fixtures(self, scores=None):
+        """
+        Update group match scores from league fixtures. scores is a
+        team_gameweek_scores() lookup covering the match's gameweek; it is
+        queried when not given.
+        """
         if not self.gameweek_id:
             return  # Can't update scores without a gameweek
-            
-        # Find the fixture for the home team in this gameweek
-        home_fixture = Fixture.query.filter(
-            Fixture.gameweek_id == self.gameweek_id,
-            ((Fixture.home_team_id == self.home_team_id) |
-             (Fixture.away_team_id == self.home_team_id))
-        ).first()
-        
-        # Find the fixture for the away team in this gameweek
-        away_fixture = Fixture.query.filter(
-            Fixture.gameweek_id == self.gameweek_id,
-            ((Fixture.home_team_id == self.away_team_id) |
-             (Fixture.away_team_id == self.away_team_id))
-        ).first()
-        
-        if home_fixture and home_fixture.home_score is not None:
-            if home_fixture.home_team_id == self.home_team_id:
-                self.home_score = home_fixture.home_score
-            else:
-                self.home_score = home_fixture.away_score
-                
-        if away_fixture and away_fixture.home_score is not None:
-            if away_fixture.home_team_id == self.away_team_id:
-                self.away_score = away_fixture.home_score
-            else:
-                self.away_score = away_fixture.away_score
+        if scores is None:
+            scores = team_gameweek_scores([self.gameweek_id])
+
+        if (self.gameweek_id, self.home_team_id) in scores:
+            self.home_score = scores[self.gameweek_id, self.home_team_id]
+        if (self.gameweek_id, self.away_team_id) in scores:
+            self.away_score = scores[self.gameweek_id, self.away_team_id]
+
+def team_gameweek_scores(gameweek_ids):
+    """{(gameweek_id, team_id): score} from the played league fixtures of those gameweeks"""
+    scores = {}
+    if not gameweek_ids:
+        return scores
+    for fixture in db.session.query(
+            Fixture.gameweek_id, Fixture.home_team_id, Fixture.away_team_id, Fixture.home_score, Fixture.away_score
+    ).filter(Fixture.gameweek_id.in_(set(gameweek_ids)), Fixture.status == Fixture.PLAYED):
+        scores.setdefault((fixture.gameweek_id, fixture.home_team_id), fixture.home_score)
+        scores.setdefault((fixture.gameweek_id, fixture.away_team_id), fixture.away_score)
+    return scores
 
 class ManagerMonth(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -656,36 +599,53 @@ class ManagerMonth(db.Model):
     @property
     def has_fixtures(self):
         """Check if all fixtures in all gameweeks for this month have scores."""
-        gameweeks = self.gameweeks
-        
-        for gameweek in gameweeks:
-            # Count fixtures with scores for this gameweek
-            fixtures_with_scores = Fixture.query.filter(
-                Fixture.gameweek_id == gameweek.id,
-                Fixture.home_score.isnot(None),
-                Fixture.away_score.isnot(None)
-            ).count()
-            
-            # Each gameweek should have 12 fixtures (6 per division)
-            if fixtures_with_scores < 12:
-                return False
-        
-        return True
+        return ManagerMonth.completeness([self]).get(self.id, False)
+
+    @staticmethod
+    def completeness(months):
+        """
+        {month_id: True if every gameweek in the month has fixtures and none
+        is still waiting for scores}, for many months in one grouped query.
+        """
+        if not months:
+            return {}
+        start = aliased(Gameweek)
+        end = aliased(Gameweek)
+        rows = db.session.query(
+            ManagerMonth.id,
+            func.count(Fixture.id),
+            func.count(case((Fixture.status == Fixture.SCHEDULED, 1)))
+        ).join(
+            start, start.id == ManagerMonth.start_gameweek_id
+        ).join(
+            end, end.id == ManagerMonth.end_gameweek_id
+        ).join(
+            Gameweek, and_(Gameweek.season_id == ManagerMonth.season_id,
+                              Gameweek.number.between(start.number, end.number))
+        ).outerjoin(
+            Fixture, Fixture.gameweek_id == Gameweek.id
+        ).filter(
+            ManagerMonth.id.in_([month.id for month in months])
+        ).group_by(ManagerMonth.id, Gameweek.id).all()
+
+        # A gameweek with no fixtures yet doesn't count as complete either
+        seen, incomplete = set(), set()
+        for month_id, fixtures, unscored in rows:
+            seen.add(month_id)
+            if fixtures == 0 or unscored:
+                incomplete.add(month_id)
+        return {month.id: month.id in seen and month.id not in incomplete for month in months}
     
     def get_team_stats(self, team_id):
         """Get a team's stats for this month."""
-        fixtures = Fixture.query.join(
-            Gameweek
-        ).filter(
-            Gameweek.season_id == self.season_id,
-            Gameweek.number >= self.start_gameweek.number,
-            Gameweek.number <= self.end_gameweek.number,
+        fixtures = Fixture.query.filter(
+            Fixture.season_id == self.season_id,
+            Fixture.gameweek_number.between(self.start_gameweek.number, self.end_gameweek.number),
             or_(
                 Fixture.home_team_id == team_id,
                 Fixture.away_team_id == team_id
             ),
-            Fixture.home_score.isnot(None),
-            Fixture.away_score.isnot(None)
+            Fixture.status == Fixture.PLAYED
         ).all()
         
         stats = {
@@ -737,14 +697,10 @@ class ManagerMonth(db.Model):
                 Fixture.home_team_id == Team.id,
                 Fixture.away_team_id == Team.id
             )
-        ).join(
-            Gameweek, Fixture.gameweek_id == Gameweek.id
         ).filter(
-            Gameweek.season_id == self.season_id,
-            Gameweek.number >= self.start_gameweek.number,
-            Gameweek.number <= self.end_gameweek.number,
-            Fixture.home_score.isnot(None),
-            Fixture.away_score.isnot(None)
+            Fixture.season_id == self.season_id,
+            Fixture.gameweek_number.between(self.start_gameweek.number, self.end_gameweek.number),
+            Fixture.status == Fixture.PLAYED
         )
         
         # If division specified, filter by division
@@ -779,7 +735,7 @@ class ManagerOfTheMonth(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     manager_month_id = db.Column(db.Integer, db.ForeignKey('manager_month.id'), nullable=False)
     team_id = db.Column(db.Integer, db.ForeignKey('team.id'), nullable=False)
-    total_score = db.Column(db.Float, nullable=False)
+    total_score = db.Column(Score, nullable=False)
     
     # Add relationships
     month = db.relationship('ManagerMonth', backref='awards')
@@ -798,4 +754,103 @@ class Title(db.Model):
 
 class Rule(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    content = db.Column(db.Text, nullable=False)
\ No newline at end of file
+    content = db.Column(db.Text, nullable=False)
+    # Rendered from content when it is saved; the hash is the rules page ETag
+    content_html = db.Column(db.Text, nullable=False, default='')
+    content_hash = db.Column(db.String(64), nullable=False, default='')
+
+def render_rules(content):
+    """Markdown source of the rules to (html, sha256 of the html)"""
+    html = markdown.markdown(content or '', extensions=['extra', 'sane_lists'])
+    return html, hashlib.sha256(html.encode('utf-8')).hexdigest()
+
+@event.listens_for(Rule, 'before_insert')
+@event.listens_for(Rule, 'before_update')
+def render_rule_content(mapper, connection, rule):
+    """Re-render the HTML whenever the markdown changes"""
+    if not rule.content_hash or inspect(rule).attrs.content.history.has_changes():
+        rule.content_html, rule.content_hash = render_rules(rule.content)
+
+class TeamRating(db.Model):
+    """A team's power rating after one of its fixtures, written by app.ratings"""
+    id = db.Column(db.Integer, primary_key=True)
+    team_id = db.Column(db.Integer, db.ForeignKey('team.id'), nullable=False)
+    # Not a foreign key: the rows of a deleted fixture have to outlive it so
+    # the next update sees them and replays the ratings from that point
+    fixture_id = db.Column(db.Integer, nullable=False)
+    season_id = db.Column(db.Integer, db.ForeignKey('season.id'), nullable=False)
+    division_id = db.Column(db.Integer, db.ForeignKey('division.id'), nullable=False)
+    gameweek_number = db.Column(db.Integer, nullable=False)
+    rating = db.Column(db.Float, nullable=False)
+    change = db.Column(db.Float, nullable=False)
+    # 1 win, 0.5 draw, 0 loss: the result the rating was built from
+    outcome = db.Column(db.Float, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('fixture_id', 'team_id', name='uq_team_rating_fixture_team'),
+        db.Index('ix_team_rating_team_season_gameweek', 'team_id', 'season_id', 'gameweek_number'),
+        db.Index('ix_team_rating_season_gameweek', 'season_id', 'gameweek_number'),
+    )
+
+class HeadToHead(db.Model):
+    """League record between two teams across all seasons, written by app.head_to_head"""
+    id = db.Column(db.Integer, primary_key=True)
+    # Each pair is stored once, with the lower team id as team A
+    team_a_id = db.Column(db.Integer, db.ForeignKey('team.id'), nullable=False)
+    team_b_id = db.Column(db.Integer, db.ForeignKey('team.id'), nullable=False)
+    played = db.Column(db.Integer, nullable=False, default=0)
+    team_a_wins = db.Column(db.Integer, nullable=False, default=0)
+    draws = db.Column(db.Integer, nullable=False, default=0)
+    team_b_wins = db.Column(db.Integer, nullable=False, default=0)
+    team_a_score = db.Column(Score, nullable=False, default=0.0)
+    team_b_score = db.Column(Score, nullable=False, default=0.0)
+    # The most recent meeting; not a foreign key so deleting a fixture
+    # doesn't have to touch this table first
+    last_fixture_id = db.Column(db.Integer, nullable=False)
+    last_season_id = db.Column(db.Integer, db.ForeignKey('season.id'), nullable=False)
+    last_gameweek_number = db.Column(db.Integer, nullable=False)
+    last_team_a_score = db.Column(Score, nullable=False)
+    last_team_b_score = db.Column(Score, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('team_a_id', 'team_b_id', name='uq_head_to_head_pair'),
+        db.CheckConstraint('team_a_id < team_b_id', name='ck_head_to_head_pair_order'),
+        db.Index('ix_head_to_head_team_b', 'team_b_id'),
+    )
+
+class TeamRecord(db.Model):
+    """A team's all-time league record across every season, written by app.records"""
+    id = db.Column(db.Integer, primary_key=True)
+    team_id = db.Column(db.Integer, db.ForeignKey('team.id'), nullable=False, unique=True)
+    played = db.Column(db.Integer, nullable=False, default=0)
+    wins = db.Column(db.Integer, nullable=False, default=0)
+    draws = db.Column(db.Integer, nullable=False, default=0)
+    losses = db.Column(db.Integer, nullable=False, default=0)
+    points = db.Column(db.Integer, nullable=False, default=0)
+    score_for = db.Column(Score, nullable=False, default=0.0)
+    score_against = db.Column(Score, nullable=False, default=0.0)
+    highest_score = db.Column(Score)
+    highest_score_fixture_id = db.Column(db.Integer)
+    biggest_win_margin = db.Column(Score)
+    biggest_win_fixture_id = db.Column(db.Integer)
+    longest_win_streak = db.Column(db.Integer, nullable=False, default=0)
+    longest_unbeaten_streak = db.Column(db.Integer, nullable=False, default=0)
+    # Streaks still running at the last fixture counted, carried into the next update
+    current_win_streak = db.Column(db.Integer, nullable=False, default=0)
+    current_unbeaten_streak = db.Column(db.Integer, nullable=False, default=0)
+    # The last fixture counted; later fixtures are added on the next update
+    last_fixture_id = db.Column(db.Integer, nullable=False)
+    last_season_id = db.Column(db.Integer, db.ForeignKey('season.id'), nullable=False)
+    last_gameweek_number = db.Column(db.Integer, nullable=False)
+
+class ChangeLog(db.Model):
+    """Append-only log of changed rows, used to build incremental backups and version caches"""
+    id = db.Column(db.Integer, primary_key=True)
+    table_name = db.Column(db.String(64), nullable=False)
+    row_id = db.Column(db.Integer)
+    changed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    # Newest change per table is the version number app.cache compares
+    __table_args__ = (
+        db.Index('ix_change_log_table_name_id', 'table_name', 'id'),
+    )
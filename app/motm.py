@@ -0,0 +1,184 @@
+"""
+Manager of the Month queries that work on many months at once: the
+winners' stats for a list of awards, and the award job that picks every
+completed month's winner, grouped in SQL over the played fixtures instead
+of one fixture scan per team and month.
+"""
+from collections import namedtuple
+
+from sqlalchemy import and_, select, tuple_
+from sqlalchemy.orm import aliased, joinedload
+
+from app import db
+from app.models import Gameweek, ManagerMonth, ManagerOfTheMonth, TeamSeason
+from app.reference import get_reference
+from app.standings import EMPTY_STATS, result_totals, stats_dict, team_results
+
+MonthResult = namedtuple('MonthResult', ['month_id', 'month_name', 'team_id', 'total_score', 'created'])
+
+AwardRow = namedtuple('AwardRow', [
+    'award_id', 'month_id', 'month_name', 'season_id', 'season_name', 'start_gameweek', 'end_gameweek',
+    'team_id', 'team_name', 'manager_name', 'division_name', 'stats'
+])
+
+StartGameweek = aliased(Gameweek)
+EndGameweek = aliased(Gameweek)
+
+
+def month_team_stats(pairs):
+    """{(month_id, team_id): stats} for each pair, in one grouped query"""
+    pairs = set(pairs)
+    if not pairs:
+        return {}
+    results = team_results()
+    rows = db.session.execute(
+        select(ManagerMonth.id.label('month_id'), results.c.team_id, *result_totals(results))
+        .join(StartGameweek, StartGameweek.id == ManagerMonth.start_gameweek_id)
+        .join(EndGameweek, EndGameweek.id == ManagerMonth.end_gameweek_id)
+        .join(results, and_(
+            results.c.season_id == ManagerMonth.season_id,
+            results.c.gameweek_number.between(StartGameweek.number, EndGameweek.number)
+        ))
+        .where(tuple_(ManagerMonth.id, results.c.team_id).in_(pairs))
+        .group_by(ManagerMonth.id, results.c.team_id)
+    )
+    return {(row.month_id, row.team_id): stats_dict(row) for row in rows}
+
+
+def month_division_name(month):
+    """Division a month is for, from its "<Month> - <Division>" name, or None for all"""
+    if ' - ' in month.name:
+        division_name = month.name.split(' - ', 1)[1]
+        if division_name != 'All':
+            return division_name
+    return None
+
+
+def month_winners(months):
+    """
+    {month_id: (team_id, points, goals_for)} for the leader of each month's
+    division, ranked as ManagerMonth.get_standings does, from one fixture
+    aggregation across all the months.
+    """
+    months = list(months)
+    if not months:
+        return {}
+    results = team_results()
+    totals = result_totals(results)
+    rows = db.session.execute(
+        select(ManagerMonth.id.label('month_id'), results.c.team_id, TeamSeason.division_id, *totals)
+        .join(StartGameweek, StartGameweek.id == ManagerMonth.start_gameweek_id)
+        .join(EndGameweek, EndGameweek.id == ManagerMonth.end_gameweek_id)
+        .join(results, and_(
+            results.c.season_id == ManagerMonth.season_id,
+            results.c.gameweek_number.between(StartGameweek.number, EndGameweek.number)
+        ))
+        .outerjoin(TeamSeason, and_(TeamSeason.team_id == results.c.team_id,
+                                    TeamSeason.season_id == ManagerMonth.season_id))
+        .where(ManagerMonth.id.in_([month.id for month in months]))
+        .group_by(ManagerMonth.id, results.c.team_id, TeamSeason.division_id)
+    )
+
+    reference = get_reference()
+    division_names = {month.id: month_division_name(month) for month in months}
+    winners = {}
+    for row in rows:
+        division_name = division_names[row.month_id]
+        if division_name is not None:
+            division = reference.division(row.division_id)
+            if division is None or division.name != division_name:
+                continue
+        stats = stats_dict(row)
+        # Most points, then most points scored; lowest team id settles exact ties
+        key = (stats['points'], stats['goals_for'], -row.team_id)
+        best = winners.get(row.month_id)
+        if best is None or key > best[0]:
+            winners[row.month_id] = (key, row.team_id, stats['points'], stats['goals_for'])
+    return {month_id: winner[1:] for month_id, winner in winners.items()}
+
+
+def award_completed_months(season_id=None):
+    """
+    Set ManagerMonth.winner_id and upsert the ManagerOfTheMonth award for
+    every month whose scores are all in. Safe to re-run: months already
+    awarded to the right team are left alone, and a corrected score moves
+    the award. Returns a MonthResult for each month awarded or changed; the
+    caller commits.
+    """
+    query = ManagerMonth.query.options(joinedload(ManagerMonth.awards))
+    if season_id is not None:
+        query = query.filter(ManagerMonth.season_id == season_id)
+    months = query.all()
+
+    complete = ManagerMonth.completeness(months)
+    months = [month for month in months if complete[month.id]]
+    winners = month_winners(months)
+
+    changed = []
+    for month in months:
+        winner = winners.get(month.id)
+        if winner is None:
+            continue
+        team_id, points, goals_for = winner
+
+        award = month.awards[0] if month.awards else None
+        created = award is None
+        if created:
+            award = ManagerOfTheMonth(month=month, team_id=team_id, total_score=goals_for)
+            db.session.add(award)
+        elif (award.team_id, award.total_score) == (team_id, goals_for) and month.winner_id == team_id:
+            continue
+        award.team_id = team_id
+        award.total_score = goals_for
+        month.winner_id = team_id
+        changed.append(MonthResult(month.id, month.name, team_id, goals_for, created))
+    return changed
+
+
+def award_rows(season_id=None, team_id=None):
+    """
+    AwardRows for the Manager of the Month awards of a season and/or team,
+    newest first, in three queries however many awards there are.
+    """
+    query = (
+        select(ManagerOfTheMonth.id, ManagerOfTheMonth.team_id, ManagerMonth.id.label('month_id'),
+               ManagerMonth.name, ManagerMonth.season_id, StartGameweek.number.label('start_number'),
+               EndGameweek.number.label('end_number'))
+        .join(ManagerMonth, ManagerMonth.id == ManagerOfTheMonth.manager_month_id)
+        .join(StartGameweek, StartGameweek.id == ManagerMonth.start_gameweek_id)
+        .join(EndGameweek, EndGameweek.id == ManagerMonth.end_gameweek_id)
+    )
+    if season_id is not None:
+        query = query.where(ManagerMonth.season_id == season_id)
+    if team_id is not None:
+        query = query.where(ManagerOfTheMonth.team_id == team_id)
+    awards = db.session.execute(query).all()
+    if not awards:
+        return []
+
+    stats = month_team_stats((award.month_id, award.team_id) for award in awards)
+    divisions = dict(
+        ((row.season_id, row.team_id), row.division_id) for row in db.session.execute(
+            select(TeamSeason.season_id, TeamSeason.team_id, TeamSeason.division_id)
+            .where(TeamSeason.team_id.in_({award.team_id for award in awards}))
+        )
+    )
+
+    reference = get_reference()
+    rows = []
+    for award in awards:
+        season = reference.season(award.season_id)
+        team = reference.team(award.team_id)
+        division = reference.division(divisions.get((award.season_id, award.team_id)))
+        rows.append(AwardRow(
+            award.id, award.month_id, award.name, award.season_id, season.name if season else '',
+            award.start_number, award.end_number, award.team_id,
+            team.name if team else '', team.manager_name if team else '',
+            division.name if division else '',
+            stats.get((award.month_id, award.team_id), EMPTY_STATS)
+        ))
+
+    # Newest season first, then latest month first
+    rows.sort(key=lambda row: (reference.season(row.season_id).start_date, row.start_gameweek), reverse=True)
+    return rows
+
@@ -0,0 +1,223 @@
+"""
+Monte Carlo projection of the rest of a season.
+
+Each team's gameweek score is modelled as a normal distribution fitted to
+its played fixtures, shrunk towards the league-wide distribution while it
+has only a few games behind it. The remaining schedule of every division
+is then played out many times at once with NumPy: one matrix of simulated
+scores per batch, turned into points with a matrix product against the
+schedule, and ranked on points then points scored as the tables are.
+The result is a matrix per division of the probability of each team
+finishing in each position, cached until a fixture or standing changes.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from sqlalchemy import select
+
+from app import db
+from app.cache import VersionedCache
+from app.models import Fixture, TeamSeason
+from app.reference import get_reference
+from app.standings import team_results
+
+SIMULATIONS = 20000
+BATCH_SIZE = 5000
+
+# Pseudo-games of league-average scoring added to every team's record
+PRIOR_GAMES = 4
+
+# Places at the top and bottom of a division that go up or down
+PROMOTION_PLACES = 2
+RELEGATION_PLACES = 2
+
+# Scores are quoted in quarter points, so simulated scores are too and draws can happen
+SCORE_STEP = 0.25
+
+# Cached projections use a fixed seed so a page shows the same odds until the data changes
+PROJECTION_SEED = 2024
+
+
+def fit_scoring(scores_by_team, team_ids):
+    """Per-team (mean, sd) arrays of gameweek scores, shrunk towards the league-wide mean and sd"""
+    all_scores = np.array([score for scores in scores_by_team.values() for score in scores], dtype=float)
+    league_mean = all_scores.mean() if all_scores.size else 0.0
+    league_sd = all_scores.std() if all_scores.size > 1 else 1.0
+    league_sd = max(league_sd, 1.0)
+
+    means = np.empty(len(team_ids))
+    sds = np.empty(len(team_ids))
+    for i, team_id in enumerate(team_ids):
+        scores = np.asarray(scores_by_team.get(team_id, ()), dtype=float)
+        n = scores.size
+        means[i] = (scores.sum() + PRIOR_GAMES * league_mean) / (n + PRIOR_GAMES)
+        variance = (((scores - means[i]) ** 2).sum() + PRIOR_GAMES * league_sd ** 2) / (n + PRIOR_GAMES)
+        sds[i] = max(np.sqrt(variance), 1.0)
+    return means, sds
+
+
+def simulate(means, sds, points, totals, home, away, divisions, simulations, seed=None):
+    """
+    Play out the remaining fixtures `simulations` times.
+
+    means, sds, points and totals are per-team arrays; home and away index
+    the teams of each remaining fixture; divisions is a list of team index
+    arrays, one per division. Returns (counts, point_sums): a list of
+    position-count matrices, counts[d][i, p] being how often team i of
+    division d finished in position p (0 = top), and each team's final
+    points summed over the simulations.
+    """
+    rng = np.random.default_rng(seed)
+    n_teams = len(means)
+    n_fixtures = len(home)
+
+    # Fixture-to-team incidence matrices, so points per team are a matrix product
+    home_incidence = np.zeros((n_fixtures, n_teams), dtype=np.float32)
+    away_incidence = np.zeros((n_fixtures, n_teams), dtype=np.float32)
+    home_incidence[np.arange(n_fixtures), home] = 1
+    away_incidence[np.arange(n_fixtures), away] = 1
+
+    counts = [np.zeros((len(teams), len(teams)), dtype=np.int64) for teams in divisions]
+    point_sums = np.zeros(n_teams)
+    done = 0
+    while done < simulations:
+        batch = min(BATCH_SIZE, simulations - done)
+        done += batch
+
+        noise = rng.standard_normal((batch, 2, n_fixtures), dtype=np.float32)
+        home_scores = np.round((means[home] + sds[home] * noise[:, 0]) / SCORE_STEP) * SCORE_STEP
+        away_scores = np.round((means[away] + sds[away] * noise[:, 1]) / SCORE_STEP) * SCORE_STEP
+
+        # 3/1/0 for the home side; the away side gets what's left of 3, less one more for a draw
+        draws = (home_scores == away_scores).astype(np.float32)
+        home_points = (home_scores > away_scores).astype(np.float32) * 3 + draws
+        away_points = 3 - home_points - draws
+        final_points = points + home_points @ home_incidence + away_points @ away_incidence
+        final_totals = totals + home_scores @ home_incidence + away_scores @ away_incidence
+        point_sums += final_points.sum(axis=0)
+
+        # Rank on points, then points scored: one sortable key per team
+        key = final_points.astype(np.float64) * 1e6 + final_totals
+        for d, teams in enumerate(divisions):
+            order = np.argsort(-key[:, teams], axis=1, kind='stable')
+            positions = np.empty_like(order)
+            np.put_along_axis(positions, order, np.arange(len(teams))[None, :], axis=1)
+            flat = np.arange(len(teams))[None, :] * len(teams) + positions
+            counts[d] += np.bincount(flat.ravel(), minlength=len(teams) ** 2).reshape(len(teams), len(teams))
+    return counts, point_sums
+
+
+def _simulate_chunk(args):
+    return simulate(*args)
+
+
+def simulate_parallel(means, sds, points, totals, home, away, divisions, simulations, seed=None, workers=None):
+    """simulate() split across a process pool, with independent random streams per worker"""
+    workers = workers or os.cpu_count() or 1
+    seeds = np.random.SeedSequence(seed).spawn(workers)
+    shares = [simulations // workers + (1 if i < simulations % workers else 0) for i in range(workers)]
+    jobs = [(means, sds, points, totals, home, away, divisions, share, child)
+            for share, child in zip(shares, seeds) if share]
+    with ProcessPoolExecutor(max_workers=len(jobs)) as pool:
+        results = list(pool.map(_simulate_chunk, jobs))
+    counts = [sum(parts) for parts in zip(*(result[0] for result in results))]
+    return counts, sum(result[1] for result in results)
+
+
+class DivisionProjection:
+    """Finishing-position probabilities for the teams of one division"""
+    __slots__ = ('division_id', 'team_ids', 'positions', 'expected_points', 'promotion_places',
+                 'relegation_places')
+
+    def __init__(self, division_id, team_ids, positions, expected_points, promotion_places, relegation_places):
+        self.division_id = division_id
+        self.team_ids = team_ids
+        self.positions = positions
+        self.expected_points = expected_points
+        self.promotion_places = promotion_places
+        self.relegation_places = relegation_places
+
+    def odds(self, team_id):
+        """Title, promotion and relegation probabilities of a team (None where they don't apply)"""
+        row = self.positions[self.team_ids.index(team_id)]
+        return {
+            'title': float(row[0]),
+            'promotion': float(row[:self.promotion_places].sum()) if self.promotion_places else None,
+            'relegation': float(row[len(row) - self.relegation_places:].sum()) if self.relegation_places else None,
+            'expected_points': float(self.expected_points[self.team_ids.index(team_id)]),
+        }
+
+
+class Projection:
+    __slots__ = ('season_id', 'simulations', 'remaining_fixtures', 'divisions')
+
+    def __init__(self, season_id, simulations, remaining_fixtures, divisions):
+        self.season_id = season_id
+        self.simulations = simulations
+        self.remaining_fixtures = remaining_fixtures
+        self.divisions = divisions
+
+    def division(self, division_id):
+        return self.divisions.get(division_id)
+
+
+def project_season(season_id, simulations=SIMULATIONS, workers=None, seed=None):
+    """Projection of a season's remaining fixtures, from three queries"""
+    standings = db.session.execute(
+        select(TeamSeason.team_id, TeamSeason.division_id, TeamSeason.points, TeamSeason.total_score)
+        .where(TeamSeason.season_id == season_id)
+        .order_by(TeamSeason.division_id, TeamSeason.team_id)
+    ).all()
+    results = team_results()
+    scores_by_team = {}
+    for team_id, score in db.session.execute(
+            select(results.c.team_id, results.c.score_for).where(results.c.season_id == season_id)):
+        scores_by_team.setdefault(team_id, []).append(score)
+    remaining = db.session.execute(
+        select(Fixture.home_team_id, Fixture.away_team_id)
+        .where(Fixture.season_id == season_id, Fixture.status == Fixture.SCHEDULED)
+    ).all()
+
+    team_ids = [row.team_id for row in standings]
+    index = {team_id: i for i, team_id in enumerate(team_ids)}
+    remaining = [(index[h], index[a]) for h, a in remaining if h in index and a in index]
+
+    reference = get_reference()
+    division_ids = sorted({row.division_id for row in standings},
+                          key=lambda d: reference.division(d).order if reference.division(d) else 99)
+    divisions = [np.array([i for i, row in enumerate(standings) if row.division_id == d]) for d in division_ids]
+
+    means, sds = fit_scoring(scores_by_team, team_ids)
+    points = np.array([row.points or 0 for row in standings], dtype=np.float32)
+    totals = np.array([row.total_score or 0 for row in standings], dtype=np.float64)
+    home = np.array([h for h, _ in remaining], dtype=np.intp)
+    away = np.array([a for _, a in remaining], dtype=np.intp)
+
+    args = (means.astype(np.float32), sds.astype(np.float32), points, totals, home, away, divisions, simulations)
+    if workers and workers > 1:
+        counts, point_sums = simulate_parallel(*args, seed=seed, workers=workers)
+    else:
+        counts, point_sums = simulate(*args, seed=seed)
+    expected_points = point_sums / simulations
+
+    projections = {}
+    for position, (division_id, teams) in enumerate(zip(division_ids, divisions)):
+        projections[division_id] = DivisionProjection(
+            division_id, [team_ids[i] for i in teams], counts[position] / simulations, expected_points[teams],
+            PROMOTION_PLACES if position > 0 else 0,
+            RELEGATION_PLACES if position < len(division_ids) - 1 else 0
+        )
+    return Projection(season_id, simulations, len(remaining), projections)
+
+
+def _load_projection(season_id):
+    return project_season(season_id, seed=PROJECTION_SEED)
+
+
+_projection_cache = VersionedCache([Fixture.__tablename__, TeamSeason.__tablename__], _load_projection)
+
+
+def get_projection(season_id):
+    """The cached projection of a season, recomputed after any fixture or standing changes"""
+    return _projection_cache.get(season_id)
@@ -0,0 +1,239 @@
+"""
+Elo power ratings across every season and division.
+
+Every played fixture moves both teams' ratings by K_FACTOR times the gap
+between the result (1 win, 0.5 draw, 0 loss) and the result the ratings
+expected. A team's first rating is set by the division it starts in, and
+at each new season a rating is pulled part of the way back to the
+baseline of the division the team now plays in. That way promoted and
+relegated teams land sensibly in a single cross-division ranking.
+
+One TeamRating row is stored per team per fixture. update_ratings() finds
+the earliest gameweek with a fixture that is newly scored, or changed or
+removed since it was rated. It deletes the rows from that gameweek on and
+replays the fixtures after it. After a normal upload that is just the
+latest gameweek; with no rows at all it walks the whole history once.
+Pages only ever read the stored rows.
+"""
+from collections import namedtuple
+
+from sqlalchemy import and_, case, func, or_, select
+
+from app import db
+from app.models import Fixture, Season, TeamRating, TeamSeason
+from app.reference import get_reference
+
+INITIAL_RATING = 1500.0
+# A new team starts this much lower for each division below the top
+DIVISION_STEP = 100.0
+K_FACTOR = 24.0
+# Share of a rating's distance from its division baseline kept into a new season
+SEASON_CARRYOVER = 0.75
+
+PowerRow = namedtuple('PowerRow', [
+    'rank', 'team_id', 'team_name', 'division_name', 'rating', 'last_change', 'season_change', 'played'
+])
+SeasonRating = namedtuple('SeasonRating', [
+    'season_id', 'season_name', 'division_name', 'played', 'start', 'end', 'high', 'low'
+])
+
+
+def expected_result(rating, opponent_rating):
+    """Expected result (0 to 1) of a team against an opponent"""
+    return 1 / (1 + 10 ** ((opponent_rating - rating) / 400))
+
+
+def baseline_rating(division_id):
+    """Starting rating for a division: INITIAL_RATING at the top, DIVISION_STEP less per division down"""
+    division = get_reference().division(division_id)
+    order = division.order if division else 99
+    return INITIAL_RATING - DIVISION_STEP * (order - 1 if order < 99 else 0)
+
+
+def _season_order():
+    """{season_id: index} in chronological order"""
+    seasons = sorted(get_reference().seasons, key=lambda season: (season.start_date, season.id))
+    return {season.id: index for index, season in enumerate(seasons)}
+
+
+def _home_outcome():
+    return case((Fixture.home_score > Fixture.away_score, 1.0),
+                (Fixture.home_score == Fixture.away_score, 0.5), else_=0.0)
+
+
+def _replay_start(order):
+    """Earliest (season_id, gameweek_number) whose ratings are missing or out of date, or None"""
+    rated = select(TeamRating.id).where(TeamRating.fixture_id == Fixture.id).exists()
+    positions = db.session.execute(
+        select(Fixture.season_id, func.min(Fixture.gameweek_number))
+        .where(Fixture.status == Fixture.PLAYED, ~rated)
+        .group_by(Fixture.season_id)
+    ).all()
+
+    expected_outcome = case((TeamRating.team_id == Fixture.home_team_id, _home_outcome()),
+                            else_=1 - _home_outcome())
+    stale = db.session.execute(
+        select(TeamRating.season_id, TeamRating.gameweek_number, Fixture.season_id, Fixture.gameweek_number)
+        .outerjoin(Fixture, Fixture.id == TeamRating.fixture_id)
+        .where(or_(
+            Fixture.id.is_(None),
+            Fixture.status != Fixture.PLAYED,
+            Fixture.season_id != TeamRating.season_id,
+            Fixture.division_id != TeamRating.division_id,
+            Fixture.gameweek_number != TeamRating.gameweek_number,
+            and_(TeamRating.team_id != Fixture.home_team_id, TeamRating.team_id != Fixture.away_team_id),
+            TeamRating.outcome != expected_outcome
+        ))
+    ).all()
+    for rated_season, rated_gameweek, season_id, gameweek_number in stale:
+        positions.append((rated_season, rated_gameweek))
+        if season_id is not None:
+            positions.append((season_id, gameweek_number))
+
+    positions = [(season_id, number) for season_id, number in positions if season_id in order]
+    if not positions:
+        return None
+    return min(positions, key=lambda position: (order[position[0]], position[1]))
+
+
+def _from_position(model, order, season_id, gameweek_number):
+    """Filter for rows of model at or after a season and gameweek"""
+    later = [other for other, index in order.items() if index > order[season_id]]
+    return or_(model.season_id.in_(later),
+               and_(model.season_id == season_id, model.gameweek_number >= gameweek_number))
+
+
+def latest_ratings():
+    """Subquery of each team's newest TeamRating: team_id, season_id, rating, change"""
+    rank = func.row_number().over(
+        partition_by=TeamRating.team_id,
+        order_by=(Season.start_date.desc(), Season.id.desc(), TeamRating.gameweek_number.desc(),
+                  TeamRating.id.desc())
+    )
+    ranked = select(TeamRating.team_id, TeamRating.season_id, TeamRating.rating, TeamRating.change,
+                    rank.label('rank')).join(Season, Season.id == TeamRating.season_id).subquery()
+    return select(ranked.c.team_id, ranked.c.season_id, ranked.c.rating, ranked.c.change) \
+        .where(ranked.c.rank == 1).subquery('latest_ratings')
+
+
+def update_ratings():
+    """
+    Rate every fixture scored, changed or removed since the last update,
+    replaying from the earliest gameweek affected. Returns the number of
+    fixtures rated; the caller commits.
+    """
+    order = _season_order()
+    start = _replay_start(order)
+    if start is None:
+        return 0
+
+    TeamRating.query.filter(_from_position(TeamRating, order, *start)).delete(synchronize_session=False)
+    latest = latest_ratings()
+    ratings = {row.team_id: (row.rating, row.season_id) for row in db.session.execute(select(latest))}
+
+    fixtures = db.session.execute(
+        select(Fixture.id, Fixture.season_id, Fixture.division_id, Fixture.gameweek_number,
+               Fixture.home_team_id, Fixture.away_team_id, Fixture.home_score, Fixture.away_score)
+        .join(Season, Season.id == Fixture.season_id)
+        .where(Fixture.status == Fixture.PLAYED, _from_position(Fixture, order, *start))
+        .order_by(Season.start_date, Season.id, Fixture.gameweek_number, Fixture.id)
+    ).all()
+
+    def current_rating(team_id, fixture):
+        rating, season_id = ratings.get(team_id, (None, None))
+        baseline = baseline_rating(fixture.division_id)
+        if rating is None:
+            return baseline
+        if season_id != fixture.season_id:
+            return baseline + (rating - baseline) * SEASON_CARRYOVER
+        return rating
+
+    rows = []
+    for fixture in fixtures:
+        home_rating = current_rating(fixture.home_team_id, fixture)
+        away_rating = current_rating(fixture.away_team_id, fixture)
+        home_outcome = 1.0 if fixture.home_score > fixture.away_score else \
+            0.5 if fixture.home_score == fixture.away_score else 0.0
+        change = K_FACTOR * (home_outcome - expected_result(home_rating, away_rating))
+
+        for team_id, rating, team_change, outcome in (
+                (fixture.home_team_id, home_rating, change, home_outcome),
+                (fixture.away_team_id, away_rating, -change, 1 - home_outcome)):
+            ratings[team_id] = (rating + team_change, fixture.season_id)
+            rows.append(TeamRating(
+                team_id=team_id, fixture_id=fixture.id, season_id=fixture.season_id,
+                division_id=fixture.division_id, gameweek_number=fixture.gameweek_number,
+                rating=rating + team_change, change=team_change, outcome=outcome
+            ))
+
+    db.session.add_all(rows)
+    db.session.flush()
+    return len(fixtures)
+
+
+def rebuild_ratings():
+    """Throw away every stored rating and walk the whole fixture history again; the caller commits"""
+    TeamRating.query.delete(synchronize_session=False)
+    return update_ratings()
+
+
+def power_rankings(season_id):
+    """PowerRows for the teams of a season, highest rating first, from the stored ratings"""
+    latest = latest_ratings()
+    rows = db.session.execute(
+        select(TeamSeason.team_id, TeamSeason.division_id, latest.c.rating, latest.c.change)
+        .join(latest, latest.c.team_id == TeamSeason.team_id)
+        .where(TeamSeason.season_id == season_id)
+        .order_by(latest.c.rating.desc())
+    ).all()
+    season_totals = dict(
+        (row.team_id, (row.played, row.season_change)) for row in db.session.execute(
+            select(TeamRating.team_id, func.count().label('played'), func.sum(TeamRating.change).label('season_change'))
+            .where(TeamRating.season_id == season_id)
+            .group_by(TeamRating.team_id)
+        )
+    )
+
+    reference = get_reference()
+    rankings = []
+    for rank, row in enumerate(rows, 1):
+        team = reference.team(row.team_id)
+        division = reference.division(row.division_id)
+        played, season_change = season_totals.get(row.team_id, (0, 0.0))
+        rankings.append(PowerRow(
+            rank, row.team_id, team.name if team else '', division.name if division else '',
+            row.rating, row.change if played else 0.0, season_change or 0.0, played
+        ))
+    return rankings
+
+
+def rating_history(team_id):
+    """SeasonRatings for a team, newest season first, from its stored ratings"""
+    rows = db.session.execute(
+        select(TeamRating.season_id, TeamRating.division_id, TeamRating.rating, TeamRating.change)
+        .join(Season, Season.id == TeamRating.season_id)
+        .where(TeamRating.team_id == team_id)
+        .order_by(Season.start_date, Season.id, TeamRating.gameweek_number, TeamRating.id)
+    ).all()
+
+    reference = get_reference()
+    seasons = []
+    for row in rows:
+        if not seasons or seasons[-1]['season_id'] != row.season_id:
+            seasons.append({'season_id': row.season_id, 'division_id': row.division_id, 'played': 0,
+                            'start': row.rating - row.change, 'high': row.rating, 'low': row.rating})
+        season = seasons[-1]
+        season['played'] += 1
+        season['end'] = row.rating
+        season['high'] = max(season['high'], row.rating)
+        season['low'] = min(season['low'], row.rating)
+
+    history = []
+    for season in reversed(seasons):
+        season_ref = reference.season(season['season_id'])
+        division = reference.division(season['division_id'])
+        history.append(SeasonRating(
+            season['season_id'], season_ref.name if season_ref else '', division.name if division else '',
+            season['played'], season['start'], season['end'], season['high'], season['low']
+        ))
+    return history
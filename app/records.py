@@ -0,0 +1,243 @@
+"""
+All-time league records: every team's totals across all seasons, plus the
+highest scores, biggest wins and longest streaks in league history.
+
+Each team has one TeamRecord row, built by streaming its played fixtures
+in season and gameweek order. The row keeps the last fixture counted and
+the streaks still running at that point, so update_records() only has to
+stream the fixtures played since. A team whose counted fixtures no longer
+add up to the stored totals (a score edited, voided or filled in out of
+order) is recounted from its first fixture instead. With no rows at all
+that is one pass over the whole history.
+
+The /records page reads the stored rows plus the small TeamSeason and
+Title tables, cached until one of them changes.
+"""
+from collections import namedtuple
+
+from sqlalchemy import case, func, or_, select, tuple_
+
+from app import db
+from app.cache import VersionedCache
+from app.models import Fixture, Team, TeamRecord, TeamSeason, Title
+from app.reference import get_reference
+from app.standings import team_results
+
+# Rows fetched at a time while streaming fixtures
+STREAM_BATCH = 1000
+# Entries listed for each league record
+RECORD_LIMIT = 5
+
+AllTimeRow = namedtuple('AllTimeRow', [
+    'rank', 'team_id', 'team_name', 'seasons', 'division_seasons', 'played', 'wins', 'draws', 'losses',
+    'points', 'score_for', 'score_against', 'league_titles', 'cup_titles'
+])
+RecordEntry = namedtuple('RecordEntry', ['team_id', 'team_name', 'value', 'match'])
+RecordMatch = namedtuple('RecordMatch', [
+    'opponent_id', 'opponent_name', 'season_name', 'gameweek_number', 'score_for', 'score_against'
+])
+LeagueRecords = namedtuple('LeagueRecords', [
+    'table', 'highest_scores', 'biggest_wins', 'win_streaks', 'unbeaten_streaks'
+])
+
+
+class _Tally:
+    """A team's running totals while its fixtures are streamed, copied to and from TeamRecord"""
+    __slots__ = ('played', 'wins', 'draws', 'losses', 'points', 'score_for', 'score_against',
+                 'highest_score', 'highest_score_fixture_id', 'biggest_win_margin', 'biggest_win_fixture_id',
+                 'longest_win_streak', 'longest_unbeaten_streak', 'current_win_streak',
+                 'current_unbeaten_streak', 'last_fixture_id', 'last_season_id', 'last_gameweek_number')
+
+    def __init__(self, record=None):
+        for field in self.__slots__:
+            setattr(self, field, getattr(record, field) if record is not None else None)
+        if record is None:
+            self.played = self.wins = self.draws = self.losses = self.points = 0
+            self.score_for = self.score_against = 0.0
+            self.longest_win_streak = self.longest_unbeaten_streak = 0
+            self.current_win_streak = self.current_unbeaten_streak = 0
+
+    def add(self, fixture_id, season_id, gameweek_number, score_for, score_against):
+        self.played += 1
+        # Kept to hundredths, as stored, so totals compare equal to the database's sums
+        self.score_for = round(self.score_for + score_for, 2)
+        self.score_against = round(self.score_against + score_against, 2)
+        if score_for > score_against:
+            self.wins += 1
+            self.points += 3
+            self.current_win_streak += 1
+            self.current_unbeaten_streak += 1
+            margin = round(score_for - score_against, 2)
+            if self.biggest_win_margin is None or margin > self.biggest_win_margin:
+                self.biggest_win_margin, self.biggest_win_fixture_id = margin, fixture_id
+        elif score_for == score_against:
+            self.draws += 1
+            self.points += 1
+            self.current_win_streak = 0
+            self.current_unbeaten_streak += 1
+        else:
+            self.losses += 1
+            self.current_win_streak = 0
+            self.current_unbeaten_streak = 0
+        self.longest_win_streak = max(self.longest_win_streak, self.current_win_streak)
+        self.longest_unbeaten_streak = max(self.longest_unbeaten_streak, self.current_unbeaten_streak)
+        if self.highest_score is None or score_for > self.highest_score:
+            self.highest_score, self.highest_score_fixture_id = score_for, fixture_id
+        self.last_fixture_id, self.last_season_id, self.last_gameweek_number = fixture_id, season_id, gameweek_number
+
+    def save(self, record):
+        for field in self.__slots__:
+            setattr(record, field, getattr(self, field))
+
+
+def update_records():
+    """
+    Count every fixture played since the last update into the teams'
+    records, recounting teams whose earlier fixtures changed. Returns the
+    number of records written or removed; the caller commits.
+    """
+    seasons = sorted(get_reference().seasons, key=lambda season: (season.start_date, season.id))
+    if not seasons:
+        return 0
+    season_rank = {season.id: index for index, season in enumerate(seasons)}
+    results = team_results()
+    season_order = case(season_rank, value=results.c.season_id)
+    position = tuple_(season_order, results.c.gameweek_number)
+    counted_through = tuple_(case(season_rank, value=TeamRecord.last_season_id), TeamRecord.last_gameweek_number)
+
+    records = {record.team_id: record for record in TeamRecord.query}
+    counted = {
+        row.team_id: (row.played, row.score_for, row.score_against) for row in db.session.execute(
+            select(results.c.team_id, func.count().label('played'),
+                   func.sum(results.c.score_for).label('score_for'),
+                   func.sum(results.c.score_against).label('score_against'))
+            .join(TeamRecord, TeamRecord.team_id == results.c.team_id)
+            .where(position <= counted_through)
+            .group_by(results.c.team_id)
+        )
+    }
+    recount = {team_id for team_id, record in records.items()
+               if counted.get(team_id, (0, 0.0, 0.0)) != (record.played, record.score_for, record.score_against)}
+
+    tallies = {team_id: _Tally() for team_id in recount}
+    rows = db.session.execute(
+        select(results.c.team_id, results.c.fixture_id, results.c.season_id, results.c.gameweek_number,
+               results.c.score_for, results.c.score_against)
+        .outerjoin(TeamRecord, TeamRecord.team_id == results.c.team_id)
+        .where(or_(TeamRecord.id.is_(None), results.c.team_id.in_(recount), position > counted_through))
+        .order_by(season_order, results.c.gameweek_number, results.c.fixture_id)
+        .execution_options(yield_per=STREAM_BATCH)
+    )
+    for team_id, *fixture in rows:
+        tally = tallies.get(team_id)
+        if tally is None:
+            tally = tallies[team_id] = _Tally(records.get(team_id))
+        tally.add(*fixture)
+
+    for team_id, tally in tallies.items():
+        record = records.get(team_id)
+        if tally.played == 0:
+            # Recounted with nothing left to count
+            db.session.delete(record)
+            continue
+        if record is None:
+            record = TeamRecord(team_id=team_id)
+            db.session.add(record)
+        tally.save(record)
+    db.session.flush()
+    return len(tallies)
+
+
+def rebuild_records():
+    """Throw away every stored record and count the whole fixture history again; the caller commits"""
+    TeamRecord.query.delete(synchronize_session=False)
+    return update_records()
+
+
+def _record_matches(reference, fixture_ids):
+    """{(fixture_id, team_id): RecordMatch} for the fixtures behind the listed records"""
+    matches = {}
+    fixtures = db.session.execute(
+        select(Fixture.id, Fixture.season_id, Fixture.gameweek_number, Fixture.home_team_id,
+               Fixture.away_team_id, Fixture.home_score, Fixture.away_score)
+        .where(Fixture.id.in_(fixture_ids))
+    ).all() if fixture_ids else []
+    season_names = {season.id: season.name for season in reference.seasons}
+    for fixture in fixtures:
+        for team_id, opponent_id, score_for, score_against in (
+                (fixture.home_team_id, fixture.away_team_id, fixture.home_score, fixture.away_score),
+                (fixture.away_team_id, fixture.home_team_id, fixture.away_score, fixture.home_score)):
+            opponent = reference.team(opponent_id)
+            matches[fixture.id, team_id] = RecordMatch(
+                opponent_id, opponent.name if opponent else '', season_names.get(fixture.season_id, ''),
+                fixture.gameweek_number, score_for, score_against
+            )
+    return matches
+
+
+def _load_records():
+    reference = get_reference()
+    records = TeamRecord.query.all()
+
+    division_seasons = {}
+    for team_id, division_id in db.session.execute(select(TeamSeason.team_id, TeamSeason.division_id)):
+        division = reference.division(division_id)
+        if division:
+            counts = division_seasons.setdefault(team_id, {})
+            counts[division.name] = counts.get(division.name, 0) + 1
+    orders = {division.name: division.order for division in reference.divisions}
+
+    titles = {}
+    for team_id, title_type, count in db.session.execute(
+            select(Title.team_id, Title.type, func.count())
+            .where(Title.is_runner_up.isnot(True))
+            .group_by(Title.team_id, Title.type)):
+        titles[team_id, title_type] = count
+
+    def team_name(team_id):
+        team = reference.team(team_id)
+        return team.name if team else ''
+
+    ranked = sorted(records, key=lambda record: (-record.points, -record.score_for, team_name(record.team_id)))
+    table = []
+    for rank, record in enumerate(ranked, 1):
+        by_division = sorted(division_seasons.get(record.team_id, {}).items(),
+                             key=lambda item: (orders.get(item[0], 99), item[0]))
+        table.append(AllTimeRow(
+            rank, record.team_id, team_name(record.team_id), sum(count for _, count in by_division),
+            by_division, record.played, record.wins, record.draws, record.losses, record.points,
+            record.score_for, record.score_against, titles.get((record.team_id, 'league'), 0),
+            titles.get((record.team_id, 'cup'), 0)
+        ))
+
+    def leaders(value):
+        listed = sorted((record for record in records if value(record)),
+                        key=lambda record: (-value(record), team_name(record.team_id)))
+        return listed[:RECORD_LIMIT]
+
+    highest = leaders(lambda record: record.highest_score)
+    biggest = leaders(lambda record: record.biggest_win_margin)
+    matches = _record_matches(reference, [record.highest_score_fixture_id for record in highest] +
+                              [record.biggest_win_fixture_id for record in biggest])
+
+    return LeagueRecords(
+        table,
+        [RecordEntry(record.team_id, team_name(record.team_id), record.highest_score,
+                     matches.get((record.highest_score_fixture_id, record.team_id))) for record in highest],
+        [RecordEntry(record.team_id, team_name(record.team_id), record.biggest_win_margin,
+                     matches.get((record.biggest_win_fixture_id, record.team_id))) for record in biggest],
+        [RecordEntry(record.team_id, team_name(record.team_id), record.longest_win_streak, None)
+         for record in leaders(lambda record: record.longest_win_streak)],
+        [RecordEntry(record.team_id, team_name(record.team_id), record.longest_unbeaten_streak, None)
+         for record in leaders(lambda record: record.longest_unbeaten_streak)],
+    )
+
+
+_records_cache = VersionedCache(
+    [TeamRecord.__tablename__, TeamSeason.__tablename__, Title.__tablename__, Team.__tablename__], _load_records
+)
+
+
+def get_league_records():
+    """LeagueRecords from the stored team records, cached until a record, season entry or title changes"""
+    return _records_cache.get()
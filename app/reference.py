@@ -0,0 +1,149 @@
+"""
+Cached reference data: seasons, divisions, gameweeks and teams.
+
+This changes a handful of times a season but is needed by nearly every
+page, so it is loaded once per worker into small __slots__ objects and
+reloaded only when one of the four tables changes (see app.cache).
+"""
+from flask import abort
+
+from app import db
+from app.cache import VersionedCache
+from app.models import Season, Division, Gameweek, Team
+
+# Display order of divisions; anything else sorts last
+DIVISION_ORDER = {
+    'Premier League': 1,
+    'Championship': 2,
+    'League One': 3
+}
+
+
+class SeasonRef:
+    __slots__ = ('id', 'name', 'start_date', 'end_date', 'is_current')
+
+    def __init__(self, id, name, start_date, end_date, is_current):
+        self.id = id
+        self.name = name
+        self.start_date = start_date
+        self.end_date = end_date
+        self.is_current = bool(is_current)
+
+
+class DivisionRef:
+    __slots__ = ('id', 'name', 'season_id')
+
+    def __init__(self, id, name, season_id):
+        self.id = id
+        self.name = name
+        self.season_id = season_id
+
+    @property
+    def order(self):
+        return DIVISION_ORDER.get(self.name, 99)
+
+
+class GameweekRef:
+    __slots__ = ('id', 'number', 'season_id', 'deadline', 'is_current')
+
+    def __init__(self, id, number, season_id, deadline, is_current):
+        self.id = id
+        self.number = number
+        self.season_id = season_id
+        self.deadline = deadline
+        self.is_current = bool(is_current)
+
+
+class TeamRef:
+    __slots__ = ('id', 'name', 'manager_name')
+
+    def __init__(self, id, name, manager_name):
+        self.id = id
+        self.name = name
+        self.manager_name = manager_name
+
+
+class ReferenceData:
+    """One consistent snapshot of the reference tables"""
+    __slots__ = ('seasons', 'current_season', 'divisions', 'gameweeks', 'teams',
+                 '_seasons_by_id', '_divisions_by_id', '_gameweeks_by_id', '_teams_by_id',
+                 '_divisions_by_season', '_gameweeks_by_season')
+
+    def __init__(self, seasons, divisions, gameweeks, teams):
+        self.seasons = sorted(seasons, key=lambda s: s.start_date, reverse=True)
+        self.current_season = next((s for s in self.seasons if s.is_current), None)
+        self.divisions = sorted(divisions, key=lambda d: (d.order, d.id))
+        self.gameweeks = sorted(gameweeks, key=lambda gw: (gw.season_id, gw.number))
+        self.teams = sorted(teams, key=lambda t: t.name)
+
+        self._seasons_by_id = {s.id: s for s in self.seasons}
+        self._divisions_by_id = {d.id: d for d in self.divisions}
+        self._gameweeks_by_id = {gw.id: gw for gw in self.gameweeks}
+        self._teams_by_id = {t.id: t for t in self.teams}
+        self._divisions_by_season = {}
+        for division in self.divisions:
+            self._divisions_by_season.setdefault(division.season_id, []).append(division)
+        self._gameweeks_by_season = {}
+        for gameweek in self.gameweeks:
+            self._gameweeks_by_season.setdefault(gameweek.season_id, []).append(gameweek)
+
+    def season(self, season_id):
+        return self._seasons_by_id.get(season_id)
+
+    def division(self, division_id):
+        return self._divisions_by_id.get(division_id)
+
+    def gameweek(self, gameweek_id):
+        return self._gameweeks_by_id.get(gameweek_id)
+
+    def team(self, team_id):
+        return self._teams_by_id.get(team_id)
+
+    def season_divisions(self, season_id):
+        """Divisions of a season in display order"""
+        return self._divisions_by_season.get(season_id, [])
+
+    def season_gameweeks(self, season_id):
+        """Gameweeks of a season by number"""
+        return self._gameweeks_by_season.get(season_id, [])
+
+
+def _load_reference():
+    return ReferenceData(
+        [SeasonRef(*row) for row in db.session.query(
+            Season.id, Season.name, Season.start_date, Season.end_date, Season.is_current)],
+        [DivisionRef(*row) for row in db.session.query(Division.id, Division.name, Division.season_id)],
+        [GameweekRef(*row) for row in db.session.query(
+            Gameweek.id, Gameweek.number, Gameweek.season_id, Gameweek.deadline, Gameweek.is_current)],
+        [TeamRef(*row) for row in db.session.query(Team.id, Team._name, Team.manager_name)],
+    )
+
+
+_reference_cache = VersionedCache(
+    [Season.__tablename__, Division.__tablename__, Gameweek.__tablename__, Team.__tablename__],
+    _load_reference
+)
+
+
+def get_reference():
+    """The current reference snapshot"""
+    return _reference_cache.get()
+
+
+def get_current_season():
+    """The current season as a SeasonRef, or None"""
+    return get_reference().current_season
+
+
+def get_season_or_404(season_id):
+    season = get_reference().season(season_id)
+    if season is None:
+        abort(404)
+    return season
+
+
+def get_division_or_404(division_id):
+    division = get_reference().division(division_id)
+    if division is None:
+        abort(404)
+    return division
@@ -0,0 +1,93 @@
+"""
+Parser for pasted or uploaded Fantrax score lines.
+
+Each line holds one match: home team, home score, away team, away score.
+Fantrax copies come out tab separated, padded with runs of spaces, or, once
+they have been through a chat app, single-space separated. Names and
+scores can be decorated with emoji (👑 for the league leader, 🏆 for the
+gameweek winner), which are left out of the parsed names. Column-separated lines are matched with one pattern.
+Single-space lines are matched twice, with the home name taken as short
+and as long as possible. The line is only accepted when both agree, so a
+team name containing a number is never mistaken for a score.
+"""
+import codecs
+import re
+from collections import namedtuple
+
+ScoreLine = namedtuple('ScoreLine', ['line_no', 'home', 'home_score', 'away', 'away_score'])
+
+# Emoji Fantrax (or a chat app) adds around names and scores: 👑, 🏆, variation selectors
+_EMOJI_CHARS = r'\u2600-\u27bf\ufe0f\u200d\U0001f000-\U0001faff'
+_EMOJI = rf'[{_EMOJI_CHARS}]'
+_DECORATION = rf'(?:[ \t]*{_EMOJI}+)*'
+
+# Names and scores are captured without their decorations, e.g. "Dango Unchained 👑", "96.5 🏆"
+_NAME = rf'{_EMOJI}*[ \t]*([^\s{_EMOJI_CHARS}]\S*(?: \S+)*?){_DECORATION}'
+_SCORE = rf'{_EMOJI}*[ \t]*(-?\d+(?:\.\d+)?){_DECORATION}'
+
+# A tab or a run of two or more spaces separates columns
+_COLUMN_SEP = re.compile(r'\t| {2,}')
+_COLUMNS = re.compile(
+    rf'^\s*{_NAME}\s*(?:\t| {{2,}})\s*{_SCORE}\s*(?:\t| {{2,}})\s*{_NAME}\s*(?:\t| {{2,}})\s*{_SCORE}\s*$'
+)
+_SPACED_SHORT = re.compile(rf'^\s*{_NAME} {_SCORE} {_NAME} {_SCORE}\s*$')
+_SPACED_LONG = re.compile(rf'^\s*(\S.*) {_SCORE} {_NAME} {_SCORE}\s*$')
+
+
+class ScoreParseError(ValueError):
+    """A line that could not be read as a score line"""
+
+    def __init__(self, message, line_no=None, line=None):
+        super().__init__(message)
+        self.line_no = line_no
+        self.line = line
+
+
+def parse_score_line(line, line_no=None):
+    """Parse one line into a ScoreLine, raising ScoreParseError if it doesn't fit"""
+    if _COLUMN_SEP.search(line.strip()):
+        match = _COLUMNS.match(line)
+    else:
+        match = _SPACED_SHORT.match(line)
+        longest = match and _SPACED_LONG.match(line)
+        if match and (match.span(2), match.span(4)) != (longest.span(2), longest.span(4)):
+            raise ScoreParseError(f'Ambiguous line, separate columns with tabs: {line.strip()}',
+                                  line_no, line)
+    if not match:
+        raise ScoreParseError(f'Could not identify two team names and two scores in line: {line.strip()}',
+                              line_no, line)
+
+    home, home_score, away, away_score = match.groups()
+    return ScoreLine(line_no, home, float(home_score), away, float(away_score))
+
+
+def iter_lines(source, encoding='utf-8-sig'):
+    """
+    Yield (line_no, line) for the non-blank lines of a string, an iterable of
+    lines or a file object. Byte streams (uploaded files) are decoded
+    incrementally, so large files are never read into memory whole.
+    """
+    if isinstance(source, str):
+        source = source.splitlines()
+    decoder = None
+    for line_no, line in enumerate(source, 1):
+        if isinstance(line, bytes):
+            if decoder is None:
+                decoder = codecs.getincrementaldecoder(encoding)()
+            line = decoder.decode(line)
+        if line.strip():
+            yield line_no, line.rstrip('\r\n')
+
+
+def parse_scores(source, errors=None):
+    """
+    Yield a ScoreLine for every line in source (see iter_lines). Bad lines
+    raise ScoreParseError, or are appended to errors when a list is given.
+    """
+    for line_no, line in iter_lines(source):
+        try:
+            yield parse_score_line(line, line_no)
+        except ScoreParseError as e:
+            if errors is None:
+                raise
+            errors.append(e)
@@ -0,0 +1,123 @@
+"""
+Read-only views of the stored standings (TeamSeason points and totals),
+built in a fixed number of queries whatever the number of teams. Team and
+division names come from the reference cache.
+"""
+from collections import namedtuple
+
+from sqlalchemy import case, func, literal, or_, select, union_all
+
+from app import db
+from app.models import Fixture, TeamSeason
+from app.reference import get_reference
+
+StandingRow = namedtuple('StandingRow', ['team_id', 'team_name', 'played', 'points', 'total_score'])
+TeamEntry = namedtuple('TeamEntry', ['team_id', 'name', 'manager_name'])
+
+# Table order used everywhere standings are shown
+STANDINGS_ORDER = (TeamSeason.points.desc(), TeamSeason.total_score.desc(), TeamSeason.id)
+
+
+def team_results():
+    """
+    Subquery with one row per team per played fixture, from that team's side:
+    fixture_id, season_id, division_id, gameweek_number, team_id,
+    opponent_id, score_for, score_against, is_home.
+    """
+    def side(team, opponent, score_for, score_against, is_home):
+        return select(
+            Fixture.id.label('fixture_id'),
+            Fixture.season_id,
+            Fixture.division_id,
+            Fixture.gameweek_number,
+            team.label('team_id'),
+            opponent.label('opponent_id'),
+            score_for.label('score_for'),
+            score_against.label('score_against'),
+            literal(is_home).label('is_home')
+        ).where(Fixture.status == Fixture.PLAYED)
+
+    return union_all(
+        side(Fixture.home_team_id, Fixture.away_team_id, Fixture.home_score, Fixture.away_score, True),
+        side(Fixture.away_team_id, Fixture.home_team_id, Fixture.away_score, Fixture.home_score, False),
+    ).subquery('team_results')
+
+
+def result_totals(results):
+    """Aggregate columns over a team_results() subquery, for use with GROUP BY"""
+    won = results.c.score_for > results.c.score_against
+    drawn = results.c.score_for == results.c.score_against
+    return (
+        func.count().label('played'),
+        func.sum(case((won, 1), else_=0)).label('wins'),
+        func.sum(case((drawn, 1), else_=0)).label('draws'),
+        func.sum(case((won | drawn, 0), else_=1)).label('losses'),
+        func.sum(results.c.score_for).label('goals_for'),
+        func.sum(results.c.score_against).label('goals_against'),
+    )
+
+
+# Stats of a team with no played fixtures in the range
+EMPTY_STATS = {'played': 0, 'wins': 0, 'draws': 0, 'losses': 0, 'goals_for': 0.0,
+               'goals_against': 0.0, 'points': 0, 'goal_difference': 0.0}
+
+
+def stats_dict(row):
+    """The stats dict ManagerMonth.get_team_stats returns, from a result_totals() row"""
+    stats = {
+        'played': row.played,
+        'wins': row.wins,
+        'draws': row.draws,
+        'losses': row.losses,
+        'goals_for': row.goals_for or 0.0,
+        'goals_against': row.goals_against or 0.0,
+        'points': row.wins * 3 + row.draws,
+    }
+    stats['goal_difference'] = stats['goals_for'] - stats['goals_against']
+    return stats
+
+
+def _played_count(season_id):
+    """Correlated count of a TeamSeason's played fixtures"""
+    return select(func.count(Fixture.id)).where(
+        Fixture.season_id == season_id,
+        Fixture.status == Fixture.PLAYED,
+        or_(Fixture.home_team_id == TeamSeason.team_id, Fixture.away_team_id == TeamSeason.team_id)
+    ).correlate(TeamSeason).scalar_subquery()
+
+
+def division_leaders(season_id, limit=5):
+    """{division_id: [StandingRow]} for the top `limit` teams of each division, in one query"""
+    rank = func.row_number().over(partition_by=TeamSeason.division_id, order_by=STANDINGS_ORDER)
+    ranked = select(
+        TeamSeason.division_id,
+        TeamSeason.team_id,
+        _played_count(season_id).label('played'),
+        TeamSeason.points,
+        TeamSeason.total_score,
+        rank.label('rank')
+    ).where(TeamSeason.season_id == season_id).subquery()
+
+    reference = get_reference()
+    leaders = {}
+    for row in db.session.execute(
+            select(ranked).where(ranked.c.rank <= limit).order_by(ranked.c.division_id, ranked.c.rank)):
+        team = reference.team(row.team_id)
+        leaders.setdefault(row.division_id, []).append(StandingRow(
+            row.team_id, team.name if team else '', row.played, row.points or 0, row.total_score or 0
+        ))
+    return leaders
+
+
+def division_teams(season_id):
+    """{division_id: [TeamEntry]} sorted by team name, in one query"""
+    reference = get_reference()
+    teams = {}
+    for division_id, team_id in db.session.execute(
+            select(TeamSeason.division_id, TeamSeason.team_id).where(TeamSeason.season_id == season_id)):
+        team = reference.team(team_id)
+        if team is not None:
+            teams.setdefault(division_id, []).append(TeamEntry(team.id, team.name, team.manager_name))
+    for entries in teams.values():
+        entries.sort(key=lambda entry: entry.name)
+    return teams
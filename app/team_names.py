@@ -0,0 +1,129 @@
+"""
+Team-name resolution for score and fixture ingestion.
+
+Fantrax exports decorate names with emoji (👑, 🏆) and uneven spacing, so raw
+names are reduced to a normalized key first. Lookups then go exact key ->
+admin-confirmed alias -> fuzzy match, where fuzzy candidates come from a
+trigram index and are ranked by edit similarity. A fuzzy match is only
+accepted when it is both close and clearly ahead of the runner-up.
+"""
+import unicodedata
+from collections import namedtuple
+from difflib import SequenceMatcher
+
+from flask import g
+
+from app.models import Team, TeamSeason, TeamAlias
+from app.utils import normalize_team_name
+
+# Minimum similarity for a fuzzy match, and the lead it needs over the next best
+FUZZY_THRESHOLD = 0.85
+FUZZY_MARGIN = 0.08
+
+# Trigram candidates scored per lookup
+MAX_CANDIDATES = 8
+
+NameMatch = namedtuple('NameMatch', ['team', 'method', 'score'])
+
+# Unicode categories dropped from keys: emoji and other symbols, modifiers,
+# control and format characters (zero-width joiners, variation selectors)
+_DROPPED_CATEGORIES = {'So', 'Sk', 'Cc', 'Cf', 'Co', 'Cs', 'Mn', 'Me'}
+
+
+def name_key(name):
+    """Normalized lookup key for a team name: decorations dropped, case and spacing folded"""
+    name = normalize_team_name(name or '')
+    kept = ''.join(c for c in name
+                   if c.isspace() or unicodedata.category(c) not in _DROPPED_CATEGORIES)
+    return ' '.join(kept.casefold().split())
+
+
+def _trigrams(key):
+    padded = f'  {key} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TeamNameIndex:
+    """Resolves raw team names to Team rows in O(1) for exact keys and aliases."""
+
+    def __init__(self, teams, aliases=()):
+        self.teams = {team.id: team for team in teams}
+        self._keys = {}
+        self._trigrams = {}
+        for team in self.teams.values():
+            key = name_key(team.name)
+            self._keys[key] = team.id
+            for trigram in _trigrams(key):
+                self._trigrams.setdefault(trigram, set()).add(team.id)
+        self._aliases = {alias.alias: alias.team_id for alias in aliases
+                         if alias.team_id in self.teams}
+        self._team_keys = {team_id: key for key, team_id in self._keys.items()}
+
+    def _ranked(self, key, candidate_ids=None):
+        """Fuzzy candidates for a key as (score, team_id), best first"""
+        overlap = {}
+        for trigram in _trigrams(key):
+            for team_id in self._trigrams.get(trigram, ()):
+                if candidate_ids is None or team_id in candidate_ids:
+                    overlap[team_id] = overlap.get(team_id, 0) + 1
+        shortlist = sorted(overlap, key=overlap.get, reverse=True)[:MAX_CANDIDATES]
+        ranked = [(SequenceMatcher(None, key, self._team_keys[team_id]).ratio(), team_id)
+                  for team_id in shortlist]
+        ranked.sort(reverse=True)
+        return ranked
+
+    def resolve(self, name, candidate_ids=None):
+        """
+        Return a NameMatch for a raw name. method is 'exact', 'alias' or 'fuzzy';
+        team is None when nothing matched confidently. candidate_ids restricts
+        the match to a set of team ids (e.g. the teams in one division's fixtures).
+        """
+        key = name_key(name)
+        for method, lookup in (('exact', self._keys), ('alias', self._aliases)):
+            team_id = lookup.get(key)
+            if team_id is not None and (candidate_ids is None or team_id in candidate_ids):
+                return NameMatch(self.teams[team_id], method, 1.0)
+
+        ranked = self._ranked(key, candidate_ids)
+        if ranked:
+            best_score, best_id = ranked[0]
+            runner_up = ranked[1][0] if len(ranked) > 1 else 0.0
+            if best_score >= FUZZY_THRESHOLD and best_score - runner_up >= FUZZY_MARGIN:
+                return NameMatch(self.teams[best_id], 'fuzzy', best_score)
+        return NameMatch(None, None, ranked[0][0] if ranked else 0.0)
+
+    def suggestions(self, name, candidate_ids=None, limit=3):
+        """Closest teams to an unresolved name, for an admin to confirm"""
+        return [self.teams[team_id] for _, team_id in self._ranked(name_key(name), candidate_ids)[:limit]]
+
+
+def build_team_index(season_id=None):
+    """Index the teams of one season (or every team) plus all learned aliases"""
+    query = Team.query
+    if season_id is not None:
+        query = query.join(TeamSeason).filter(TeamSeason.season_id == season_id)
+    return TeamNameIndex(query.all(), TeamAlias.query.all())
+
+
+def get_team_index(season_id=None):
+    """The team index for a season, built at most once per request"""
+    indexes = g.setdefault('team_name_indexes', {})
+    if season_id not in indexes:
+        indexes[season_id] = build_team_index(season_id)
+    return indexes[season_id]
+
+
+def learn_alias(raw_name, team_id):
+    """
+    Store an admin-confirmed alias for a team. Returns the TeamAlias (not yet
+    committed), or None if the name already resolves exactly to a team.
+    """
+    key = name_key(raw_name)
+    if not key or get_team_index().resolve(raw_name).method == 'exact':
+        return None
+    alias = TeamAlias.query.filter_by(alias=key).first()
+    if alias is None:
+        alias = TeamAlias(alias=key)
+    alias.team_id = team_id
+    g.pop('team_name_indexes', None)
+    return alias
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Award Manager of the Month for every month whose scores are all in.
+Safe to run repeatedly; only new or changed winners are written.
+
+Usage:
+    python award_motm.py [--season SEASON_ID] [--dry-run]
+"""
+import argparse
+
+from app import create_app, db
+from app.motm import award_completed_months
+from app.reference import get_reference
+
+def award_months(season_id=None, dry_run=False):
+    app = create_app()
+
+    with app.app_context():
+        results = award_completed_months(season_id)
+        reference = get_reference()
+        for result in results:
+            team = reference.team(result.team_id)
+            action = 'Awarded' if result.created else 'Changed winner of'
+            print(f"{action} {result.month_name}: {team.name if team else result.team_id} ({result.total_score:g} points scored)")
+
+        if dry_run:
+            db.session.rollback()
+            print("Dry run, nothing saved")
+        else:
+            db.session.commit()
+        print(f"{len(results)} months awarded or updated")
+    return results
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Award Manager of the Month for completed months')
+    parser.add_argument('--season', type=int, help='Only this season id (default: all seasons)')
+    parser.add_argument('--dry-run', action='store_true', help='Show the winners without saving them')
+    args = parser.parse_args()
+
+    award_months(args.season, args.dry_run)
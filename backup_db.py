@@ -1,31 +1,59 @@
 #!/usr/bin/env python3
 """
-Backup database to SQL dump file
+Backup the configured database (SQLite or Postgres) to a compressed,
+checksummed archive that restore_db.py can load.
+
+Usage:
+    python backup_db.py [output_file]                   full backup
+    python backup_db.py --incremental [--since ARCHIVE] rows changed since ARCHIVE
+                                                        (default: newest archive here)
 """
-import sqlite3
-import os
-from datetime import datetime
-
-def backup_database():
-    db_path = 'fantasy_league.db'
-    if not os.path.exists(db_path):
-        print(f"Database {db_path} does not exist!")
-        return
-    
-    # Create backup filename with timestamp
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    backup_filename = f'db_backup_{timestamp}.sql'
-    
-    # Connect to database and dump
-    conn = sqlite3.connect(db_path)
-    
-    with open(backup_filename, 'w') as f:
-        for line in conn.iterdump():
-            f.write('%s\n' % line)
-    
-    conn.close()
-    print(f"Database backed up to {backup_filename}")
-    return backup_filename
+import argparse
+
+from app import create_app
+from app.backup import (BackupError, create_backup, create_incremental_backup,
+                        backup_filename, latest_archive, read_header)
+
+def backup_database(output=None):
+    app = create_app()
+
+    with app.app_context():
+        backup_file = output or backup_filename()
+        row_counts = create_backup(backup_file)
+
+    print(f"Backed up {sum(row_counts.values())} rows from {len(row_counts)} tables")
+    print(f"Database backed up to {backup_file}")
+    return backup_file
+
+def incremental_backup(since=None, output=None):
+    since = since or latest_archive()
+    if not since:
+        print("No previous archive found. Take a full backup first.")
+        return None
+
+    since_change_id = read_header(since).get('change_id')
+    if since_change_id is None:
+        raise BackupError(f"{since} predates change tracking. Take a full backup first.")
+
+    app = create_app()
+
+    with app.app_context():
+        backup_file = output or backup_filename('delta')
+        row_counts = create_incremental_backup(backup_file, since_change_id)
+
+    print(f"Backed up {sum(row_counts.values())} changed rows since {since}")
+    print(f"Incremental backup written to {backup_file}")
+    return backup_file
 
 if __name__ == '__main__':
-    backup_database()
+    parser = argparse.ArgumentParser(description='Backup the database')
+    parser.add_argument('output', nargs='?', help='Archive file to write')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Only back up rows changed since the previous archive')
+    parser.add_argument('--since', help='Previous archive to take the increment from')
+    args = parser.parse_args()
+
+    if args.incremental:
+        incremental_backup(args.since, args.output)
+    else:
+        backup_database(args.output)
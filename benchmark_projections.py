@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the season projection engine, on a synthetic league of three
+divisions of twelve teams playing a double round robin, part-way through.
+
+Usage:
+    python benchmark_projections.py [--simulations N] [--played N] [--workers N]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.cup_draw import round_robin
+from app.projections import SIMULATIONS, fit_scoring, simulate, simulate_parallel
+
+DIVISIONS = 3
+TEAMS_PER_DIVISION = 12
+
+
+def make_league(played_gameweeks, seed=1):
+    """Per-team scores so far, points and totals, plus the remaining fixtures"""
+    rng = np.random.default_rng(seed)
+    n_teams = DIVISIONS * TEAMS_PER_DIVISION
+    strength = rng.normal(60, 8, n_teams)
+    divisions = [np.arange(d * TEAMS_PER_DIVISION, (d + 1) * TEAMS_PER_DIVISION) for d in range(DIVISIONS)]
+
+    schedule = []
+    for teams in divisions:
+        rounds = round_robin(teams.tolist())
+        rounds += [[(away, home) for home, away in pairs] for pairs in rounds]
+        for gameweek, pairs in enumerate(rounds):
+            schedule.extend((gameweek, home, away) for home, away in pairs)
+
+    scores = {team: [] for team in range(n_teams)}
+    points = np.zeros(n_teams, dtype=np.float32)
+    totals = np.zeros(n_teams)
+    remaining = []
+    for gameweek, home, away in schedule:
+        if gameweek >= played_gameweeks:
+            remaining.append((home, away))
+            continue
+        home_score, away_score = rng.normal(strength[[home, away]], 15).round(2)
+        scores[home].append(home_score)
+        scores[away].append(away_score)
+        totals[home] += home_score
+        totals[away] += away_score
+        if home_score > away_score:
+            points[home] += 3
+        elif away_score > home_score:
+            points[away] += 3
+        else:
+            points[[home, away]] += 1
+    return scores, points, totals, remaining, divisions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the season projection engine')
+    parser.add_argument('--simulations', type=int, default=SIMULATIONS)
+    parser.add_argument('--played', type=int, default=11, help='Gameweeks already played (of 22)')
+    parser.add_argument('--workers', type=int, default=1)
+    args = parser.parse_args()
+
+    scores, points, totals, remaining, divisions = make_league(args.played)
+    means, sds = fit_scoring(scores, list(range(len(points))))
+    home = np.array([h for h, _ in remaining], dtype=np.intp)
+    away = np.array([a for _, a in remaining], dtype=np.intp)
+    sim_args = (means.astype(np.float32), sds.astype(np.float32), points, totals, home, away, divisions,
+                args.simulations)
+
+    start = time.perf_counter()
+    if args.workers > 1:
+        counts, point_sums = simulate_parallel(*sim_args, seed=1, workers=args.workers)
+    else:
+        counts, point_sums = simulate(*sim_args, seed=1)
+    elapsed = time.perf_counter() - start
+
+    print(f'{args.simulations} simulations of {len(remaining)} fixtures '
+          f'({DIVISIONS}x{TEAMS_PER_DIVISION} teams, {args.workers} worker(s)): {elapsed:.3f}s')
+    for d, teams in enumerate(divisions):
+        probabilities = counts[d] / args.simulations
+        leader = int(np.argmax(probabilities[:, 0]))
+        print(f'  Division {d + 1}: favourite team {teams[leader]} at {probabilities[leader, 0]:.1%}, '
+              f'{point_sums[teams[leader]] / args.simulations:.1f} projected points')
+
+
+if __name__ == '__main__':
+    main()
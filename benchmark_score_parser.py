@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for the score-line parser, against the split-and-float loop
+upload_scores used before app.score_parser existed.
+
+Usage:
+    python benchmark_score_parser.py [--lines N] [--repeat N]
+"""
+import argparse
+import random
+import timeit
+
+from app.score_parser import parse_scores
+
+NAMES = ['Pep and the City', 'Back Fixes Matter', 'Bayern Bru', 'Wirtz Case Scenario',
+         'Scharshank Redemption', 'Udogie Style', 'The Mask of Yoro', 'Freedyonfire',
+         'Pique Blinders', 'Chicken Tikka MoSalah', 'Huss will be missed !', 'Dango Unchained 👑',
+         "Does it count if only Matip's in?", "Onana What's My Name"]
+
+
+def make_input(n_lines, seed=1):
+    rnd = random.Random(seed)
+    lines = []
+    for _ in range(n_lines):
+        home, away = rnd.sample(NAMES, 2)
+        sep = rnd.choice(['\t', '    '])
+        lines.append(sep.join([home, f'{rnd.uniform(0, 150):.2f}', away, f'{rnd.uniform(0, 150):.2f}🏆']))
+    return '\n'.join(lines)
+
+
+def legacy_parse(text):
+    """The old parser: split on whitespace and try float() on every token"""
+    parsed = []
+    for line in text.strip().splitlines():
+        parts = line.strip().split()
+        indices = []
+        for i, part in enumerate(parts):
+            clean = part.split('🏆')[0] if '🏆' in part else part
+            try:
+                float(clean)
+                indices.append(i)
+            except ValueError:
+                continue
+        if len(indices) != 2:
+            continue
+        first, second = indices
+        parsed.append((' '.join(parts[:first]), float(parts[first].split('🏆')[0]),
+                       ' '.join(parts[first + 1:second]), float(parts[second].split('🏆')[0])))
+    return parsed
+
+
+def run(n_lines, repeat):
+    text = make_input(n_lines)
+    for label, func in (('legacy split/float', legacy_parse),
+                        ('score_parser', lambda t: list(parse_scores(t)))):
+        best = min(timeit.repeat(lambda: func(text), number=1, repeat=repeat))
+        print(f"{label:<20} {best * 1000:8.2f} ms  ({best / n_lines * 1e6:.2f} us/line)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark score-line parsing')
+    parser.add_argument('--lines', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    run(args.lines, args.repeat)
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Rebuild every head-to-head record from the full fixture history in one
+pass. Score uploads keep the records up to date, so this is only needed
+after the table is first created or scores are edited by hand.
+
+Usage:
+    python build_head_to_head.py [--dry-run]
+"""
+import argparse
+
+from app import create_app, db
+from app.head_to_head import refresh_head_to_head
+
+def build_head_to_head(dry_run=False):
+    app = create_app()
+
+    with app.app_context():
+        written = refresh_head_to_head()
+        print(f"{written} head-to-head records written or removed")
+
+        if dry_run:
+            db.session.rollback()
+            print("Dry run, nothing saved")
+        else:
+            db.session.commit()
+    return written
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Rebuild the head-to-head records')
+    parser.add_argument('--dry-run', action='store_true', help='Count the records without saving them')
+    args = parser.parse_args()
+
+    build_head_to_head(args.dry_run)
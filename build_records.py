@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Bring the all-time records up to date. Only fixtures played since the last
+run are counted; --rebuild counts the whole history again from scratch.
+
+Usage:
+    python build_records.py [--rebuild] [--dry-run]
+"""
+import argparse
+
+from app import create_app, db
+from app.records import rebuild_records, update_records
+
+def build_records(rebuild=False, dry_run=False):
+    app = create_app()
+
+    with app.app_context():
+        written = rebuild_records() if rebuild else update_records()
+        print(f"{written} team records written or removed")
+
+        if dry_run:
+            db.session.rollback()
+            print("Dry run, nothing saved")
+        else:
+            db.session.commit()
+    return written
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Update the all-time records')
+    parser.add_argument('--rebuild', action='store_true', help='Delete every record and count all fixtures again')
+    parser.add_argument('--dry-run', action='store_true', help='Count the records without saving them')
+    args = parser.parse_args()
+
+    build_records(args.rebuild, args.dry_run)
@@ -16,7 +16,7 @@ if [ ! -f "fantasy_league.db" ]; then
     echo "Database not found. Looking for backup to restore..."
     
     # Find the most recent backup file
-    BACKUP_FILE=$(ls -t db_backup_*.sql 2>/dev/null | head -n1)
+    BACKUP_FILE=$(ls -t db_backup_*.jsonl.gz db_backup_*.sql 2>/dev/null | head -n1)
     
     if [ -n "$BACKUP_FILE" ]; then
         echo "Restoring database from $BACKUP_FILE..."
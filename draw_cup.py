@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Make the group-stage draw for a cup competition.
+
+Teams are seeded into pots by division and league position (taken from
+--seed-season, e.g. last season, or the cup's own season by default).
+Without --save the draw is only shown; --runs repeats it to report how
+often same-division clashes happen.
+
+Usage:
+    python draw_cup.py <competition_id> --gameweeks 3,7,11 [--seed-season ID]
+                       [--random-seed N] [--runs N] [--save]
+"""
+import argparse
+import random
+
+from app import create_app, db
+from app.cup_draw import draw_groups, draw_statistics, division_clashes, save_draw, seeded_teams
+from app.models import CupCompetition, Gameweek
+from app.reference import get_reference
+
+def make_draw(competition_id, gameweek_numbers, seed_season_id=None, random_seed=None, runs=0, save=False):
+    app = create_app()
+
+    with app.app_context():
+        competition = db.session.get(CupCompetition, competition_id)
+        if competition is None or not competition.has_groups:
+            print(f"No group-stage cup with id {competition_id}")
+            return None
+
+        teams = seeded_teams(seed_season_id or competition.season_id)
+        if runs:
+            stats = draw_statistics(teams, competition.num_groups, competition.teams_per_group, runs, random_seed)
+            clashes = ', '.join(f"{n} clashes: {count}" for n, count in stats['clashes'].items())
+            print(f"{runs} draws: {clashes}")
+
+        groups = draw_groups(teams, competition.num_groups, competition.teams_per_group,
+                             random.Random(random_seed))
+        reference = get_reference()
+        for order, group in enumerate(groups, 1):
+            names = ', '.join(reference.team(team.team_id).name for team in group)
+            print(f"Group {order}: {names}")
+        print(f"Same-division clashes: {division_clashes(groups)}")
+
+        if save:
+            gameweeks = {gw.number: gw.id for gw in Gameweek.query.filter_by(season_id=competition.season_id)}
+            missing = [number for number in gameweek_numbers if number not in gameweeks]
+            if missing:
+                print(f"No gameweek(s) {missing} in the cup's season")
+                return None
+            rows = save_draw(competition, groups, [gameweeks[number] for number in gameweek_numbers])
+            db.session.commit()
+            print(f"Saved the draw ({len(rows)} rows)")
+        return groups
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Make the group-stage draw for a cup competition')
+    parser.add_argument('competition_id', type=int)
+    parser.add_argument('--gameweeks', default='',
+                        help='Comma separated gameweek numbers for the group rounds, in order')
+    parser.add_argument('--seed-season', type=int, help='Season whose standings seed the pots')
+    parser.add_argument('--random-seed', type=int, help='Make the draw repeatable')
+    parser.add_argument('--runs', type=int, default=0, help='Also repeat the draw this many times and report clashes')
+    parser.add_argument('--save', action='store_true', help='Save the draw and the group fixtures')
+    args = parser.parse_args()
+
+    numbers = [int(number) for number in args.gameweeks.split(',') if number.strip()]
+    make_draw(args.competition_id, numbers, args.seed_season, args.random_seed, args.runs, args.save)
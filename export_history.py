@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Export league history (fixtures, standings, titles, cup results, MOTM awards)
+as CSV or NDJSON. Works against whichever database the app is configured for.
+
+Usage:
+    python export_history.py <dataset|all> [--format csv|ndjson] [--season SEASON_ID] [--output FILE]
+"""
+import argparse
+import sys
+
+from app import create_app
+from app.export import DATASETS, EXPORT_FORMATS, stream_export
+
+
+def export_history(dataset, fmt, season_id=None, output=None):
+    app = create_app()
+
+    with app.app_context():
+        out = open(output, 'w', newline='', encoding='utf-8') if output else sys.stdout
+        try:
+            for chunk in stream_export(dataset, fmt, season_id):
+                out.write(chunk)
+        finally:
+            if output:
+                out.close()
+
+    if output:
+        print(f"Exported {dataset} to {output}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Export league history')
+    parser.add_argument('dataset', choices=['all'] + list(DATASETS))
+    parser.add_argument('--format', dest='fmt', choices=EXPORT_FORMATS, default='csv')
+    parser.add_argument('--season', dest='season_id', type=int, help='Only export this season id')
+    parser.add_argument('--output', help='Write to this file instead of stdout')
+    args = parser.parse_args()
+
+    if args.dataset == 'all' and args.fmt == 'csv':
+        parser.error("CSV exports cover one dataset at a time; use --format ndjson for 'all'")
+
+    export_history(args.dataset, args.fmt, args.season_id, args.output)
@@ -0,0 +1,43 @@
+"""Store rendered rules HTML and its hash
+
+Revision ID: 4f8b1d6e3a27
+Revises: c2a7e5f90b18
+Create Date: 2026-10-19 17:02:44.518630
+
+"""
+import hashlib
+
+from alembic import op
+import markdown
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4f8b1d6e3a27'
+down_revision = 'c2a7e5f90b18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('rule', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('content_html', sa.Text(), nullable=False, server_default=''))
+        batch_op.add_column(sa.Column('content_hash', sa.String(length=64), nullable=False, server_default=''))
+
+    # Render the existing rules the same way the app does on save
+    rule = sa.table('rule', sa.column('id', sa.Integer), sa.column('content', sa.Text),
+                    sa.column('content_html', sa.Text), sa.column('content_hash', sa.String))
+    connection = op.get_bind()
+    for rule_id, content in connection.execute(sa.select(rule.c.id, rule.c.content)).all():
+        html = markdown.markdown(content or '', extensions=['extra', 'sane_lists'])
+        connection.execute(
+            rule.update().where(rule.c.id == rule_id).values(
+                content_html=html, content_hash=hashlib.sha256(html.encode('utf-8')).hexdigest()
+            )
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('rule', schema=None) as batch_op:
+        batch_op.drop_column('content_hash')
+        batch_op.drop_column('content_html')
@@ -0,0 +1,47 @@
+"""Copy season_id and gameweek_number onto fixture
+
+Revision ID: 5e9a0c3b7d12
+Revises: 7b2d4e61c8a9
+Create Date: 2026-10-19 13:05:48.904215
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e9a0c3b7d12'
+down_revision = '7b2d4e61c8a9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('fixture', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('season_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('gameweek_number', sa.Integer(), nullable=True))
+
+    # Backfill from each fixture's gameweek
+    op.execute("""
+        UPDATE fixture SET
+            season_id = (SELECT gameweek.season_id FROM gameweek WHERE gameweek.id = fixture.gameweek_id),
+            gameweek_number = (SELECT gameweek.number FROM gameweek WHERE gameweek.id = fixture.gameweek_id)
+    """)
+
+    with op.batch_alter_table('fixture', schema=None) as batch_op:
+        batch_op.alter_column('season_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.alter_column('gameweek_number', existing_type=sa.Integer(), nullable=False)
+        batch_op.create_foreign_key('fk_fixture_season_id', 'season', ['season_id'], ['id'])
+        batch_op.create_index('ix_fixture_season_home_team', ['season_id', 'home_team_id', 'gameweek_number'], unique=False)
+        batch_op.create_index('ix_fixture_season_away_team', ['season_id', 'away_team_id', 'gameweek_number'], unique=False)
+        batch_op.create_index('ix_fixture_season_gameweek', ['season_id', 'gameweek_number', 'division_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('fixture', schema=None) as batch_op:
+        batch_op.drop_index('ix_fixture_season_gameweek')
+        batch_op.drop_index('ix_fixture_season_away_team')
+        batch_op.drop_index('ix_fixture_season_home_team')
+        batch_op.drop_constraint('fk_fixture_season_id', type_='foreignkey')
+        batch_op.drop_column('gameweek_number')
+        batch_op.drop_column('season_id')
@@ -0,0 +1,32 @@
+"""Add team alias table for score upload name matching
+
+Revision ID: 7b2d4e61c8a9
+Revises: 3c7e91a2d5f4
+Create Date: 2026-10-19 11:40:02.531877
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7b2d4e61c8a9'
+down_revision = '3c7e91a2d5f4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('team_alias',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('alias', sa.String(length=128), nullable=False),
+    sa.Column('team_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['team_id'], ['team.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('alias')
+    )
+
+
+def downgrade():
+    op.drop_table('team_alias')
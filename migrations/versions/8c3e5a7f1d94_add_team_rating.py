@@ -0,0 +1,47 @@
+"""Add team_rating for power rankings
+
+Revision ID: 8c3e5a7f1d94
+Revises: 4f8b1d6e3a27
+Create Date: 2026-10-19 18:41:07.203519
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c3e5a7f1d94'
+down_revision = '4f8b1d6e3a27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('team_rating',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('team_id', sa.Integer(), nullable=False),
+    sa.Column('fixture_id', sa.Integer(), nullable=False),
+    sa.Column('season_id', sa.Integer(), nullable=False),
+    sa.Column('division_id', sa.Integer(), nullable=False),
+    sa.Column('gameweek_number', sa.Integer(), nullable=False),
+    sa.Column('rating', sa.Float(), nullable=False),
+    sa.Column('change', sa.Float(), nullable=False),
+    sa.Column('outcome', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['division_id'], ['division.id'], ),
+    sa.ForeignKeyConstraint(['season_id'], ['season.id'], ),
+    sa.ForeignKeyConstraint(['team_id'], ['team.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('fixture_id', 'team_id', name='uq_team_rating_fixture_team')
+    )
+    with op.batch_alter_table('team_rating', schema=None) as batch_op:
+        batch_op.create_index('ix_team_rating_team_season_gameweek', ['team_id', 'season_id', 'gameweek_number'],
+                              unique=False)
+        batch_op.create_index('ix_team_rating_season_gameweek', ['season_id', 'gameweek_number'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('team_rating', schema=None) as batch_op:
+        batch_op.drop_index('ix_team_rating_season_gameweek')
+        batch_op.drop_index('ix_team_rating_team_season_gameweek')
+
+    op.drop_table('team_rating')
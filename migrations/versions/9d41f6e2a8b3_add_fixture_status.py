@@ -0,0 +1,37 @@
+"""Add status column to fixture
+
+Revision ID: 9d41f6e2a8b3
+Revises: 5e9a0c3b7d12
+Create Date: 2026-10-19 14:21:07.662391
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d41f6e2a8b3'
+down_revision = '5e9a0c3b7d12'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('fixture', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('status', sa.String(length=16), nullable=False, server_default='scheduled'))
+
+    # Fixtures with both scores in have been played
+    op.execute("""
+        UPDATE fixture SET status = 'played'
+        WHERE home_score IS NOT NULL AND away_score IS NOT NULL
+    """)
+
+    with op.batch_alter_table('fixture', schema=None) as batch_op:
+        batch_op.create_index('ix_fixture_season_status_gameweek',
+                              ['season_id', 'status', 'gameweek_number', 'division_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('fixture', schema=None) as batch_op:
+        batch_op.drop_index('ix_fixture_season_status_gameweek')
+        batch_op.drop_column('status')
@@ -0,0 +1,46 @@
+"""Store scores as integer hundredths
+
+Revision ID: b6f3d8a1c4e7
+Revises: 9d41f6e2a8b3
+Create Date: 2026-10-19 15:02:33.217640
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6f3d8a1c4e7'
+down_revision = '9d41f6e2a8b3'
+branch_labels = None
+depends_on = None
+
+SCORE_COLUMNS = {
+    'fixture': ['home_score', 'away_score'],
+    'cup_match': ['first_leg_home_score', 'first_leg_away_score',
+                  'second_leg_home_score', 'second_leg_away_score'],
+    'cup_group_match': ['home_score', 'away_score'],
+    'team_season': ['total_score'],
+    'manager_of_the_month': ['total_score'],
+}
+
+
+def upgrade():
+    for table, columns in SCORE_COLUMNS.items():
+        op.execute(f"UPDATE {table} SET " + ', '.join(
+            f"{column} = ROUND({column} * 100)" for column in columns
+        ))
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            for column in columns:
+                batch_op.alter_column(column, existing_type=sa.Float(), type_=sa.Integer(),
+                                      postgresql_using=f'{column}::integer')
+
+
+def downgrade():
+    for table, columns in SCORE_COLUMNS.items():
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            for column in columns:
+                batch_op.alter_column(column, existing_type=sa.Integer(), type_=sa.Float())
+        op.execute(f"UPDATE {table} SET " + ', '.join(
+            f"{column} = {column} / 100.0" for column in columns
+        ))
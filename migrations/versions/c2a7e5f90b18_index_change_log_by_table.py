@@ -0,0 +1,26 @@
+"""Index change log by table for cache version checks
+
+Revision ID: c2a7e5f90b18
+Revises: b6f3d8a1c4e7
+Create Date: 2026-10-19 16:10:51.380942
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c2a7e5f90b18'
+down_revision = 'b6f3d8a1c4e7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('change_log', schema=None) as batch_op:
+        batch_op.create_index('ix_change_log_table_name_id', ['table_name', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('change_log', schema=None) as batch_op:
+        batch_op.drop_index('ix_change_log_table_name_id')
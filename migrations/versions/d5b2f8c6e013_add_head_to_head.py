@@ -0,0 +1,50 @@
+"""Add head_to_head pair records
+
+Revision ID: d5b2f8c6e013
+Revises: 8c3e5a7f1d94
+Create Date: 2026-10-19 21:12:44.581306
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5b2f8c6e013'
+down_revision = '8c3e5a7f1d94'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('head_to_head',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('team_a_id', sa.Integer(), nullable=False),
+    sa.Column('team_b_id', sa.Integer(), nullable=False),
+    sa.Column('played', sa.Integer(), nullable=False),
+    sa.Column('team_a_wins', sa.Integer(), nullable=False),
+    sa.Column('draws', sa.Integer(), nullable=False),
+    sa.Column('team_b_wins', sa.Integer(), nullable=False),
+    sa.Column('team_a_score', sa.Integer(), nullable=False),
+    sa.Column('team_b_score', sa.Integer(), nullable=False),
+    sa.Column('last_fixture_id', sa.Integer(), nullable=False),
+    sa.Column('last_season_id', sa.Integer(), nullable=False),
+    sa.Column('last_gameweek_number', sa.Integer(), nullable=False),
+    sa.Column('last_team_a_score', sa.Integer(), nullable=False),
+    sa.Column('last_team_b_score', sa.Integer(), nullable=False),
+    sa.CheckConstraint('team_a_id < team_b_id', name='ck_head_to_head_pair_order'),
+    sa.ForeignKeyConstraint(['last_season_id'], ['season.id'], ),
+    sa.ForeignKeyConstraint(['team_a_id'], ['team.id'], ),
+    sa.ForeignKeyConstraint(['team_b_id'], ['team.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('team_a_id', 'team_b_id', name='uq_head_to_head_pair')
+    )
+    with op.batch_alter_table('head_to_head', schema=None) as batch_op:
+        batch_op.create_index('ix_head_to_head_team_b', ['team_b_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('head_to_head', schema=None) as batch_op:
+        batch_op.drop_index('ix_head_to_head_team_b')
+
+    op.drop_table('head_to_head')
@@ -0,0 +1,49 @@
+"""Add team_record for all-time records
+
+Revision ID: f1a9c3d7b254
+Revises: d5b2f8c6e013
+Create Date: 2026-10-19 23:05:19.447830
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1a9c3d7b254'
+down_revision = 'd5b2f8c6e013'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('team_record',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('team_id', sa.Integer(), nullable=False),
+    sa.Column('played', sa.Integer(), nullable=False),
+    sa.Column('wins', sa.Integer(), nullable=False),
+    sa.Column('draws', sa.Integer(), nullable=False),
+    sa.Column('losses', sa.Integer(), nullable=False),
+    sa.Column('points', sa.Integer(), nullable=False),
+    sa.Column('score_for', sa.Integer(), nullable=False),
+    sa.Column('score_against', sa.Integer(), nullable=False),
+    sa.Column('highest_score', sa.Integer(), nullable=True),
+    sa.Column('highest_score_fixture_id', sa.Integer(), nullable=True),
+    sa.Column('biggest_win_margin', sa.Integer(), nullable=True),
+    sa.Column('biggest_win_fixture_id', sa.Integer(), nullable=True),
+    sa.Column('longest_win_streak', sa.Integer(), nullable=False),
+    sa.Column('longest_unbeaten_streak', sa.Integer(), nullable=False),
+    sa.Column('current_win_streak', sa.Integer(), nullable=False),
+    sa.Column('current_unbeaten_streak', sa.Integer(), nullable=False),
+    sa.Column('last_fixture_id', sa.Integer(), nullable=False),
+    sa.Column('last_season_id', sa.Integer(), nullable=False),
+    sa.Column('last_gameweek_number', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['last_season_id'], ['season.id'], ),
+    sa.ForeignKeyConstraint(['team_id'], ['team.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('team_id')
+    )
+
+
+def downgrade():
+    op.drop_table('team_record')
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Bring the power ratings up to date. Only fixtures scored or changed since
+the last run are rated; --rebuild rates the whole history again from scratch.
+
+Usage:
+    python rate_teams.py [--rebuild] [--dry-run]
+"""
+import argparse
+
+from app import create_app, db
+from app.ratings import power_rankings, rebuild_ratings, update_ratings
+from app.reference import get_current_season
+
+def rate_teams(rebuild=False, dry_run=False):
+    app = create_app()
+
+    with app.app_context():
+        rated = rebuild_ratings() if rebuild else update_ratings()
+        print(f"{rated} fixtures rated")
+
+        current_season = get_current_season()
+        if current_season:
+            for row in power_rankings(current_season.id)[:10]:
+                print(f"{row.rank:>3}. {row.team_name:<30} {row.rating:7.1f}  ({row.division_name})")
+
+        if dry_run:
+            db.session.rollback()
+            print("Dry run, nothing saved")
+        else:
+            db.session.commit()
+    return rated
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Update the Elo power ratings')
+    parser.add_argument('--rebuild', action='store_true', help='Delete every rating and rate all fixtures again')
+    parser.add_argument('--dry-run', action='store_true', help='Show the rankings without saving them')
+    args = parser.parse_args()
+
+    rate_teams(args.rebuild, args.dry_run)
@@ -4,7 +4,7 @@ Script to recalculate TeamSeason totals for the current season only
 """
 
 from app import create_app, db
-from app.models import TeamSeason, Season, Fixture, Gameweek
+from app.models import TeamSeason, Season, Fixture
 from sqlalchemy import or_
 
 def recalculate_current_season():
@@ -35,16 +35,13 @@ def recalculate_current_season():
             ts.total_score = 0.0
             
             # Get all fixtures for this team in current season
-            fixtures = Fixture.query.join(
-                Gameweek, Fixture.gameweek_id == Gameweek.id
-            ).filter(
-                Gameweek.season_id == current_season.id,
+            fixtures = Fixture.query.filter(
+                Fixture.season_id == current_season.id,
                 or_(
                     Fixture.home_team_id == ts.team_id,
                     Fixture.away_team_id == ts.team_id
                 ),
-                Fixture.home_score.isnot(None),
-                Fixture.away_score.isnot(None)
+                Fixture.status == Fixture.PLAYED
             ).all()
             
             print(f"  Found {len(fixtures)} played fixtures")
@@ -4,7 +4,7 @@ Script to recalculate all TeamSeason points and total_score from existing fixtur
 """
 
 from app import create_app, db
-from app.models import TeamSeason, Fixture, Gameweek
+from app.models import TeamSeason, Fixture
 from sqlalchemy import or_
 
 def recalculate_all_team_totals():
@@ -24,16 +24,13 @@ def recalculate_all_team_totals():
             ts.total_score = 0.0
             
             # Get all fixtures for this team in this season
-            fixtures = Fixture.query.join(
-                Gameweek, Fixture.gameweek_id == Gameweek.id
-            ).filter(
-                Gameweek.season_id == ts.season_id,
+            fixtures = Fixture.query.filter(
+                Fixture.season_id == ts.season_id,
                 or_(
                     Fixture.home_team_id == ts.team_id,
                     Fixture.away_team_id == ts.team_id
                 ),
-                Fixture.home_score.isnot(None),
-                Fixture.away_score.isnot(None)
+                Fixture.status == Fixture.PLAYED
             ).all()
             
             print(f"  Found {len(fixtures)} played fixtures")
@@ -1,39 +1,47 @@
 #!/usr/bin/env python3
 """
-Restore database from SQL dump file
+Restore the configured database from a backup archive made by backup_db.py.
+The archive is verified and loaded into a staging database first; the live
+database is only replaced once that has succeeded.
+
+Incremental archives are replayed, in order, on top of the full backup.
+Old db_backup_*.sql dumps can still be restored into SQLite.
+
+Usage: python restore_db.py <backup_file> [delta_file ...]
 """
-import sqlite3
 import sys
 import os
 
-def restore_database(backup_file):
-    if not os.path.exists(backup_file):
-        print(f"Backup file {backup_file} does not exist!")
-        return False
-    
-    db_path = 'fantasy_league.db'
-    
-    # Remove existing database
-    if os.path.exists(db_path):
-        os.remove(db_path)
-        print(f"Removed existing database {db_path}")
-    
-    # Create new database and restore
-    conn = sqlite3.connect(db_path)
-    
-    with open(backup_file, 'r') as f:
-        sql_script = f.read()
-    
-    conn.executescript(sql_script)
-    conn.close()
-    
+from app import create_app
+from app.backup import BackupError, restore_backup, restore_legacy_sql
+
+def restore_database(backup_file, deltas=()):
+    for path in [backup_file] + list(deltas):
+        if not os.path.exists(path):
+            print(f"Backup file {path} does not exist!")
+            return False
+
+    app = create_app()
+
+    with app.app_context():
+        try:
+            if backup_file.endswith('.sql'):
+                restore_legacy_sql(backup_file)
+            else:
+                row_counts = restore_backup(backup_file, deltas)
+                print(f"Restored {sum(row_counts.values())} rows into {len(row_counts)} tables")
+        except BackupError as e:
+            print(f"Restore failed, database left unchanged: {e}")
+            return False
+
     print(f"Database restored from {backup_file}")
     return True
 
 if __name__ == '__main__':
-    if len(sys.argv) != 2:
-        print("Usage: python restore_db.py <backup_file.sql>")
+    if len(sys.argv) < 2:
+        print("Usage: python restore_db.py <backup_file> [delta_file ...]")
         sys.exit(1)
-    
+
     backup_file = sys.argv[1]
-    restore_database(backup_file)
+    if not restore_database(backup_file, sys.argv[2:]):
+        sys.exit(1)
@@ -0,0 +1,40 @@
+from app import create_app, db
+from app.backup import _current_change_id, create_backup, create_incremental_backup, restore_backup
+from app.models import Team, TeamAlias
+from config import TestingConfig
+
+
+def _make_app(tmp_path):
+    class FileConfig(TestingConfig):
+        SECRET_KEY = 'test'
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'league.db'}"
+
+    return create_app(FileConfig)
+
+
+def test_restore_replays_a_row_deleted_and_recreated_with_the_same_key(tmp_path):
+    app = _make_app(tmp_path)
+    with app.app_context():
+        team = Team(name='Rovers', manager_name='Sam')
+        db.session.add(team)
+        db.session.flush()
+        db.session.add_all([TeamAlias(alias='rvrs', team_id=team.id), TeamAlias(alias='rovrs', team_id=team.id)])
+        db.session.commit()
+
+        full = tmp_path / 'full.jsonl.gz'
+        create_backup(str(full))
+        with db.engine.connect() as conn:
+            since = _current_change_id(conn)
+
+        # The old row had the lower id, so the re-created one gets a new id but the same alias
+        db.session.delete(TeamAlias.query.filter_by(alias='rvrs').one())
+        db.session.commit()
+        db.session.add(TeamAlias(alias='rvrs', team_id=team.id))
+        db.session.commit()
+        expected = sorted((alias.id, alias.alias) for alias in TeamAlias.query)
+
+        delta = tmp_path / 'delta.jsonl.gz'
+        create_incremental_backup(str(delta), since)
+        restore_backup(str(full), [str(delta)])
+
+        assert sorted((alias.id, alias.alias) for alias in TeamAlias.query) == expected
@@ -0,0 +1,30 @@
+import pytest
+from sqlalchemy import insert
+
+from app import create_app, db
+from app.change_tracking import UntrackedWriteError
+from app.models import ChangeLog, Team
+from config import TestingConfig
+
+
+class _Config(TestingConfig):
+    SECRET_KEY = 'test'
+
+
+@pytest.mark.parametrize('write', [
+    lambda: db.session.execute(insert(Team), [{'_name': 'Rovers', 'manager_name': 'Sam'}]),
+    lambda: db.session.execute(Team.__table__.insert(), [{'name': 'Rovers', 'manager_name': 'Sam'}]),
+    lambda: db.session.bulk_insert_mappings(Team, [{'_name': 'Rovers', 'manager_name': 'Sam'}]),
+    lambda: db.session.bulk_save_objects([Team(name='Rovers', manager_name='Sam')]),
+])
+def test_bulk_inserts_into_tracked_tables_are_refused(write):
+    with create_app(_Config).app_context():
+        db.create_all()
+        with pytest.raises(UntrackedWriteError):
+            write()
+        db.session.rollback()
+
+        team = Team(name='Rovers', manager_name='Sam')
+        db.session.add(team)
+        db.session.commit()
+        assert [entry.row_id for entry in ChangeLog.query.filter_by(table_name='team')] == [team.id]
@@ -0,0 +1,59 @@
+import itertools
+import random
+
+from app.clinch import _tie_can_favour, finishing_bounds
+
+
+def _brute_force(standings, fixtures):
+    """Exact best and worst positions by playing out every combination of results"""
+    points = {team_id: pts for team_id, pts, _ in standings}
+    totals = {team_id: total for team_id, _, total in standings}
+    remaining = dict.fromkeys(points, 0)
+    for a, b in fixtures:
+        remaining[a] += 1
+        remaining[b] += 1
+
+    bounds = {team_id: [len(points), 1] for team_id in points}
+    for outcome in itertools.product(((3, 0), (1, 1), (0, 3)), repeat=len(fixtures)):
+        final = dict(points)
+        for (a, b), (a_points, b_points) in zip(fixtures, outcome):
+            final[a] += a_points
+            final[b] += b_points
+        for team in final:
+            others = [other for other in final if other != team]
+            best = 1 + sum(1 for other in others if final[other] > final[team] or (
+                final[other] == final[team] and not _tie_can_favour(team, other, remaining, totals)))
+            worst = 1 + sum(1 for other in others if final[other] > final[team] or (
+                final[other] == final[team] and _tie_can_favour(other, team, remaining, totals)))
+            bounds[team][0] = min(bounds[team][0], best)
+            bounds[team][1] = max(bounds[team][1], worst)
+    return {team_id: tuple(bound) for team_id, bound in bounds.items()}
+
+
+def test_finished_season_is_exact():
+    standings = ((1, 30, 900.0), (2, 30, 850.5), (3, 12, 700.0))
+    assert finishing_bounds(standings, ()) == {1: (1, 1), 2: (2, 2), 3: (3, 3)}
+
+
+def test_title_clinched_with_games_left():
+    # Team 1 is eight points clear with two games left for everyone
+    standings = ((1, 30, 900.0), (2, 22, 850.0), (3, 21, 800.0), (4, 10, 600.0))
+    fixtures = ((1, 2), (3, 4), (1, 3), (2, 4))
+    bounds = finishing_bounds(standings, fixtures)
+    assert bounds[1] == (1, 1)
+    assert bounds[4][0] > 1
+
+
+def test_bounds_contain_every_possible_finish():
+    rnd = random.Random(45)
+    for _ in range(200):
+        teams = list(range(1, rnd.randint(3, 6) + 1))
+        pairs = list(itertools.combinations(teams, 2))
+        fixtures = tuple(sorted(rnd.sample(pairs, rnd.randint(0, min(7, len(pairs))))))
+        standings = tuple((team, rnd.randint(0, 20), rnd.choice([10.0, rnd.uniform(0, 100)])) for team in teams)
+
+        bounds = finishing_bounds(standings, fixtures)
+        exact = _brute_force(standings, fixtures)
+        for team in teams:
+            assert bounds[team][0] <= exact[team][0]
+            assert bounds[team][1] >= exact[team][1]
@@ -0,0 +1,66 @@
+import itertools
+import random
+
+from app.cup import DIRECT_QUALIFIERS, GroupRef, Qualification, build_group_table
+from app.cup_scenarios import DIRECT, OUT, PLAYOFF, UNDECIDED, solve_groups
+from app.reference import TeamRef
+
+
+def _make_groups(rnd, n_groups, size, played_share, level_scores=True):
+    """Groups part-played at random; level_scores makes draws and level tiebreaks likely"""
+    def score():
+        return 50.0 if level_scores and rnd.random() < 0.5 else rnd.uniform(20, 100)
+
+    groups = []
+    for g in range(n_groups):
+        teams = [TeamRef(g * size + i + 1, f'Team {g * size + i + 1}', '') for i in range(size)]
+        results, remaining = [], []
+        for home, away in itertools.combinations([team.id for team in teams], 2):
+            if rnd.random() < played_share:
+                results.append((home, away, score(), score()))
+            else:
+                remaining.append((home, away))
+        groups.append((g + 1, teams, results, remaining))
+    return groups
+
+
+def _play_out(rnd, groups):
+    """Each team's actual outcome after playing every remaining match with random scores"""
+    refs, tables = [], {}
+    for group_id, teams, results, remaining in groups:
+        played = results + [(home, away, rnd.uniform(0, 120), rnd.uniform(0, 120)) for home, away in remaining]
+        refs.append(GroupRef(group_id, f'Group {group_id}', group_id))
+        tables[group_id] = build_group_table(teams, played)
+    qualification = Qualification(0, refs, tables, True)
+    outcome = {row['team'].id: OUT for table in tables.values() for row in table}
+    outcome.update((entry['team'].id, PLAYOFF) for entry in qualification.playoff_teams)
+    outcome.update((entry['team'].id, DIRECT) for entry in qualification.direct_qualifiers)
+    return outcome
+
+
+def _solve(groups):
+    return solve_groups([(group_id, build_group_table(teams, results), remaining)
+                         for group_id, teams, results, remaining in groups])
+
+
+def test_finished_groups_are_settled():
+    rnd = random.Random(1)
+    groups = _make_groups(rnd, 12, 3, played_share=1.0, level_scores=False)
+    scenarios = _solve(groups)
+    outcome = _play_out(rnd, groups)
+    assert {team_id: scenario.status for team_id, scenario in scenarios.items()} == outcome
+
+
+def test_nothing_is_settled_before_a_ball_is_kicked():
+    scenarios = _solve(_make_groups(random.Random(2), 12, 3, played_share=0.0))
+    assert all(scenario.status == UNDECIDED for scenario in scenarios.values())
+
+
+def test_every_actual_outcome_was_possible():
+    rnd = random.Random(46)
+    for _ in range(60):
+        groups = _make_groups(rnd, rnd.choice([6, DIRECT_QUALIFIERS, 12]), rnd.choice([3, 4, 5]), rnd.random())
+        scenarios = _solve(groups)
+        for _ in range(20):
+            for team_id, outcome in _play_out(rnd, groups).items():
+                assert outcome in scenarios[team_id].possible
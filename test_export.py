@@ -0,0 +1,143 @@
+import csv
+import io
+import json
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from app import create_app, db
+from app.export import DATASETS, stream_export
+from app.models import (Season, Division, Gameweek, Team, Fixture, TeamSeason, Title, CupCompetition, CupRound,
+                        CupMatch, CupGroup, CupGroupMatch, ManagerMonth, ManagerOfTheMonth, User)
+from config import TestingConfig
+
+
+class _Config(TestingConfig):
+    SECRET_KEY = 'test'
+
+
+def _seed_season(season, teams, gameweeks=3):
+    """One division of four teams playing each other every gameweek, with a cup, titles and a MOTM award"""
+    division = Division(name=f'Premier League {season.name}', season_id=season.id)
+    db.session.add(division)
+    db.session.flush()
+    db.session.add_all([TeamSeason(team_id=team.id, season_id=season.id, division_id=division.id, position=index)
+                        for index, team in enumerate(teams, 1)])
+
+    weeks = []
+    for number in range(1, gameweeks + 1):
+        week = Gameweek(number=number, season_id=season.id,
+                        deadline=datetime.combine(season.start_date, datetime.min.time()) + timedelta(weeks=number))
+        db.session.add(week)
+        weeks.append(week)
+    db.session.flush()
+    for week in weeks:
+        db.session.add_all([
+            Fixture(gameweek_id=week.id, division_id=division.id, home_team_id=teams[0].id,
+                    away_team_id=teams[1].id, home_score=60.5, away_score=48.25),
+            Fixture(gameweek_id=week.id, division_id=division.id, home_team_id=teams[2].id,
+                    away_team_id=teams[3].id),
+        ])
+
+    cup = CupCompetition(name=f'Cup {season.name}', season_id=season.id, has_groups=True, num_groups=2)
+    db.session.add(cup)
+    db.session.flush()
+    cup_round = CupRound(name='Final', competition_id=cup.id, order=1, num_matches=1)
+    db.session.add(cup_round)
+    db.session.flush()
+    db.session.add(CupMatch(round_id=cup_round.id, home_team_id=teams[0].id, away_team_id=teams[2].id))
+    for order, (home, away) in enumerate([(teams[0], teams[1]), (teams[2], teams[3])], 1):
+        group = CupGroup(competition_id=cup.id, name=f'Group {order}', order=order)
+        db.session.add(group)
+        db.session.flush()
+        db.session.add_all([
+            CupGroupMatch(group_id=group.id, home_team_id=home.id, away_team_id=away.id, gameweek_id=weeks[0].id),
+            CupGroupMatch(group_id=group.id, home_team_id=away.id, away_team_id=home.id),
+        ])
+
+    db.session.add_all([
+        Title(team_id=teams[0].id, season_id=season.id, type='league', division_id=division.id),
+        Title(team_id=teams[1].id, season_id=season.id, type='league', division_id=division.id, is_runner_up=True),
+    ])
+    month = ManagerMonth(name='August', season_id=season.id, start_gameweek_id=weeks[0].id,
+                         end_gameweek_id=weeks[-1].id)
+    db.session.add(month)
+    db.session.flush()
+    db.session.add(ManagerOfTheMonth(manager_month_id=month.id, team_id=teams[0].id, total_score=181.5))
+
+
+def _seed():
+    teams = [Team(name=f'Team {index}', manager_name=f'Manager {index}') for index in range(4)]
+    db.session.add_all(teams)
+    db.session.flush()
+    seasons = [Season.query.one()]
+    seasons.append(Season(name='2026/27', start_date=date(2026, 8, 1), end_date=date(2027, 5, 31)))
+    db.session.add(seasons[-1])
+    db.session.flush()
+    for season in seasons:
+        _seed_season(season, teams)
+    db.session.commit()
+
+
+# Source rows behind each dataset, and how to narrow them to one season
+SOURCES = {
+    'fixtures': (Fixture, lambda season_id: Fixture.season_id == season_id),
+    'standings': (TeamSeason, lambda season_id: TeamSeason.season_id == season_id),
+    'titles': (Title, lambda season_id: Title.season_id == season_id),
+    'cup_matches': (CupMatch, lambda season_id: CupMatch.round.has(
+        CupRound.competition.has(CupCompetition.season_id == season_id))),
+    'cup_group_matches': (CupGroupMatch, lambda season_id: CupGroupMatch.group.has(
+        CupGroup.competition.has(CupCompetition.season_id == season_id))),
+    'motm': (ManagerOfTheMonth, lambda season_id: ManagerOfTheMonth.month.has(
+        ManagerMonth.season_id == season_id)),
+}
+
+
+def _expected_rows(dataset, season_id):
+    model, in_season = SOURCES[dataset]
+    query = model.query
+    if season_id:
+        query = query.filter(in_season(season_id))
+    return query.count()
+
+
+def _season_ids():
+    return [None] + [season.id for season in Season.query.order_by(Season.start_date)]
+
+
+@pytest.mark.parametrize('fmt', ['csv', 'ndjson'])
+def test_every_dataset_exports_one_row_per_source_row(fmt):
+    assert set(SOURCES) == set(DATASETS)
+    with create_app(_Config).app_context():
+        _seed()
+        for season_id in _season_ids():
+            for dataset in DATASETS:
+                text = ''.join(stream_export(dataset, fmt, season_id))
+                if fmt == 'csv':
+                    rows = list(csv.DictReader(io.StringIO(text)))
+                else:
+                    rows = [json.loads(line) for line in text.splitlines()]
+                assert len(rows) == _expected_rows(dataset, season_id), (dataset, season_id)
+                if season_id:
+                    assert {row['season'] for row in rows} <= {db.session.get(Season, season_id).name}
+
+
+def test_export_route_streams_every_dataset_for_an_admin():
+    app = create_app(_Config)
+    with app.app_context():
+        _seed()
+        admin = User.query.filter_by(is_admin=True).first()
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = str(admin.id)
+
+        for season_id in _season_ids():
+            response = client.get('/admin/export/all', query_string={'format': 'ndjson', 'season_id': season_id})
+            assert response.status_code == 200
+            assert response.mimetype == 'application/x-ndjson'
+            counts = dict.fromkeys(DATASETS, 0)
+            for line in response.get_data(as_text=True).splitlines():
+                counts[json.loads(line)['dataset']] += 1
+            assert counts == {dataset: _expected_rows(dataset, season_id) for dataset in DATASETS}
+
+        assert client.get('/admin/export/all', query_string={'format': 'csv'}).status_code == 400
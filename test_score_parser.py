@@ -0,0 +1,100 @@
+import random
+
+from app.score_parser import ScoreParseError, parse_score_line, parse_scores
+
+# Real team names: the fixture import sample plus the pasted scores from test_score_parse.py
+FIXTURE_NAMES = set()
+with open('test_fixtures.txt', encoding='utf-8') as f:
+    for line in f:
+        parts = line.rstrip('\n').split('\t')
+        FIXTURE_NAMES.update(part.strip() for part in parts[1:3])
+
+TEAM_NAMES = sorted(FIXTURE_NAMES) + [
+    'Pep and the City', 'Back Fixes Matter', 'Bayern Bru', 'Wirtz Case Scenario',
+    'Scharshank Redemption', 'Udogie Style', 'The Mask of Yoro', 'Freedyonfire',
+    'Pique Blinders', 'Chicken Tikka MoSalah', 'Huss will be missed !', 'Dango Unchained 👑',
+]
+
+# Team names decorated the way Fantrax pastes them
+TEAM_NAMES += ['👑 ' + TEAM_NAMES[0], TEAM_NAMES[1] + ' 👑']
+
+SEPARATORS = ['\t', '    ', '  ', ' \t ', '\t\t']
+
+
+def _score(rnd):
+    return round(rnd.uniform(0, 150) * 4) / 4
+
+
+def _format_score(rnd, score):
+    text = rnd.choice(['{:g}', '{:.2f}']).format(score)
+    return text + rnd.choice(['', '', '🏆', ' 🏆'])
+
+
+def _undecorated(name):
+    return name.replace('👑', '').strip()
+
+
+def test_real_pasted_scores():
+    pasted = """Pep and the City    83    Back Fixes Matter    96.5
+Bayern Bru    92.75    Wirtz Case Scenario    73.25
+Huss will be missed !    100.5    Dango Unchained 👑    123.5"""
+    assert [tuple(line[1:]) for line in parse_scores(pasted)] == [
+        ('Pep and the City', 83.0, 'Back Fixes Matter', 96.5),
+        ('Bayern Bru', 92.75, 'Wirtz Case Scenario', 73.25),
+        ('Huss will be missed !', 100.5, 'Dango Unchained', 123.5),
+    ]
+
+
+def test_fuzz_column_formats():
+    rnd = random.Random(2024)
+    for _ in range(2000):
+        home, away = rnd.sample(TEAM_NAMES, 2)
+        home_score, away_score = _score(rnd), _score(rnd)
+        sep = rnd.choice(SEPARATORS)
+        line = sep.join([home, _format_score(rnd, home_score), away, _format_score(rnd, away_score)])
+        line = rnd.choice(['', ' ', '\t']) + line + rnd.choice(['', ' ', '\r\n', '\n'])
+
+        parsed = parse_score_line(line)
+        assert (parsed.home, parsed.away) == (_undecorated(home), _undecorated(away)), line
+        assert (parsed.home_score, parsed.away_score) == (home_score, away_score), line
+
+
+def test_fuzz_single_space_format():
+    rnd = random.Random(7)
+    for _ in range(2000):
+        home, away = rnd.sample(TEAM_NAMES, 2)
+        home_score, away_score = _score(rnd), _score(rnd)
+        line = ' '.join([home, '{:g}'.format(home_score), away, '{:g}'.format(away_score)])
+
+        parsed = parse_score_line(line)
+        assert (parsed.home, parsed.away) == (_undecorated(home), _undecorated(away)), line
+        assert (parsed.home_score, parsed.away_score) == (home_score, away_score), line
+
+
+def test_numbers_in_team_names():
+    assert tuple(parse_score_line('Team 11\t55.5\tOther\t60')[1:]) == ('Team 11', 55.5, 'Other', 60.0)
+    assert tuple(parse_score_line('Other 55.5 Team 11 60')[1:]) == ('Other', 55.5, 'Team 11', 60.0)
+    try:
+        parse_score_line('Team 11 FC 55.5 Other 60')
+    except ScoreParseError:
+        pass
+    else:
+        raise AssertionError('single-space line with a number in the home name should be ambiguous')
+
+
+def test_bad_lines_are_collected():
+    errors = []
+    source = 'A\t1\tB\t2\n\nnot a score line\nC\t3\tD\n'
+    parsed = list(parse_scores(source, errors=errors))
+    assert [line.line_no for line in parsed] == [1]
+    assert [error.line_no for error in errors] == [3, 4]
+
+
+def test_streams_uploaded_bytes():
+    upload = ['﻿Pep and the City\t83\tBack Fixes Matter\t96.5\r\n'.encode('utf-8'),
+              b'\r\n',
+              'Bayern Bru    92.75🏆    Wirtz Case Scenario    73.25\r\n'.encode('utf-8')]
+    parsed = list(parse_scores(iter(upload)))
+    assert [(line.line_no, line.home, line.home_score) for line in parsed] == [
+        (1, 'Pep and the City', 83.0), (3, 'Bayern Bru', 92.75)
+    ]